@@ -0,0 +1,115 @@
+import bisect
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.audio.pcm import READ_BLOCK_SECONDS, open_wav
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ENERGY_FILE = "analysis/energy.npz"
+
+# Quadros de 20 ms: resolução suficiente para achar pausas entre frases
+FRAME_SECONDS = 0.02
+# Limiar de silêncio: piso de ruído (percentil 10) + margem, dentro destes limites (dBFS)
+NOISE_FLOOR_PERCENTILE = 10
+SILENCE_MARGIN_DB = 6.0
+SILENCE_MIN_DB = -60.0
+SILENCE_MAX_DB = -30.0
+# Silêncios mais curtos que isso são respiração / consoantes, não pausas
+MIN_SILENCE_SECONDS = 0.15
+
+
+def energy_path(job_id: str) -> Path:
+    return settings.JOBS_DIR / job_id / ENERGY_FILE
+
+
+def build_energy_index(job_id: str) -> Path:
+    """
+    Uma varredura vetorizada pelo audio.wav (mapeado do disco): RMS em dB por
+    quadro de 20 ms e os trechos de silêncio como arrays ordenados de início/fim.
+    """
+    job_folder = settings.get_job_path(job_id)
+    pcm = open_wav(job_folder / "audio.wav")
+
+    frame = int(round(pcm.sample_rate * FRAME_SECONDS))
+    read_frames = frame * max(1, int(READ_BLOCK_SECONDS / FRAME_SECONDS))
+
+    chunks = []
+    for x in pcm.iter_blocks(read_frames):
+        n = len(x) // frame
+        if n:
+            blocks = x[:n * frame].reshape(n, frame)
+            chunks.append(np.sqrt(np.mean(blocks * blocks, axis=1)))
+    rms = np.concatenate(chunks) if chunks else np.zeros(0)
+    frame_db = 20 * np.log10(np.maximum(rms, 1e-6))
+
+    if len(frame_db):
+        floor = np.percentile(frame_db, NOISE_FLOOR_PERCENTILE)
+        threshold = float(np.clip(floor + SILENCE_MARGIN_DB, SILENCE_MIN_DB, SILENCE_MAX_DB))
+    else:
+        threshold = SILENCE_MIN_DB
+
+    # Bordas das sequências de quadros silenciosos (diff do booleano, sem laço)
+    silent = np.concatenate([[False], frame_db < threshold, [False]])
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    starts, ends = edges[0::2] * FRAME_SECONDS, edges[1::2] * FRAME_SECONDS
+    keep = (ends - starts) >= MIN_SILENCE_SECONDS
+
+    path = job_folder / ENERGY_FILE
+    path.parent.mkdir(exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp.npz")
+    np.savez_compressed(
+        tmp_path,
+        frame_db=frame_db.astype(np.float16),
+        frame_seconds=FRAME_SECONDS,
+        threshold_db=threshold,
+        silence_starts=starts[keep].astype(np.float32),
+        silence_ends=ends[keep].astype(np.float32),
+    )
+    tmp_path.replace(path)
+
+    logger.info(
+        f"🔈 [{job_id}] Índice de energia: {len(frame_db)} quadros, "
+        f"{int(keep.sum())} silêncios (limiar {threshold:.1f} dBFS)"
+    )
+    return path
+
+
+class EnergyIndex:
+    """Consultas O(log n) sobre os silêncios do job (busca binária nos arrays ordenados)."""
+
+    def __init__(self, silence_starts: np.ndarray, silence_ends: np.ndarray):
+        # Listas: o segmentador faz milhares de consultas escalares, onde bisect é mais barato que numpy
+        self.silence_starts = np.asarray(silence_starts, dtype=np.float64).tolist()
+        self.silence_ends = np.asarray(silence_ends, dtype=np.float64).tolist()
+
+    @classmethod
+    def load(cls, job_id: str) -> Optional["EnergyIndex"]:
+        path = energy_path(job_id)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            return cls(data["silence_starts"], data["silence_ends"])
+
+    def silence_after(self, word_end: float, next_start: float, tolerance: float) -> float:
+        """
+        Duração do silêncio depois de uma palavra: entre os que terminam após
+        word_end e encostam em [word_end - tolerance, next_start + tolerance],
+        o de maior sobreposição com essa janela (0 se a fala é contínua ali).
+        A pausa que vem ANTES de uma palavra curta nunca conta como a dela.
+        """
+        lo, hi = word_end - tolerance, next_start + tolerance
+        best_overlap, best = 0.0, 0.0
+        # Silêncios são disjuntos e ordenados: os fins também estão em ordem
+        i = bisect.bisect_right(self.silence_ends, word_end)
+        while i < len(self.silence_starts) and self.silence_starts[i] < hi:
+            start, end = self.silence_starts[i], self.silence_ends[i]
+            overlap = min(end, hi) - max(start, lo)
+            if overlap > best_overlap:
+                best_overlap, best = overlap, end - start
+            i += 1
+        return float(best)
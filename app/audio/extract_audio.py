@@ -1,11 +1,14 @@
 import os
 import logging
+import subprocess
 import ffmpeg
 from app.config.settings import settings
+from app.ingest.media import get_media_info
+from app.jobs.ffmpeg_runner import run_ffmpeg
 
 logger = logging.getLogger(__name__)
 
-def extract_audio(job_id: str):
+def extract_audio(job_id: str, on_progress=None):
     """
     Extrai o áudio do vídeo input.mp4 e converte para WAV 16kHz Mono.
     Isso otimiza absurdamente a velocidade do Whisper.
@@ -34,20 +37,22 @@ def extract_audio(job_id: str):
         # -ac 1             (Audio Channels 1 - Mono)
         # -ar 16000         (Audio Rate 16kHz - Padrão Whisper)
         # -y                (Overwrite - sobrescreve se existir)
-        (
+        cmd = (
             ffmpeg
             .input(input_str)
             .output(output_str, acodec='pcm_s16le', ac=1, ar='16000')
             .overwrite_output()
-            .run(quiet=True)
+            .compile()
         )
+        # Roda via run_ffmpeg para ter progresso real (duração vem do media.json)
+        run_ffmpeg(cmd, duration=get_media_info(job_id).duration, on_progress=on_progress)
         if not output_audio.exists():
             raise FileNotFoundError("O FFmpeg rodou mas não gerou o arquivo de áudio.")
 
         logger.info(f"✅ [{job_id}] Áudio extraído.")
         return output_str
 
-    except ffmpeg.Error as e:
+    except subprocess.CalledProcessError as e:
         logger.error(f"Erro FFmpeg: {e.stderr.decode('utf8') if e.stderr else str(e)}")
         raise e
     except Exception as e:
@@ -0,0 +1,172 @@
+import logging
+import math
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.audio.pcm import READ_BLOCK_SECONDS, open_wav
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+LOUDNESS_FILE = "analysis/loudness.npy"
+
+# Linha do tempo em blocos de 100 ms: [potência K-ponderada média, pico absoluto]
+BLOCK_SECONDS = 0.1
+# Janela de gating da BS.1770 (400 ms = 4 blocos com 75% de sobreposição)
+GATE_BLOCKS = 4
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+# Resposta ao impulso do filtro K truncada (o passa-altas de 38 Hz decai bem antes disso)
+K_FILTER_TAPS = 4096
+
+
+def _biquad_impulse(b, a, n: int) -> np.ndarray:
+    """Resposta ao impulso de um biquad (laço curto, roda uma vez por taxa de amostragem)."""
+    h = np.zeros(n)
+    x1 = x2 = y1 = y2 = 0.0
+    for i in range(n):
+        x0 = 1.0 if i == 0 else 0.0
+        y0 = b[0] * x0 + b[1] * x1 + b[2] * x2 - a[1] * y1 - a[2] * y2
+        h[i] = y0
+        x2, x1 = x1, x0
+        y2, y1 = y1, y0
+    return h
+
+
+def k_weighting_fir(sample_rate: int, taps: int = K_FILTER_TAPS) -> np.ndarray:
+    """
+    Filtro K da ITU-R BS.1770 (shelf de alta + passa-altas) projetado para a
+    taxa do áudio (mesmas fórmulas da libebur128) e convertido em FIR, para
+    ser aplicado por convolução via FFT em blocos, sem laço por amostra.
+    """
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    hp_b = [1.0, -2.0, 1.0]
+    hp_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    return np.convolve(_biquad_impulse(shelf_b, shelf_a, taps), _biquad_impulse(hp_b, hp_a, taps))[:taps]
+
+
+def loudness_path(job_id: str) -> Path:
+    return settings.JOBS_DIR / job_id / LOUDNESS_FILE
+
+
+def analyze_loudness(job_id: str) -> Path:
+    """
+    Uma passada pelo audio.wav (mapeado do disco): filtro K por overlap-add e
+    potência média / pico por bloco de 100 ms. ~300 KB por hora de áudio.
+    """
+    job_folder = settings.get_job_path(job_id)
+    pcm = open_wav(job_folder / "audio.wav")
+    sr = pcm.sample_rate
+
+    block = int(round(sr * BLOCK_SECONDS))
+    # Leitura em múltiplos do bloco de 100 ms: nenhum bloco fica dividido entre duas leituras
+    read_frames = block * max(1, int(READ_BLOCK_SECONDS / BLOCK_SECONDS))
+
+    h = k_weighting_fir(sr)
+    n_fft = 1 << (read_frames + len(h) - 1).bit_length()
+    h_fft = np.fft.rfft(h, n_fft)
+    carry = np.zeros(len(h) - 1)
+
+    powers, peaks = [], []
+    for x in pcm.iter_blocks(read_frames):
+        y = np.fft.irfft(np.fft.rfft(x, n_fft) * h_fft, n_fft)[:len(x) + len(h) - 1]
+        y[:len(carry)] += carry
+        carry = y[len(x):].copy()
+        y = y[:len(x)]
+
+        n_blocks = len(x) // block
+        if n_blocks == 0:
+            continue
+        y = y[:n_blocks * block].reshape(n_blocks, block)
+        powers.append(np.mean(y * y, axis=1))
+        peaks.append(np.max(np.abs(x[:n_blocks * block].reshape(n_blocks, block)), axis=1))
+
+    timeline = np.stack([
+        np.concatenate(powers) if powers else np.zeros(0),
+        np.concatenate(peaks) if peaks else np.zeros(0),
+    ], axis=1).astype(np.float32)
+
+    path = job_folder / LOUDNESS_FILE
+    path.parent.mkdir(exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp.npy")
+    np.save(tmp_path, timeline)
+    tmp_path.replace(path)
+
+    logger.info(f"🔊 [{job_id}] Loudness analisada: {len(timeline)} blocos de {BLOCK_SECONDS * 1000:.0f} ms")
+    return path
+
+
+def load_loudness(job_id: str) -> Optional[np.ndarray]:
+    path = loudness_path(job_id)
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+def _lufs(power):
+    return -0.691 + 10 * np.log10(np.maximum(power, 1e-12))
+
+
+def integrated_loudness(timeline: np.ndarray, start: float, end: float) -> Optional[float]:
+    """Loudness integrada (LUFS, com os dois gates da BS.1770) do trecho [start, end]."""
+    first = max(0, int(start / BLOCK_SECONDS))
+    last = min(len(timeline), int(math.ceil(end / BLOCK_SECONDS)))
+    powers = np.asarray(timeline[first:last, 0], dtype=np.float64)
+    if len(powers) < GATE_BLOCKS:
+        return None
+
+    # Janelas de 400 ms deslizando de 100 em 100 ms (soma cumulativa, sem laço)
+    csum = np.concatenate([[0.0], np.cumsum(powers)])
+    gates = (csum[GATE_BLOCKS:] - csum[:-GATE_BLOCKS]) / GATE_BLOCKS
+
+    gates = gates[_lufs(gates) > ABSOLUTE_GATE_LUFS]
+    if len(gates) == 0:
+        return None
+    relative_gate = _lufs(gates.mean()) + RELATIVE_GATE_LU
+    gates = gates[_lufs(gates) > relative_gate]
+    if len(gates) == 0:
+        return None
+    return float(_lufs(gates.mean()))
+
+
+def clip_gain_db(job_id: str, start: float, end: float) -> Optional[float]:
+    """
+    Ganho (dB) que leva o clip ao LOUDNESS_TARGET_LUFS, limitado por
+    LOUDNESS_MAX_GAIN_DB e, aproximadamente, para o pico não passar de
+    LOUDNESS_PEAK_CEILING_DB (o limiter do render garante o teto).
+    None sem análise (jobs antigos), com a normalização desligada ou num trecho mudo.
+    """
+    if not settings.LOUDNESS_NORMALIZE:
+        return None
+    timeline = load_loudness(job_id)
+    if timeline is None:
+        return None
+
+    loudness = integrated_loudness(timeline, start, end)
+    if loudness is None:
+        return None
+
+    gain = settings.LOUDNESS_TARGET_LUFS - loudness
+    gain = max(-settings.LOUDNESS_MAX_GAIN_DB, min(settings.LOUDNESS_MAX_GAIN_DB, gain))
+
+    first = max(0, int(start / BLOCK_SECONDS))
+    last = min(len(timeline), int(math.ceil(end / BLOCK_SECONDS)))
+    peak = float(np.max(timeline[first:last, 1])) if last > first else 0.0
+    if peak > 0:
+        gain = min(gain, settings.LOUDNESS_PEAK_CEILING_DB - 20 * math.log10(peak))
+
+    return round(gain, 1)
@@ -0,0 +1,70 @@
+import logging
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Blocos de leitura (s): o arquivo é mapeado, só o bloco atual vira float na memória
+READ_BLOCK_SECONDS = 60.0
+
+
+@dataclass
+class Pcm:
+    """Amostras PCM 16 bits de um WAV, mapeadas do disco (sem carregar o arquivo)."""
+    samples: np.ndarray  # memmap int16, shape (frames, channels)
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def iter_blocks(self, block_frames: int) -> Iterator[np.ndarray]:
+        """Blocos mono float32 em [-1, 1] (canais somados pela média)."""
+        for start in range(0, len(self.samples), block_frames):
+            block = np.asarray(self.samples[start:start + block_frames], dtype=np.float32)
+            yield block.mean(axis=1) / 32768.0
+
+
+def open_wav(path: Path) -> Pcm:
+    """
+    Mapeia o chunk 'data' de um WAV PCM 16 bits (o audio.wav do job).
+    O cabeçalho é lido à mão porque o módulo wave não expõe o offset dos dados.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{path.name} não é um WAV")
+
+        channels = sample_rate = bits = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path.name} sem chunk 'data'")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                _, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+            elif chunk_id == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+
+    if bits != 16:
+        raise ValueError(f"{path.name}: esperado PCM 16 bits, encontrado {bits}")
+
+    # O ffmpeg grava tamanho 0xFFFFFFFF quando não sabe o total (pipe): usa o arquivo
+    available = path.stat().st_size - offset
+    data_size = min(chunk_size, available) if chunk_size != 0xFFFFFFFF else available
+    frames = data_size // (2 * channels)
+
+    if frames == 0:
+        return Pcm(samples=np.zeros((0, channels), dtype="<i2"), sample_rate=sample_rate)
+    samples = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(frames, channels))
+    return Pcm(samples=samples, sample_rate=sample_rate)
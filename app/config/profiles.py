@@ -0,0 +1,82 @@
+from typing import Dict, List
+
+# Perfis de saída (ver docs/architecture.md, seção 7).
+# Cada perfil define a geometria e a estratégia visual do render.
+# A duração dos cortes é decidida uma única vez pelo Segmenter (por job),
+# então todos os perfis de um job compartilham os mesmos segmentos.
+OUTPUT_PROFILES: Dict[str, Dict] = {
+    "short": {
+        "label": "Short (9:16)",
+        "format": "vertical",
+        "use_blur": False,
+    },
+    "short_blur": {
+        "label": "Short (9:16) - Fundo Borrado",
+        "format": "vertical",
+        "use_blur": True,
+    },
+    "medium": {
+        "label": "Medium (16:9)",
+        "format": "horizontal",
+        "use_blur": False,
+    },
+}
+
+# Resolução final de cada formato
+FORMAT_RESOLUTIONS = {
+    "vertical": (1080, 1920),
+    "horizontal": (1920, 1080),
+}
+
+
+def profile_name_for(video_format: str, use_blur: bool = False) -> str:
+    """Nome do perfil equivalente às opções legadas (format + use_blur)."""
+    if video_format == "horizontal":
+        return "medium"
+    return "short_blur" if use_blur else "short"
+
+
+def resolve_profiles(options: Dict) -> List[Dict]:
+    """
+    Resolve a lista de perfis de saída de um job.
+
+    options["profiles"] aceita nomes de OUTPUT_PROFILES ou dicts com
+    "name" (opcional "base") e overrides. Sem essa chave, o job gera um único
+    perfil a partir das opções legadas (format / use_blur / use_subs).
+    Cada perfil resolvido herda as opções do job (legendas, fonte, cor...).
+    """
+    requested = options.get("profiles")
+
+    if not requested:
+        requested = [profile_name_for(options.get("format", "vertical"), options.get("use_blur", False))]
+
+    resolved = []
+    seen = set()
+
+    for entry in requested:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+
+        name = entry.get("name") or entry.get("base")
+        base = OUTPUT_PROFILES.get(entry.get("base", name))
+        if base is None:
+            raise ValueError(f"Perfil de saída desconhecido: {name}")
+
+        if name in seen:
+            continue
+        seen.add(name)
+
+        profile = {**options, **base, **entry, "name": name}
+        profile.pop("profiles", None)
+
+        # Blur só faz sentido no vertical
+        if profile["format"] != "vertical":
+            profile["use_blur"] = False
+
+        res_x, res_y = FORMAT_RESOLUTIONS[profile["format"]]
+        profile["res_x"] = res_x
+        profile["res_y"] = res_y
+
+        resolved.append(profile)
+
+    return resolved
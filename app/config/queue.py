@@ -1,12 +1,26 @@
 import os
-from redis import Redis
+from redis import ConnectionPool, Redis
 from rq import Queue
 
-# Pega o host da variável de ambiente ou usa localhost (fallback)
-redis_host = os.getenv('REDIS_HOST', 'localhost')
+from app.config.settings import settings
+
+# Um pool de conexões por processo. Após um fork (workers do RQ / supervisor)
+# o filho cria o seu próprio pool em vez de herdar sockets do pai.
+_pool = None
+_pool_pid = None
+
+def get_redis() -> Redis:
+    """Cliente Redis do pool do processo atual (barato, pode chamar a cada uso)."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        # Mesma configuração (settings / .env) em UI, CLI, workers e supervisor
+        _pool = ConnectionPool(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        _pool_pid = os.getpid()
+    return Redis(connection_pool=_pool)
 
 # Conecta no Redis
-redis_conn = Redis(host=redis_host, port=6379)
+redis_conn = get_redis()
 
-# Cria a fila
-video_queue = Queue('video_jobs', connection=redis_conn)
\ No newline at end of file
+# Cria a fila (etapas gerais). Transcrição e render usam
+# 'video_jobs:transcribe' e 'video_jobs:render' (ver app/jobs/pipeline.py)
+video_queue = Queue('video_jobs', connection=redis_conn)
@@ -16,7 +16,41 @@ class Settings(BaseSettings):
     
     # Resultado final: /app/storage/jobs
     JOBS_DIR: Path = STORAGE_DIR / "jobs"
+
+    # Catálogo de jobs (SQLite no mesmo volume): listagem indexada na interface
+    CATALOG_PATH: Path = STORAGE_DIR / "catalog.db"
+
+    # Uploads da interface (o job recebe só o nome do arquivo)
+    INPUTS_DIR: Path = Path("/app/inputs")
+
+    # Fontes usadas no burn-in das legendas (.ass)
+    FONTS_DIR: Path = BASE_DIR / "assets" / "fonts"
     
+    # --- INGEST ---
+    # Intervalo máximo entre keyframes do input.mp4 (s). GOP curto deixa o
+    # seek de cada clip barato e dá pontos de corte próximos para o stream copy.
+    INGEST_GOP_SECONDS: float = 2.0
+
+    # --- STORAGE (app/storage/manager.py) ---
+    STORAGE_QUOTA_BYTES: int = 0                 # total dos jobs (0 = sem cota); LRU evicta jobs antigos
+    STORAGE_MIN_FREE_BYTES: int = 5 * 1024 ** 3  # abaixo disso o ingest é recusado
+    INTERMEDIATE_RETENTION: float = 0.0          # s após a etapa consumidora (negativo = nunca apagar)
+    KEEP_INPUT_VIDEO: bool = True                # input.mp4 é necessário para re-estilizar
+    STORAGE_SWEEP_INTERVAL: float = 300.0        # varredura periódica no supervisor (s)
+
+    # --- RENDER ---
+    # Corte por stream copy (sem re-encode) quando o clip não precisa de filtros.
+    # O início é ajustado ao keyframe mais próximo dentro desta tolerância (s).
+    STREAM_COPY_ENABLED: bool = True
+    STREAM_COPY_SNAP_TOLERANCE: float = 1.0
+
+    # Normalização de loudness por clip (app/audio/loudness.py): ganho calculado
+    # da análise feita uma vez por job e aplicado com `volume` no próprio render
+    LOUDNESS_NORMALIZE: bool = True
+    LOUDNESS_TARGET_LUFS: float = -14.0
+    LOUDNESS_MAX_GAIN_DB: float = 12.0
+    LOUDNESS_PEAK_CEILING_DB: float = -1.0   # o ganho nunca leva o pico acima disto (dBFS)
+
     # --- WHISPER ---
     WHISPER_MODEL: str = "small" # small, medium, large-v2
     WHISPER_DEVICE: str = "auto"   # "cuda" se tiver NVIDIA, "cpu" se não
@@ -25,12 +59,90 @@ class Settings(BaseSettings):
     # --- REDIS ---
     REDIS_HOST: str = os.getenv("REDIS_HOST", "redis")
     REDIS_PORT: int = 6379
+
+    # --- FILAS ---
+    # Cada etapa do pipeline é um job RQ separado (ver app/jobs/pipeline.py).
+    # Transcrição e render vão para filas próprias: video_jobs:transcribe, video_jobs:render
+    QUEUE_NAME: str = "video_jobs"
+    STAGE_JOB_TIMEOUT: int = 3600
+    RENDER_JOB_TIMEOUT: int = 1800
+
+    # --- ADMISSÃO (app/jobs/admission.py) ---
+    # Antes de enfileirar, a duração da fonte é sondada (sem download) e o
+    # custo estimado decide a prioridade, os timeouts e se o job entra agora.
+    ADMISSION_ENABLED: bool = True
+    HIGH_PRIORITY_MAX_DURATION: float = 900.0   # até 15 min -> fila :high
+    LOW_PRIORITY_MIN_DURATION: float = 3600.0   # a partir de 1h -> fila :low
+    ADMISSION_CAPACITY: float = 14400.0         # segundos de trabalho em andamento POR HOST (0 = sem limite)
+    ADMISSION_MAX_COST: float = 0.0             # acima disso o job é recusado (0 = nunca recusa)
+    ADMISSION_HOST_TTL: float = 90.0            # host some da capacidade se o supervisor parar de anunciar (s)
+    ADMISSION_TIMEOUT_MARGIN: float = 3.0       # timeout = custo estimado da etapa x margem
+    MIN_JOB_TIMEOUT: int = 600
+    MAX_JOB_TIMEOUT: int = 6 * 3600
     
+    # --- SUPERVISOR DE WORKERS (supervisor_service.py) ---
+    TRANSCRIBE_WORKERS: int = 1
+    TRANSCRIBE_CORES: int = 4             # núcleos reservados para a transcrição
+    RENDER_WORKERS: int = 0               # 0 = automático (núcleos restantes / RENDER_CORES_PER_WORKER)
+    RENDER_CORES_PER_WORKER: int = 2
+    WORKER_RESTART_BACKOFF: float = 5.0   # segundos antes de reiniciar um worker que caiu
+    METRICS_PORT: int = 9108              # endpoint Prometheus /metrics (0 = desligado)
+
+    # Threads por processo (0 = deixa ffmpeg / CTranslate2 decidirem).
+    # O supervisor ajusta em cada worker para não haver oversubscription.
+    FFMPEG_THREADS: int = 0
+    WHISPER_CPU_THREADS: int = 0
+
+    # --- DOWNLOADS (app/ui/downloads.py) ---
+    # Servidor HTTP da interface que entrega ZIP e clipes direto do disco, em blocos.
+    DOWNLOAD_PORT: int = 8502
+    DOWNLOAD_BASE_URL: str = ""   # URL pública (vazio = http://<host usado pelo navegador>:DOWNLOAD_PORT)
+
+    # --- PASTA MONITORADA (watch_service.py) ---
+    # Cada vídeo largado em WATCH_DIR vira um job (options.json da pasta, se houver)
+    WATCH_DIR: Path = INPUTS_DIR / "incoming"
+    WATCH_PROCESSED_DIR: Path = INPUTS_DIR / "processed"
+    WATCH_FAILED_DIR: Path = INPUTS_DIR / "failed"
+    WATCH_STABLE_SECONDS: float = 10.0   # tamanho/mtime parados por esse tempo = cópia terminou
+    WATCH_MAX_INFLIGHT: int = 4          # jobs da pasta em andamento ao mesmo tempo
+    WATCH_POLL_INTERVAL: float = 2.0
+
+    # --- PROFILING (opt-in: options["profile"] ou AVC_PROFILE=1) ---
+    PROFILE_SAMPLE_INTERVAL: float = 0.005  # intervalo do amostrador de pilhas (s)
+
     ENABLE_LLM: bool = False
 
     class Config:
         env_file = ".env"
 
+    def queue_name(self, role: str = "default", priority: str = "normal") -> str:
+        """
+        Nome da fila de um papel e prioridade:
+        default -> video_jobs, render -> video_jobs:render, render/high -> video_jobs:render:high
+        """
+        name = self.QUEUE_NAME if role == "default" else f"{self.QUEUE_NAME}:{role}"
+        if priority != "normal":
+            name = f"{name}:{priority}"
+        return name
+
+    def role_queue_names(self, *roles: str) -> list:
+        """
+        Filas dos papéis em ordem de atendimento (o worker RQ esvazia a primeira
+        antes): todas as :high, depois as normais, depois as :low.
+        """
+        roles = roles or ("default",)
+        return [self.queue_name(role, priority) for priority in ("high", "normal", "low") for role in roles]
+
+    def ffmpeg_thread_args(self) -> list:
+        """Argumentos -threads do ffmpeg (vazio = automático)."""
+        if self.FFMPEG_THREADS > 0:
+            return ["-threads", str(self.FFMPEG_THREADS)]
+        return []
+
+    def download_base_url(self, host: str = "localhost") -> str:
+        """URL do servidor de downloads: DOWNLOAD_BASE_URL ou o host da requisição na DOWNLOAD_PORT."""
+        return (self.DOWNLOAD_BASE_URL or f"http://{host}:{self.DOWNLOAD_PORT}").rstrip("/")
+
     def get_job_path(self, job_id: str) -> Path:
         """
         Cria e retorna o caminho ABSOLUTO para um job.
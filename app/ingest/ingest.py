@@ -4,14 +4,22 @@ import logging
 import subprocess
 import yt_dlp
 
+from app.config.settings import settings
+from app.ingest.media import probe_duration, probe_media, save_media_info
+from app.jobs.ffmpeg_runner import run_ffmpeg
+from app.jobs.manifest import partial_path
+from app.storage.manager import remove_leftovers
+from app.video.keyframes import build_keyframe_index
+
 # Configuração básica de log
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def standardize_video(input_path: str, output_path: str):
+def standardize_video(input_path: str, output_path: str, on_progress=None):
     """
-    Converte para MP4 H.264 / AAC.
+    Converte para MP4 H.264 / AAC, com keyframes a cada INGEST_GOP_SECONDS
+    para que o corte dos clipes tenha pontos de seek próximos.
     """
     logger.info(f"🔄 Padronizando vídeo para H.264...")
 
@@ -31,19 +39,24 @@ def standardize_video(input_path: str, output_path: str):
         "libx264",
         "-preset",
         "ultrafast",  # Velocidade máxima
+        "-force_key_frames",
+        f"expr:gte(t,n_forced*{settings.INGEST_GOP_SECONDS})",  # GOP curto
+        *settings.ffmpeg_thread_args(),
         "-c:a",
         "aac",
         "-b:a",
         "128k",
         "-movflags",
         "+faststart",
-        output_path,
+        "-f",
+        "mp4",
+        str(partial_path(output_path)),
     ]
 
     try:
-        subprocess.run(
-            cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
-        )
+        run_ffmpeg(cmd, duration=probe_duration(input_path), on_progress=on_progress)
+        # Um input.mp4 só existe completo (um retry nunca lê um arquivo pela metade)
+        os.replace(partial_path(output_path), output_path)
         logger.info(f"✅ Vídeo padronizado: {output_path}")
 
     except subprocess.CalledProcessError as e:
@@ -51,7 +64,16 @@ def standardize_video(input_path: str, output_path: str):
         raise e
 
 
-def ingest_video(source: str, job_folder: str) -> str:
+def index_standardized_video(video_path: str, job_folder: str):
+    """
+    Sonda o input.mp4 uma única vez: índice de keyframes (keyframes.json)
+    e metadados (media.json), usados por todas as etapas seguintes.
+    """
+    keyframes = build_keyframe_index(video_path, os.path.join(job_folder, "keyframes.json"))
+    save_media_info(probe_media(video_path, keyframe_count=len(keyframes)), job_folder)
+
+
+def ingest_video(source: str, job_folder: str, on_progress=None) -> str:
     final_output_path = os.path.join(job_folder, "input.mp4")
 
     # Prefixo para busca
@@ -91,21 +113,24 @@ def ingest_video(source: str, job_folder: str) -> str:
             logger.info(f"📁 Download concluído: {downloaded_file}")
 
             # Converte/Padroniza
-            standardize_video(downloaded_file, final_output_path)
+            standardize_video(downloaded_file, final_output_path, on_progress)
 
             # Limpa o bruto
             if os.path.exists(downloaded_file):
                 os.remove(downloaded_file)
 
+            index_standardized_video(final_output_path, job_folder)
             return final_output_path
 
         except Exception as e:
             logger.error(f"Erro no ingest (YouTube): {e}")
+            # Não deixa o download bruto / input.mp4.part ocupando o volume
+            remove_leftovers(job_folder)
             raise e
 
     # --- CENÁRIO 2: ARQUIVO LOCAL ---
     else:
-        source_path = os.path.join("/app/inputs", source)
+        source_path = os.path.join(settings.INPUTS_DIR, source)
         logger.info(f"📂 Arquivo local: {source_path}")
 
         if not os.path.exists(source_path):
@@ -114,9 +139,12 @@ def ingest_video(source: str, job_folder: str) -> str:
             raise FileNotFoundError(error_msg)
 
         try:
-            standardize_video(source_path, final_output_path)
+            standardize_video(source_path, final_output_path, on_progress)
+            index_standardized_video(final_output_path, job_folder)
             return final_output_path
 
         except Exception as e:
             logger.error(f"Erro no ingest (Local): {e}")
+            # Não deixa o download bruto / input.mp4.part ocupando o volume
+            remove_leftovers(job_folder)
             raise e
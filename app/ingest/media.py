@@ -0,0 +1,162 @@
+import json
+import logging
+import subprocess
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.config.settings import settings
+from app.video.keyframes import load_keyframe_index
+
+logger = logging.getLogger(__name__)
+
+MEDIA_FILE = "media.json"
+
+
+@dataclass
+class MediaInfo:
+    """Metadados do input.mp4, lidos uma única vez no ingest (media.json)."""
+    width: int
+    height: int
+    fps: float
+    duration: float
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    rotation: int = 0
+    audio_channels: int = 0
+    audio_sample_rate: int = 0
+    channel_layout: Optional[str] = None
+    keyframe_count: int = 0
+
+    @property
+    def dims(self):
+        return self.width, self.height
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+
+def _parse_rate(rate: str) -> float:
+    """'30000/1001' -> 29.97"""
+    try:
+        num, _, den = rate.partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _stream_rotation(stream: dict) -> int:
+    rotate = stream.get("tags", {}).get("rotate")
+    if rotate is not None:
+        return int(float(rotate))
+    for side_data in stream.get("side_data_list", []):
+        if "rotation" in side_data:
+            return int(float(side_data["rotation"]))
+    return 0
+
+
+def probe_media(video_path: str, keyframe_count: int = 0) -> MediaInfo:
+    """Um único ffprobe com streams + format."""
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_streams",
+        "-show_format",
+        "-of",
+        "json",
+        str(video_path),
+    ]
+
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Erro ffprobe: {e.stderr}")
+        raise e
+
+    data = json.loads(result.stdout)
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    if video is None:
+        raise ValueError(f"Nenhum stream de vídeo em: {video_path}")
+
+    width = int(video.get("width", 0))
+    height = int(video.get("height", 0))
+    rotation = _stream_rotation(video)
+
+    # Dimensões de exibição (90/270 graus trocam largura e altura)
+    if abs(rotation) % 180 == 90:
+        width, height = height, width
+
+    duration = float(data.get("format", {}).get("duration") or video.get("duration") or 0)
+
+    return MediaInfo(
+        width=width,
+        height=height,
+        fps=_parse_rate(video.get("avg_frame_rate") or video.get("r_frame_rate", "0/1")),
+        duration=duration,
+        video_codec=video.get("codec_name"),
+        audio_codec=audio.get("codec_name") if audio else None,
+        rotation=rotation,
+        audio_channels=int(audio.get("channels", 0)) if audio else 0,
+        audio_sample_rate=int(audio.get("sample_rate", 0)) if audio else 0,
+        channel_layout=audio.get("channel_layout") if audio else None,
+        keyframe_count=keyframe_count,
+    )
+
+
+def probe_duration(video_path: str) -> Optional[float]:
+    """Só a duração (s) do container; usada para calcular progresso."""
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "default=noprint_wrappers=1:nokey=1",
+        str(video_path),
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        return float(result.stdout.strip())
+    except (subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def save_media_info(info: MediaInfo, job_folder) -> Path:
+    path = Path(job_folder) / MEDIA_FILE
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(asdict(info), f, indent=2)
+    logger.info(
+        f"🎞️  media.json: {info.width}x{info.height} @ {info.fps:.2f}fps, {info.duration:.1f}s"
+    )
+    return path
+
+
+def load_media_info(job_folder) -> Optional[MediaInfo]:
+    path = Path(job_folder) / MEDIA_FILE
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return MediaInfo(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def get_media_info(job_id: str) -> MediaInfo:
+    """
+    Accessor usado pelas etapas: lê o media.json do job.
+    Jobs anteriores ao cache são sondados uma vez e o resultado é salvo.
+    """
+    job_folder = settings.get_job_path(job_id)
+    info = load_media_info(job_folder)
+    if info is None:
+        keyframes = load_keyframe_index(job_folder) or []
+        info = probe_media(str(job_folder / "input.mp4"), keyframe_count=len(keyframes))
+        save_media_info(info, job_folder)
+    return info
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Tuple
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Uploads ficam em INPUTS_DIR/uploads/<sha256><ext>: o mesmo conteúdo vira o
+# mesmo arquivo (deduplicado) e nomes iguais de vídeos diferentes não se sobrescrevem
+UPLOADS_DIR = "uploads"
+
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def upload_source(content_hash: str, filename: str) -> str:
+    """Fonte (relativa ao INPUTS_DIR) que o job recebe para um upload."""
+    ext = Path(filename).suffix.lower() or ".mp4"
+    return f"{UPLOADS_DIR}/{content_hash}{ext}"
+
+
+def store_upload(fileobj: BinaryIO, filename: str) -> Tuple[str, str]:
+    """
+    Grava o upload em blocos calculando o sha256 no caminho. Retorna
+    (fonte relativa ao INPUTS_DIR, hash). Se o conteúdo já existe, o
+    arquivo temporário é descartado e o existente é reaproveitado.
+    """
+    uploads_dir = settings.INPUTS_DIR / UPLOADS_DIR
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    fd, tmp_name = tempfile.mkstemp(dir=uploads_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+
+        content_hash = digest.hexdigest()
+        source = upload_source(content_hash, filename)
+        final_path = settings.INPUTS_DIR / source
+
+        if final_path.exists():
+            logger.info(f"♻️ Upload '{filename}' já existe como {source}; reaproveitando.")
+            os.unlink(tmp_name)
+        else:
+            os.replace(tmp_name, final_path)
+            logger.info(f"📥 Upload '{filename}' salvo como {source}")
+        return source, content_hash
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def store_local_file(path: Path) -> Tuple[str, str]:
+    """
+    Versão de store_upload para um arquivo já no volume de inputs (pasta
+    monitorada): só calcula o hash e cria um hardlink em uploads/, sem copiar.
+    """
+    path = Path(path)
+    uploads_dir = settings.INPUTS_DIR / UPLOADS_DIR
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+
+    content_hash = digest.hexdigest()
+    source = upload_source(content_hash, path.name)
+    final_path = settings.INPUTS_DIR / source
+
+    if not final_path.exists():
+        try:
+            os.link(path, final_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            # Outro filesystem: hardlink impossível, copia
+            shutil.copy2(path, final_path)
+    return source, content_hash
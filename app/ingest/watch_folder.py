@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from app.config.settings import settings
+from app.ingest.uploads import store_local_file
+from app.jobs.admission import submit_job
+from app.storage.catalog import FINAL_STATUSES, get_job
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".webm", ".avi", ".m4v")
+OPTIONS_FILE = "options.json"
+
+
+def is_video_file(path: Path) -> bool:
+    return path.suffix.lower() in VIDEO_EXTENSIONS and not path.name.startswith(".")
+
+
+def folder_options(path: Path) -> dict:
+    """options.json da pasta do arquivo (ou da pasta pai mais próxima, até WATCH_DIR)."""
+    folder = path.parent
+    while True:
+        options_file = folder / OPTIONS_FILE
+        if options_file.exists():
+            try:
+                return json.loads(options_file.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ {options_file} inválido: {e}")
+                return {}
+        if folder == settings.WATCH_DIR or folder == folder.parent:
+            return {}
+        folder = folder.parent
+
+
+def move_aside(path: Path, target_dir: Path, note: Optional[str] = None):
+    """Move o vídeo para processed/ ou failed/, mantendo a subpasta relativa a WATCH_DIR."""
+    try:
+        relative = path.relative_to(settings.WATCH_DIR)
+    except ValueError:
+        relative = Path(path.name)
+    target = target_dir / relative
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        shutil.move(str(path), str(target))
+    if note:
+        target.with_name(target.name + ".error.txt").write_text(note, encoding="utf-8")
+
+
+class _Handler(FileSystemEventHandler):
+    """Só anota os caminhos; a decisão de quando enviar fica no laço principal."""
+
+    def __init__(self, watcher: "FolderWatcher"):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notice(Path(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notice(Path(event.src_path))
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notice(Path(event.dest_path))
+
+
+class FolderWatcher:
+    """
+    Pasta monitorada: cada vídeo que para de crescer por WATCH_STABLE_SECONDS
+    vira um job. No máximo WATCH_MAX_INFLIGHT jobs da pasta ficam em andamento;
+    o resto espera no disco (e não no Redis). Ao terminar, o vídeo vai para
+    processed/ ou failed/.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # caminho -> (tamanho, mtime, desde quando está parado)
+        self.pending: Dict[Path, Tuple[int, float, float]] = {}
+        # caminho -> job_id
+        self.inflight: Dict[Path, str] = {}
+
+    def notice(self, path: Path):
+        if not is_video_file(path):
+            return
+        with self.lock:
+            if path not in self.inflight:
+                self.pending.setdefault(path, (-1, 0.0, time.time()))
+
+    def scan_existing(self):
+        """Arquivos largados enquanto o serviço estava parado."""
+        for root, _, files in os.walk(settings.WATCH_DIR):
+            for name in sorted(files):
+                self.notice(Path(root) / name)
+
+    def stable_files(self):
+        """Atualiza tamanho/mtime dos pendentes e devolve os que pararam de mudar."""
+        now = time.time()
+        ready = []
+        with self.lock:
+            for path, (size, mtime, since) in list(self.pending.items()):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    del self.pending[path]
+                    continue
+                if (st.st_size, st.st_mtime) != (size, mtime):
+                    self.pending[path] = (st.st_size, st.st_mtime, now)
+                elif st.st_size > 0 and now - since >= settings.WATCH_STABLE_SECONDS:
+                    ready.append((since, path))
+        # Os mais antigos primeiro
+        return [path for _, path in sorted(ready)]
+
+    def submit(self, path: Path):
+        try:
+            source, source_hash = store_local_file(path)
+            options = {**folder_options(path), "source_hash": source_hash, "source_name": path.name}
+            decision = submit_job(source, options)
+        except Exception as e:
+            logger.error(f"❌ Falha ao enviar {path}: {e}")
+            with self.lock:
+                self.pending.pop(path, None)
+            move_aside(path, settings.WATCH_FAILED_DIR, str(e))
+            return
+
+        with self.lock:
+            self.pending.pop(path, None)
+            if decision.status == "rejected":
+                logger.warning(f"⛔ {path.name} recusado: {decision.reason}")
+                move_aside(path, settings.WATCH_FAILED_DIR, decision.reason)
+                return
+            self.inflight[path] = decision.job_id
+        logger.info(f"📂 {path.name} -> job {decision.job_id} ({decision.status})")
+
+    def collect_finished(self):
+        """Tira da lista os jobs que terminaram e move os vídeos de acordo."""
+        for path, job_id in list(self.inflight.items()):
+            job = get_job(job_id)
+            status = job["status"] if job else "done"
+            if status not in FINAL_STATUSES:
+                continue
+            with self.lock:
+                del self.inflight[path]
+            if status in ("done", "planned", "partial"):
+                # Parcial: os clipes que saíram ficam no job, o erro vai junto do vídeo
+                note = (job or {}).get("error") if status == "partial" else None
+                move_aside(path, settings.WATCH_PROCESSED_DIR, note)
+                logger.info(f"✅ {path.name} processado (job {job_id}, {status}).")
+            else:
+                move_aside(path, settings.WATCH_FAILED_DIR, (job or {}).get("error") or status)
+                logger.warning(f"❌ {path.name} terminou como '{status}' (job {job_id}).")
+
+    def tick(self):
+        self.collect_finished()
+        free_slots = settings.WATCH_MAX_INFLIGHT - len(self.inflight)
+        if free_slots <= 0:
+            return
+        for path in self.stable_files()[:free_slots]:
+            self.submit(path)
+
+    def run(self):
+        settings.WATCH_DIR.mkdir(parents=True, exist_ok=True)
+        observer = Observer()
+        observer.schedule(_Handler(self), str(settings.WATCH_DIR), recursive=True)
+        observer.start()
+        self.scan_existing()
+        logger.info(
+            f"👀 Monitorando {settings.WATCH_DIR} "
+            f"(até {settings.WATCH_MAX_INFLIGHT} jobs em andamento)"
+        )
+        try:
+            while True:
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error(f"Erro na pasta monitorada: {e}")
+                time.sleep(settings.WATCH_POLL_INTERVAL)
+        finally:
+            observer.stop()
+            observer.join()
@@ -0,0 +1,445 @@
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Optional
+
+from app.config.settings import settings
+from app.jobs.coalesce import claim_submission, claim_upstream, release_keys, upstream_owner
+from app.jobs.progress import update_progress
+from app.storage.catalog import jobs_with_source, record_submission, update_job
+
+logger = logging.getLogger(__name__)
+
+# Custo em andamento: job_id -> {"cost", "expires_at"} (expira se o job sumir sem liberar)
+INFLIGHT_KEY = "admission:inflight"
+# Jobs adiados por falta de capacidade (FIFO), admitidos quando outro termina
+DEFERRED_KEY = "admission:deferred"
+LOCK_KEY = "admission:lock"
+# Capacidade anunciada por cada host (supervisor): hostname -> {"capacity", "expires_at"}
+HOSTS_KEY = "admission:hosts"
+
+# Tempo de parede por segundo de mídia quando ainda não há métricas suficientes
+DEFAULT_REAL_TIME_FACTORS = {
+    "ingest": 0.3,
+    "audio": 0.02,
+    "transcribe": 0.6,
+    "segment": 0.005,
+    "render": 0.5,
+}
+# Execuções mínimas de uma etapa antes de confiar no agregado do Prometheus
+MIN_OBSERVED_RUNS = 5
+
+
+@dataclass
+class AdmissionDecision:
+    """Resultado da admissão: status accepted | deferred | rejected."""
+    job_id: str
+    status: str
+    priority: str = "normal"
+    duration: Optional[float] = None
+    cost: float = 0.0
+    timeouts: Dict[str, int] = field(default_factory=dict)
+    reason: str = ""
+
+    @property
+    def accepted(self) -> bool:
+        return self.status == "accepted"
+
+    def to_options(self) -> dict:
+        """Parte que viaja com as opções do job (prioridade e timeouts das etapas)."""
+        return {"priority": self.priority, "timeouts": self.timeouts, "cost": self.cost}
+
+
+def is_remote_source(source: str) -> bool:
+    return source.startswith(("http://", "https://", "www."))
+
+
+def probe_source_duration(source: str) -> Optional[float]:
+    """
+    Duração da fonte sem baixar nada: metadados do yt-dlp para URLs e
+    ffprobe para uploads. None se não for possível descobrir.
+    """
+    if is_remote_source(source):
+        import yt_dlp
+
+        try:
+            with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True, "skip_download": True}) as ydl:
+                info = ydl.extract_info(source, download=False)
+            duration = info.get("duration") if info else None
+            return float(duration) if duration else None
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível sondar {source}: {e}")
+            return None
+
+    from app.ingest.media import probe_duration
+
+    path = os.path.join(settings.INPUTS_DIR, source)
+    if not os.path.exists(path):
+        return None
+    return probe_duration(path)
+
+
+def real_time_factors() -> Dict[str, float]:
+    """Fator de tempo real por etapa: observado (agregado no Redis) ou o padrão."""
+    factors = dict(DEFAULT_REAL_TIME_FACTORS)
+    try:
+        from app.jobs.metrics import load_aggregate
+
+        for stage, values in load_aggregate().items():
+            if stage in factors and values.get("runs", 0) >= MIN_OBSERVED_RUNS and values.get("media_seconds"):
+                factors[stage] = values.get("wall_seconds", 0) / values["media_seconds"]
+    except Exception as e:
+        logger.warning(f"⚠️ Métricas indisponíveis, usando fatores padrão: {e}")
+    return factors
+
+
+def _clamp_timeout(seconds: float) -> int:
+    return int(min(settings.MAX_JOB_TIMEOUT, max(settings.MIN_JOB_TIMEOUT, seconds)))
+
+
+def plan_admission(
+    job_id: str,
+    duration: Optional[float],
+    options: dict,
+    shared_upstream: bool = False,
+    capacity: Optional[float] = None,
+) -> AdmissionDecision:
+    """
+    Estima o custo (segundos de trabalho de worker) a partir da duração e
+    das opções, e define prioridade e timeout proporcional de cada etapa.
+    Duração desconhecida é tratada como vídeo longo (fila :low).
+    Com shared_upstream (anexado a outro job da mesma fonte) ingest, audio e
+    transcribe não custam nada.
+    capacity: capacidade atual do cluster (padrão: ADMISSION_CAPACITY de um host).
+    Um job maior que ela não é recusado: vai para :low e espera rodar sozinho.
+    Só ADMISSION_MAX_COST recusa.
+    """
+    if capacity is None:
+        capacity = settings.ADMISSION_CAPACITY
+
+    if duration is None:
+        duration = settings.LOW_PRIORITY_MIN_DURATION
+
+    factors = real_time_factors()
+    n_profiles = max(1, len(options.get("profiles") or []))
+
+    # Os cortes cobrem no máximo o vídeo inteiro; cada perfil extra é mais uma saída
+    stage_costs = {stage: factors[stage] * duration for stage in ("ingest", "audio", "transcribe", "segment")}
+    stage_costs["render"] = factors["render"] * duration * n_profiles
+    if options.get("dry_run"):
+        # Dry run para depois da segmentação (o timeout de render continua valendo para a seleção)
+        render_cost = 0.0
+    else:
+        render_cost = stage_costs["render"]
+    if shared_upstream:
+        cost = stage_costs["segment"] + render_cost
+    else:
+        cost = sum(c for stage, c in stage_costs.items() if stage != "render") + render_cost
+
+    margin = settings.ADMISSION_TIMEOUT_MARGIN
+    timeouts = {stage: _clamp_timeout(c * margin) for stage, c in stage_costs.items() if stage != "render"}
+    # Cada job de render é um corte só (no máximo max_duration segundos)
+    clip_seconds = float(options.get("max_duration", 60))
+    timeouts["render"] = _clamp_timeout(factors["render"] * clip_seconds * n_profiles * margin)
+    timeouts["finalize"] = settings.MIN_JOB_TIMEOUT
+
+    if duration <= settings.HIGH_PRIORITY_MAX_DURATION:
+        priority = "high"
+    elif duration >= settings.LOW_PRIORITY_MIN_DURATION or (capacity and cost > capacity):
+        priority = "low"
+    else:
+        priority = "normal"
+
+    decision = AdmissionDecision(
+        job_id=job_id,
+        status="accepted",
+        priority=priority,
+        duration=duration,
+        cost=round(cost, 1),
+        timeouts=timeouts,
+    )
+
+    if settings.ADMISSION_MAX_COST and cost > settings.ADMISSION_MAX_COST:
+        decision.status = "rejected"
+        decision.reason = (
+            f"Custo estimado ({cost / 60:.0f} min de processamento) excede o limite "
+            f"por job ({settings.ADMISSION_MAX_COST / 60:.0f} min)."
+        )
+    elif capacity and cost > capacity:
+        decision.reason = (
+            f"Custo estimado ({cost / 60:.0f} min) maior que a capacidade ({capacity / 60:.0f} min): "
+            f"o job roda sozinho, quando nada mais estiver em andamento."
+        )
+
+    return decision
+
+
+def _redis(connection=None):
+    if connection is not None:
+        return connection
+    from app.config.queue import get_redis
+    return get_redis()
+
+
+def inflight_cost(r) -> float:
+    """Soma o custo dos jobs em andamento, descartando reservas expiradas."""
+    now = time.time()
+    total = 0.0
+    for job_id, raw in r.hgetall(INFLIGHT_KEY).items():
+        entry = json.loads(raw)
+        if entry["expires_at"] < now:
+            r.hdel(INFLIGHT_KEY, job_id)
+            continue
+        total += entry["cost"]
+    return total
+
+
+def announce_host(connection=None, hostname: Optional[str] = None):
+    """
+    Chamado periodicamente pelo supervisor de cada máquina: soma a capacidade
+    dela (ADMISSION_CAPACITY) à do cluster até ADMISSION_HOST_TTL sem anunciar.
+    """
+    r = _redis(connection)
+    entry = {"capacity": settings.ADMISSION_CAPACITY, "expires_at": time.time() + settings.ADMISSION_HOST_TTL}
+    r.hset(HOSTS_KEY, hostname or socket.gethostname(), json.dumps(entry))
+
+
+def withdraw_host(connection=None, hostname: Optional[str] = None):
+    """Supervisor encerrando: a capacidade da máquina sai do cluster na hora."""
+    _redis(connection).hdel(HOSTS_KEY, hostname or socket.gethostname())
+
+
+def cluster_capacity(r) -> float:
+    """
+    Soma da capacidade dos hosts vivos. Sem nenhum supervisor anunciando
+    (execução local), vale ADMISSION_CAPACITY de um host. 0 = sem limite.
+    """
+    if not settings.ADMISSION_CAPACITY:
+        return 0.0
+    now = time.time()
+    total = 0.0
+    for hostname, raw in r.hgetall(HOSTS_KEY).items():
+        entry = json.loads(raw)
+        if entry["expires_at"] < now:
+            r.hdel(HOSTS_KEY, hostname)
+            continue
+        total += entry["capacity"]
+    return total or settings.ADMISSION_CAPACITY
+
+
+def _fits(r, cost: float) -> bool:
+    capacity = cluster_capacity(r)
+    if not capacity:
+        return True
+    inflight = inflight_cost(r)
+    if cost > capacity:
+        # Maior que o cluster inteiro: só entra com tudo livre (e segura os outros enquanto roda)
+        return inflight == 0
+    return inflight + cost <= capacity
+
+
+def _reserve(r, decision: AdmissionDecision):
+    # Reserva expira depois do pior caso (todas as etapas no timeout)
+    expires_at = time.time() + sum(decision.timeouts.values())
+    r.hset(INFLIGHT_KEY, decision.job_id, json.dumps({"cost": decision.cost, "expires_at": expires_at}))
+
+
+def cached_upstream(source: str) -> Optional[str]:
+    """Job terminado (catálogo) que ainda tem input.mp4 e transcrição íntegros desta fonte."""
+    from app.jobs.manifest import stage_completed_at
+
+    for job_id in jobs_with_source(source):
+        job_folder = settings.JOBS_DIR / job_id
+        if not all((job_folder / name).exists() for name in ("input.mp4", "transcript.json")):
+            continue
+        if stage_completed_at(job_id, "transcribe") is not None:
+            return job_id
+    return None
+
+
+def _enqueue(decision: AdmissionDecision, source: str, options: dict, connection, render_indices=None):
+    from app.jobs.pipeline import enqueue_pipeline, enqueue_renders
+
+    if render_indices is not None:
+        # Cortes escolhidos num plano: só os renders (as opções já têm a admissão do envio)
+        enqueue_renders(decision.job_id, len(render_indices), options, connection=connection, indices=render_indices)
+        return
+
+    options = {**options, "admission": decision.to_options()}
+    # Dry run de uma fonte já transcrita: reaproveita o vídeo e a transcrição do job anterior
+    upstream_job_id = cached_upstream(source) if options.get("dry_run") else None
+    if upstream_job_id is None:
+        # Outro job já roda ingest/audio/transcribe desta fonte: anexa nele
+        upstream_job_id = claim_upstream(connection, source, decision.job_id)
+    enqueue_pipeline(source, decision.job_id, options, connection=connection, upstream_job_id=upstream_job_id)
+
+
+def submit_job(
+    source: str,
+    options: dict = None,
+    job_id: str = None,
+    connection=None,
+    duration: Optional[float] = None,
+) -> AdmissionDecision:
+    """
+    Ponto de entrada de UI / CLI: sonda a fonte, estima o custo e enfileira
+    (accepted), adia até haver capacidade (deferred) ou recusa (rejected).
+    duration: já sondada por quem chama (envio em lote sonda em paralelo).
+    """
+    if not job_id:
+        job_id = str(uuid.uuid4())
+    if options is None:
+        options = {}
+
+    r = _redis(connection)
+
+    # Duplo clique / mesmo vídeo com as mesmas opções: devolve o job em andamento
+    existing = claim_submission(r, source, options, job_id)
+    if existing:
+        logger.info(f"♻️ [JOB {existing}] Envio idêntico em andamento; reaproveitando.")
+        return AdmissionDecision(job_id=existing, status="coalesced", reason="Job idêntico já está na fila ou rodando.")
+
+    if not settings.ADMISSION_ENABLED:
+        decision = AdmissionDecision(job_id=job_id, status="accepted")
+        record_submission(job_id, source, options)
+        _enqueue(decision, source, options, r)
+        return decision
+
+    if duration is None:
+        duration = probe_source_duration(source)
+    shared = upstream_owner(r, source) is not None or (
+        bool(options.get("dry_run")) and cached_upstream(source) is not None
+    )
+    decision = plan_admission(job_id, duration, options, shared_upstream=shared, capacity=cluster_capacity(r))
+
+    if decision.status == "rejected":
+        logger.warning(f"⛔ [JOB {job_id}] Recusado: {decision.reason}")
+        release_keys(job_id, r)
+        return decision
+
+    # Registrado antes de enfileirar: a primeira etapa pode terminar antes deste retorno
+    record_submission(job_id, source, options)
+
+    with r.lock(LOCK_KEY, timeout=30, blocking_timeout=10):
+        # Adiados têm a vez: um job novo não fura a fila de espera
+        if r.llen(DEFERRED_KEY) == 0 and _fits(r, decision.cost):
+            _reserve(r, decision)
+            _enqueue(decision, source, options, r)
+        else:
+            decision.status = "deferred"
+            decision.reason = decision.reason or "Servidor na capacidade máxima; o job entra quando outro terminar."
+            update_job(job_id, "deferred")
+            position = r.rpush(DEFERRED_KEY, json.dumps({
+                "source": source,
+                "options": options,
+                "decision": asdict(decision),
+            }))
+            update_progress(job_id, 0, f"⏳ Aguardando capacidade do servidor (posição {position} na espera)...")
+
+    logger.info(
+        f"🎫 [JOB {job_id}] {decision.status} | prioridade {decision.priority} | "
+        f"duração {decision.duration or 0:.0f}s | custo ~{decision.cost:.0f}s"
+    )
+    return decision
+
+
+def submit_renders(job_id: str, indices: list, options: dict, cost: float, connection=None) -> AdmissionDecision:
+    """
+    Render dos cortes escolhidos num plano (o dry run já devolveu a capacidade):
+    reserva o custo estimado e enfileira, ou adia, como um envio normal.
+    """
+    r = _redis(connection)
+    admission = (options or {}).get("admission", {})
+    render_timeout = admission.get("timeouts", {}).get("render", settings.RENDER_JOB_TIMEOUT)
+    decision = AdmissionDecision(
+        job_id=job_id,
+        status="accepted",
+        priority=admission.get("priority", "normal"),
+        cost=round(cost, 1),
+        # Só para a validade da reserva: pior caso com os renders um depois do outro
+        timeouts={"render": render_timeout * len(indices), "finalize": settings.MIN_JOB_TIMEOUT},
+    )
+
+    if not settings.ADMISSION_ENABLED:
+        update_job(job_id, "queued", stage="render")
+        _enqueue(decision, None, options, r, indices)
+        return decision
+
+    with r.lock(LOCK_KEY, timeout=30, blocking_timeout=10):
+        if r.llen(DEFERRED_KEY) == 0 and _fits(r, decision.cost):
+            update_job(job_id, "queued", stage="render")
+            _reserve(r, decision)
+            _enqueue(decision, None, options, r, indices)
+        else:
+            decision.status = "deferred"
+            decision.reason = "Servidor na capacidade máxima; os renders entram quando outro job terminar."
+            update_job(job_id, "deferred", stage="render")
+            position = r.rpush(DEFERRED_KEY, json.dumps({
+                "source": None,
+                "options": options,
+                "decision": asdict(decision),
+                "render_indices": indices,
+            }))
+            update_progress(job_id, 70, f"⏳ Aguardando capacidade do servidor (posição {position} na espera)...")
+
+    logger.info(
+        f"🎫 [JOB {job_id}] Seleção do plano {decision.status}: {len(indices)} cortes, custo ~{decision.cost:.0f}s"
+    )
+    return decision
+
+
+def admit_deferred(connection=None) -> int:
+    """Enfileira os adiados (em ordem) enquanto houver capacidade. Retorna quantos entraram."""
+    r = _redis(connection)
+    admitted = 0
+
+    with r.lock(LOCK_KEY, timeout=30, blocking_timeout=10):
+        while True:
+            raw = r.lindex(DEFERRED_KEY, 0)
+            if raw is None:
+                break
+
+            entry = json.loads(raw)
+            decision = AdmissionDecision(**entry["decision"])
+            if not _fits(r, decision.cost):
+                break
+
+            r.lpop(DEFERRED_KEY)
+            decision.status = "accepted"
+            update_job(decision.job_id, "queued")
+            _reserve(r, decision)
+            _enqueue(decision, entry["source"], entry["options"], r, entry.get("render_indices"))
+            admitted += 1
+            logger.info(f"🎫 [JOB {decision.job_id}] Admitido da fila de espera.")
+
+    return admitted
+
+
+def drop_deferred(job_id: str, connection=None) -> bool:
+    """Tira o job da fila de espera (cancelamento antes de ser admitido)."""
+    r = _redis(connection)
+    with r.lock(LOCK_KEY, timeout=30, blocking_timeout=10):
+        for raw in r.lrange(DEFERRED_KEY, 0, -1):
+            if json.loads(raw)["decision"]["job_id"] == job_id:
+                return bool(r.lrem(DEFERRED_KEY, 1, raw))
+    return False
+
+
+def release_job(job_id: str, connection=None):
+    """Libera a capacidade do job (fim ou falha) e admite os que estavam esperando."""
+    r = _redis(connection)
+    if r.hdel(INFLIGHT_KEY, job_id):
+        admit_deferred(r)
+
+
+def deferred_position(job_id: str, connection=None) -> Optional[int]:
+    """Posição (1 = próximo) do job na fila de espera, ou None."""
+    r = _redis(connection)
+    for i, raw in enumerate(r.lrange(DEFERRED_KEY, 0, -1)):
+        if json.loads(raw)["decision"]["job_id"] == job_id:
+            return i + 1
+    return None
@@ -0,0 +1,156 @@
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config.settings import settings
+from app.jobs.admission import is_remote_source, probe_source_duration, submit_job
+from app.jobs.progress import get_progress_many
+from app.storage.catalog import FINAL_STATUSES, get_job
+
+logger = logging.getLogger(__name__)
+
+# Sondagens (yt-dlp / ffprobe) em paralelo: são quase só espera de rede / disco
+PROBE_WORKERS = 8
+STATUS_REFRESH_INTERVAL = 2.0
+
+
+@dataclass
+class BatchEntry:
+    """Uma linha do manifesto de lote."""
+    line: int
+    source: str
+    options: Dict = field(default_factory=dict)
+    duration: Optional[float] = None
+    job_id: Optional[str] = None
+    status: str = "pending"
+    error: Optional[str] = None
+
+
+def _parse_value(value: str):
+    # Colunas do CSV aceitam JSON ("true", "45", "[\"vertical\"]"); o resto fica como texto
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def read_batch_file(path: Path) -> List[BatchEntry]:
+    """
+    Lê o manifesto: CSV com uma coluna 'source' (as demais são opções) ou
+    JSONL com {"source": ..., "options": {...}} (ou as opções no próprio objeto).
+    """
+    path = Path(path)
+    entries = []
+
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                source = (row.pop("source", None) or "").strip()
+                options = {k: _parse_value(v) for k, v in row.items() if k and v not in (None, "")}
+                entries.append(BatchEntry(line=line, source=source, options=options))
+        return entries
+
+    with open(path, encoding="utf-8") as f:
+        for line, raw in enumerate(f, start=1):
+            raw = raw.strip()
+            if not raw or raw.startswith("#"):
+                continue
+            try:
+                obj = json.loads(raw)
+            except ValueError as e:
+                entries.append(BatchEntry(line=line, source="", status="invalid", error=f"JSON inválido: {e}"))
+                continue
+            source = str(obj.pop("source", "")).strip()
+            options = obj.pop("options", None) or obj
+            entries.append(BatchEntry(line=line, source=source, options=options))
+    return entries
+
+
+def validate_entry(entry: BatchEntry) -> bool:
+    if entry.status == "invalid":
+        return False
+    if not entry.source:
+        entry.status, entry.error = "invalid", "linha sem 'source'"
+    elif not isinstance(entry.options, dict):
+        entry.status, entry.error = "invalid", "'options' precisa ser um objeto"
+    elif not is_remote_source(entry.source) and not os.path.exists(os.path.join(settings.INPUTS_DIR, entry.source)):
+        entry.status, entry.error = "invalid", f"arquivo não encontrado em {settings.INPUTS_DIR}"
+    return entry.status != "invalid"
+
+
+def probe_entries(entries: List[BatchEntry]):
+    """Sonda as durações em paralelo (a admissão não precisa sondar de novo)."""
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+        for entry, duration in zip(entries, pool.map(lambda e: probe_source_duration(e.source), entries)):
+            entry.duration = duration
+
+
+def submit_batch(entries: List[BatchEntry], connection=None) -> List[BatchEntry]:
+    """Valida, sonda em paralelo e envia as linhas válidas (na ordem do arquivo)."""
+    valid = [e for e in entries if validate_entry(e)]
+    probe_entries(valid)
+
+    for entry in valid:
+        try:
+            decision = submit_job(entry.source, entry.options, connection=connection, duration=entry.duration)
+        except Exception as e:
+            entry.status, entry.error = "error", str(e)
+            logger.error(f"❌ Linha {entry.line}: falha ao enviar {entry.source}: {e}")
+            continue
+        entry.job_id = decision.job_id
+        entry.status = decision.status
+        if decision.status == "rejected":
+            entry.error = decision.reason
+    return entries
+
+
+def refresh_status(entries: List[BatchEntry], connection=None):
+    """Status final vem do catálogo; % e mensagem do Redis, num único pipeline."""
+    active = [e for e in entries if e.job_id and e.status not in (*FINAL_STATUSES, "rejected")]
+    if not active:
+        return
+    snapshots = get_progress_many([e.job_id for e in active], connection)
+    for entry in active:
+        job = get_job(entry.job_id)
+        if job and job["status"] in FINAL_STATUSES:
+            entry.status = job["status"]
+            entry.error = job.get("error")
+            continue
+        snapshot = snapshots.get(entry.job_id)
+        if snapshot:
+            entry.status = f"{snapshot.get('progress', 0)}% {snapshot.get('status', '')}"[:40]
+
+
+def format_table(entries: List[BatchEntry]) -> str:
+    lines = [f"{'LINHA':>5}  {'JOB':<10}  {'STATUS':<40}  FONTE"]
+    for e in entries:
+        job = (e.job_id or "-")[:8]
+        status = e.status if not e.error else f"{e.status}: {e.error}"
+        lines.append(f"{e.line:>5}  {job:<10}  {status[:40]:<40}  {e.source[:60]}")
+
+    counts: Dict[str, int] = {}
+    for e in entries:
+        key = e.status if e.status in (*FINAL_STATUSES, "rejected", "invalid", "error") else "running"
+        counts[key] = counts.get(key, 0) + 1
+    lines.append("  ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+    return "\n".join(lines)
+
+
+def is_batch_finished(entries: List[BatchEntry]) -> bool:
+    return all(not e.job_id or e.status in (*FINAL_STATUSES, "rejected") for e in entries)
+
+
+def watch_batch(entries: List[BatchEntry], connection=None, interval: float = STATUS_REFRESH_INTERVAL):
+    """Reimprime a tabela até todos os jobs do lote terminarem."""
+    while True:
+        refresh_status(entries, connection)
+        print("\033[2J\033[H" + format_table(entries), flush=True)
+        if is_batch_finished(entries):
+            return
+        time.sleep(interval)
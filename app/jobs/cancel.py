@@ -0,0 +1,133 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+
+from app.config.queue import get_redis
+from app.jobs.pipeline import STAGE_ROLES, stage_job_id
+from app.jobs.progress import status_key, update_progress
+from app.segment.segmenter import load_segments
+
+logger = logging.getLogger(__name__)
+
+CANCEL_TTL = 24 * 3600
+
+# Intervalo mínimo entre duas consultas ao Redis pelo mesmo job (os loops
+# de frames chamam raise_if_cancelled milhares de vezes por segundo)
+CHECK_INTERVAL = 0.5
+
+# Job da etapa em execução, definido pelo worker (como o profiling_scope)
+_current_job: ContextVar[Optional[str]] = ContextVar("cancellation_job", default=None)
+
+_last_check = {}
+
+
+class JobCancelled(Exception):
+    """O usuário cancelou o job; a etapa deve parar o quanto antes."""
+
+
+def cancel_key(job_id: str) -> str:
+    return f"job_cancel:{job_id}"
+
+
+def is_cancelled(job_id: str, force: bool = False) -> bool:
+    """Consulta a flag (no máximo a cada CHECK_INTERVAL, a não ser com force)."""
+    now = time.monotonic()
+    cached = _last_check.get(job_id)
+    if not force and cached and now - cached[0] < CHECK_INTERVAL:
+        return cached[1]
+
+    try:
+        cancelled = bool(get_redis().exists(cancel_key(job_id)))
+    except Exception as e:
+        logger.error(f"Erro ao consultar cancelamento: {e}")
+        cancelled = False
+
+    _last_check[job_id] = (now, cancelled)
+    return cancelled
+
+
+def current_job_id() -> Optional[str]:
+    return _current_job.get()
+
+
+def raise_if_cancelled(job_id: str = None):
+    """Ponto de checagem dos loops (frases, frames, clipes)."""
+    job_id = job_id or _current_job.get()
+    if job_id and is_cancelled(job_id):
+        raise JobCancelled(f"Job {job_id} cancelado")
+
+
+@contextmanager
+def cancellation_scope(job_id: str):
+    """Marca a etapa como pertencente ao job; já falha se ele foi cancelado."""
+    if is_cancelled(job_id, force=True):
+        raise JobCancelled(f"Job {job_id} cancelado")
+
+    token = _current_job.set(job_id)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+        _last_check.pop(job_id, None)
+
+
+def clear_cancel(job_id: str, connection=None):
+    """Remove a flag (ex: re-estilizar um job que tinha sido cancelado)."""
+    r = connection or get_redis()
+    r.delete(cancel_key(job_id))
+    r.hdel(status_key(job_id), "cancelled")
+    _last_check.pop(job_id, None)
+
+
+def _cancel_queued_jobs(job_id: str, connection) -> int:
+    """Cancela os jobs RQ do job que ainda não começaram."""
+    ids = [stage_job_id(job_id, stage) for stage in STAGE_ROLES if stage != "render"]
+
+    # Renders só existem depois do segment (um por corte do segments.json)
+    try:
+        ids += [stage_job_id(job_id, "render", i) for i in range(1, len(load_segments(job_id)) + 1)]
+    except (OSError, ValueError):
+        pass
+
+    cancelled = 0
+    for rq_id in ids:
+        try:
+            job = Job.fetch(rq_id, connection=connection)
+        except NoSuchJobError:
+            continue
+        if job.get_status() in (JobStatus.QUEUED, JobStatus.DEFERRED, JobStatus.SCHEDULED):
+            job.cancel()
+            cancelled += 1
+    return cancelled
+
+
+def request_cancel(job_id: str, connection=None) -> int:
+    """
+    Cancela o job: levanta a flag (etapas em execução param no próximo ponto
+    de checagem e o ffmpeg em andamento é terminado), cancela os jobs RQ
+    ainda na fila e libera capacidade / chaves de coalescência.
+    Retorna quantos jobs RQ foram tirados da fila.
+    """
+    r = connection or get_redis()
+    r.set(cancel_key(job_id), 1, ex=CANCEL_TTL)
+
+    cancelled = _cancel_queued_jobs(job_id, r)
+
+    from app.jobs.admission import drop_deferred, release_job
+    from app.jobs.coalesce import release_keys
+
+    from app.storage.catalog import update_job
+
+    drop_deferred(job_id, r)
+    release_keys(job_id, r)
+    release_job(job_id, r)
+    update_job(job_id, "cancelled")
+
+    update_progress(job_id, 100, "⛔ Job cancelado.", cancelled=1)
+    logger.info(f"⛔ [JOB {job_id}] Cancelamento solicitado ({cancelled} etapas removidas da fila).")
+    return cancelled
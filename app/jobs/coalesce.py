@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Envio idêntico (fonte + opções) -> job_id em andamento
+JOB_KEY = "coalesce:job:{}"
+# Fonte -> job_id que está rodando ingest/audio/transcribe para ela
+SOURCE_KEY = "coalesce:source:{}"
+# Chaves que o job possui (liberadas quando ele termina ou falha)
+OWNED_KEY = "coalesce:owned:{}"
+# Segurança: chaves de um job que sumiu sem liberar expiram sozinhas
+COALESCE_TTL = 6 * 3600
+
+# Artefatos das etapas que só dependem da fonte (compartilháveis entre jobs)
+UPSTREAM_ARTIFACTS = (
+    "input.mp4", "keyframes.json", "media.json", "audio.wav",
+    "analysis/loudness.npy", "analysis/energy.npz", "transcript.json",
+)
+
+# Sem estes o job anexado não renderiza nada (audio.wav pode ter sido podado, não faz falta)
+REQUIRED_UPSTREAM_ARTIFACTS = ("input.mp4", "transcript.json")
+
+# Opções que não mudam o resultado do job
+IGNORED_OPTIONS = ("profile", "admission", "source_name")
+# Parâmetros de rastreamento que não mudam o vídeo
+IGNORED_QUERY_PARAMS = ("si", "feature", "pp", "ab_channel")
+
+YOUTUBE_HOSTS = ("youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be")
+
+
+def normalize_source(source: str) -> str:
+    """
+    Forma canônica da fonte: 'youtube:<id>' para links do YouTube (watch,
+    youtu.be, shorts, live), URL sem rastreamento para o resto e
+    'file:<nome>' para uploads (uploads/<sha256>.<ext>: mesmo conteúdo, mesma chave).
+    """
+    source = source.strip()
+    if source.startswith("www."):
+        source = "https://" + source
+    if not source.startswith(("http://", "https://")):
+        return f"file:{os.path.basename(source)}"
+
+    parts = urlsplit(source)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = dict(parse_qsl(parts.query))
+
+    if host in YOUTUBE_HOSTS:
+        if host == "youtu.be":
+            video_id = parts.path.strip("/").split("/")[0]
+        elif "v" in query:
+            video_id = query["v"]
+        else:
+            # /shorts/<id>, /live/<id>, /embed/<id>
+            segments = [s for s in parts.path.split("/") if s]
+            video_id = segments[1] if len(segments) > 1 else ""
+        if video_id:
+            return f"youtube:{video_id}"
+
+    kept = sorted(
+        (k, v) for k, v in query.items()
+        if not k.startswith("utm_") and k not in IGNORED_QUERY_PARAMS
+    )
+    return f"{parts.scheme.lower()}://{host}{parts.path.rstrip('/')}" + (f"?{urlencode(kept)}" if kept else "")
+
+
+def source_key(source: str) -> str:
+    return hashlib.sha256(normalize_source(source).encode("utf-8")).hexdigest()[:32]
+
+
+def job_key(source: str, options: dict) -> str:
+    relevant = {k: v for k, v in (options or {}).items() if k not in IGNORED_OPTIONS}
+    payload = json.dumps({"source": normalize_source(source), "options": relevant}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _claim(r, key: str, job_id: str) -> Optional[str]:
+    """SET NX: None se o job ficou com a chave, senão o job_id de quem já tem."""
+    if r.set(key, job_id, nx=True, ex=COALESCE_TTL):
+        owned = OWNED_KEY.format(job_id)
+        r.sadd(owned, key)
+        r.expire(owned, COALESCE_TTL)
+        return None
+    existing = r.get(key)
+    return existing.decode("utf-8") if existing else None
+
+
+def claim_submission(r, source: str, options: dict, job_id: str) -> Optional[str]:
+    """
+    Registra o envio. Se um job idêntico (mesma fonte e opções) está na
+    fila ou rodando, devolve o job_id dele e nada deve ser enfileirado.
+    """
+    return _claim(r, JOB_KEY.format(job_key(source, options)), job_id)
+
+
+def claim_upstream(r, source: str, job_id: str) -> Optional[str]:
+    """
+    Define quem roda as etapas da fonte (ingest/audio/transcribe). Devolve o
+    job dono se outro já está rodando para a mesma fonte (este anexa nele).
+    """
+    return _claim(r, SOURCE_KEY.format(source_key(source)), job_id)
+
+
+def upstream_owner(r, source: str) -> Optional[str]:
+    """Job que está rodando as etapas iniciais desta fonte (sem reclamar a chave)."""
+    owner = r.get(SOURCE_KEY.format(source_key(source)))
+    return owner.decode("utf-8") if owner else None
+
+
+def release_keys(job_id: str, connection=None):
+    """Libera as chaves do job (fim ou falha): o próximo envio igual roda de novo."""
+    if connection is None:
+        from app.config.queue import get_redis
+        connection = get_redis()
+
+    r = connection
+    owned = OWNED_KEY.format(job_id)
+    for key in r.smembers(owned):
+        # Só apaga se ainda é deste job (pode ter expirado e sido reclamada)
+        if r.get(key) == job_id.encode("utf-8"):
+            r.delete(key)
+    r.delete(owned)
+
+
+def link_upstream_artifacts(upstream_job_id: str, job_id: str):
+    """
+    Traz para a pasta do job os artefatos de ingest/audio/transcribe do job
+    dono. Hardlink (mesmo volume, sem cópia); cópia se não for possível.
+    Falha já aqui se faltar input.mp4 ou transcript.json (ex: o finalize do
+    dono apagou o input.mp4 com KEEP_INPUT_VIDEO=false), e não em cada render.
+    """
+    src_dir = settings.get_job_path(upstream_job_id)
+    dst_dir = settings.get_job_path(job_id)
+
+    missing = [
+        name for name in REQUIRED_UPSTREAM_ARTIFACTS
+        if not (src_dir / name).exists() and not (dst_dir / name).exists()
+    ]
+    if missing:
+        raise FileNotFoundError(
+            f"Job {upstream_job_id} não tem {', '.join(missing)} para compartilhar; envie o vídeo de novo"
+        )
+
+    for name in UPSTREAM_ARTIFACTS:
+        src = src_dir / name
+        dst = dst_dir / name
+        if not src.exists() or dst.exists():
+            continue
+        dst.parent.mkdir(exist_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    logger.info(f"🔗 [JOB {job_id}] Etapas iniciais reaproveitadas do job {upstream_job_id}.")
@@ -0,0 +1,160 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional
+
+from app.jobs.cancel import JobCancelled, current_job_id, is_cancelled
+from app.jobs.metrics import child_stats_from_rusage, record_child
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre dois callbacks de progresso (s), para não inundar o Redis
+PROGRESS_INTERVAL = 0.5
+# Intervalo da checagem de cancelamento enquanto o ffmpeg roda (s)
+CANCEL_POLL_INTERVAL = 0.5
+
+ProgressCallback = Callable[[dict], None]
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    """'1.53x' -> 1.53"""
+    try:
+        return float(value.strip().rstrip("x"))
+    except ValueError:
+        return None
+
+
+def _parse_out_time(fields: dict) -> Optional[float]:
+    # out_time_us é o mais preciso; versões antigas só têm out_time_ms (também em µs)
+    for key in ("out_time_us", "out_time_ms"):
+        value = fields.get(key)
+        if value and value != "N/A":
+            try:
+                return int(value) / 1_000_000
+            except ValueError:
+                pass
+    return None
+
+
+def _read_progress(stream, duration: Optional[float], on_progress: Optional[ProgressCallback]):
+    """
+    Lê a saída de `-progress pipe:1` (blocos key=value terminados em
+    progress=continue|end) e repassa um snapshot para o callback.
+    """
+    fields = {}
+    last_emit = 0.0
+
+    for raw in iter(stream.readline, b""):
+        line = raw.decode("utf-8", errors="replace").strip()
+        if "=" not in line:
+            continue
+
+        key, _, value = line.partition("=")
+        fields[key] = value
+
+        if key != "progress":
+            continue
+
+        finished = value == "end"
+        now = time.monotonic()
+
+        if on_progress and (finished or now - last_emit >= PROGRESS_INTERVAL):
+            out_time = _parse_out_time(fields)
+            percent = None
+            if finished:
+                percent = 100.0
+            elif duration and out_time is not None:
+                percent = max(0.0, min(100.0, out_time / duration * 100))
+
+            try:
+                fps = float(fields.get("fps", 0) or 0)
+            except ValueError:
+                fps = 0.0
+
+            snapshot = {
+                "percent": percent,
+                "out_time": out_time,
+                "fps": fps,
+                "speed": _parse_speed(fields.get("speed", "")),
+                "finished": finished,
+            }
+
+            try:
+                on_progress(snapshot)
+            except Exception as e:
+                logger.error(f"Erro no callback de progresso do ffmpeg: {e}")
+            last_emit = now
+
+        fields = {}
+
+
+def _drain(stream, sink: List[bytes]):
+    for chunk in iter(lambda: stream.read(65536), b""):
+        sink.append(chunk)
+
+
+def _watch_cancel(proc: subprocess.Popen, job_id: str, done: threading.Event):
+    """Termina o ffmpeg assim que o job é cancelado (SIGTERM, depois SIGKILL)."""
+    while not done.wait(CANCEL_POLL_INTERVAL):
+        if is_cancelled(job_id):
+            logger.info(f"⛔ [JOB {job_id}] Cancelado: encerrando ffmpeg (pid {proc.pid})")
+            proc.terminate()
+            if done.wait(2):
+                return
+            proc.kill()
+            return
+
+
+def run_ffmpeg(
+    cmd: List[str],
+    duration: Optional[float] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> subprocess.CompletedProcess:
+    """
+    Roda um comando ffmpeg com saída de progresso legível por máquina.
+
+    O progresso é lido numa thread de fundo e entregue ao callback como
+    {percent, out_time, fps, speed, finished}; `duration` (segundos de mídia
+    que serão processados) é o que permite calcular o percentual.
+    Em caso de erro levanta CalledProcessError com o stderr, como o
+    subprocess.run(check=True) que ele substitui. Dentro de um
+    cancellation_scope o processo é terminado se o job for cancelado
+    (JobCancelled).
+    """
+    full_cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+
+    started_at = time.perf_counter()
+    proc = subprocess.Popen(full_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # stderr precisa ser drenado em paralelo, senão o pipe enche e o ffmpeg trava
+    stderr_chunks: List[bytes] = []
+    reader = threading.Thread(
+        target=_read_progress, args=(proc.stdout, duration, on_progress), daemon=True
+    )
+    drainer = threading.Thread(target=_drain, args=(proc.stderr, stderr_chunks), daemon=True)
+    reader.start()
+    drainer.start()
+
+    job_id = current_job_id()
+    done = threading.Event()
+    if job_id:
+        threading.Thread(target=_watch_cancel, args=(proc, job_id, done), daemon=True).start()
+
+    # wait4 em vez de wait(): devolve o rusage só deste filho (CPU, pico de RSS, I/O)
+    _, wait_status, usage = os.wait4(proc.pid, 0)
+    returncode = proc.returncode = os.waitstatus_to_exitcode(wait_status)
+    done.set()
+    reader.join()
+    drainer.join()
+
+    record_child(child_stats_from_rusage(os.path.basename(cmd[0]), time.perf_counter() - started_at, usage))
+
+    stderr = b"".join(stderr_chunks)
+    if job_id and returncode != 0 and is_cancelled(job_id, force=True):
+        raise JobCancelled(f"Job {job_id} cancelado")
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, full_cmd, stderr=stderr)
+
+    return subprocess.CompletedProcess(full_cmd, returncode, stderr=stderr)
@@ -0,0 +1,174 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+# Artefatos que cada etapa entrega (relativos à pasta do job)
+STAGE_ARTIFACTS = {
+    "ingest": ("input.mp4", "keyframes.json", "media.json"),
+    "audio": ("audio.wav", "analysis/loudness.npy", "analysis/energy.npz"),
+    "transcribe": ("transcript.json",),
+    "segment": ("segments.json",),
+}
+
+
+def file_checksum(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_artifact(job_folder: Path, path: Path) -> Dict:
+    """{"path", "size", "sha256"} de um artefato já finalizado."""
+    return {
+        "path": str(Path(path).relative_to(job_folder)),
+        "size": path.stat().st_size,
+        "sha256": file_checksum(path),
+    }
+
+
+def _empty_manifest(job_id: str) -> Dict:
+    return {"job_id": job_id, "stages": {}, "clips": {}}
+
+
+def load_manifest(job_id: str) -> Dict:
+    path = settings.get_job_path(job_id) / MANIFEST_FILE
+    if not path.exists():
+        return _empty_manifest(job_id)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Nunca deveria acontecer (escrita atômica); recomeça do zero por segurança
+        logger.warning(f"⚠️ [{job_id}] manifest.json ilegível, ignorando.")
+        return _empty_manifest(job_id)
+
+
+@contextmanager
+def _update_manifest(job_id: str):
+    """Lê, entrega para alteração e grava (lock + temp + rename: renders em paralelo)."""
+    job_folder = settings.get_job_path(job_id)
+    path = job_folder / MANIFEST_FILE
+
+    with open(job_folder / f".{MANIFEST_FILE}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        manifest = load_manifest(job_id)
+        yield manifest
+
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+def _artifacts_intact(job_folder: Path, artifacts: Iterable[Dict], verify: bool) -> bool:
+    """Os arquivos existem com o tamanho (e, com verify, o sha256) registrado?"""
+    for artifact in artifacts:
+        # Intermediário apagado de propósito pelo gerenciador de storage
+        if artifact.get("pruned"):
+            continue
+        path = job_folder / artifact["path"]
+        if not path.exists() or path.stat().st_size != artifact["size"]:
+            return False
+        if verify and file_checksum(path) != artifact["sha256"]:
+            return False
+    return True
+
+
+def mark_stage_done(job_id: str, stage: str, params: Optional[Dict] = None):
+    """Registra a etapa como concluída, com o checksum dos artefatos dela."""
+    job_folder = settings.get_job_path(job_id)
+    artifacts = [
+        describe_artifact(job_folder, job_folder / name)
+        for name in STAGE_ARTIFACTS.get(stage, ())
+        if (job_folder / name).exists()
+    ]
+
+    with _update_manifest(job_id) as manifest:
+        manifest["stages"][stage] = {
+            "completed_at": time.time(),
+            "params": params or {},
+            "artifacts": artifacts,
+        }
+        # Novos cortes invalidam os clipes renderizados a partir dos antigos
+        if stage == "segment":
+            manifest["clips"] = {}
+
+
+def is_stage_done(job_id: str, stage: str, params: Optional[Dict] = None, verify: bool = False) -> bool:
+    """Etapa concluída com os mesmos parâmetros e artefatos intactos?"""
+    entry = load_manifest(job_id)["stages"].get(stage)
+    if not entry or entry.get("params", {}) != (params or {}):
+        return False
+    return _artifacts_intact(settings.get_job_path(job_id), entry["artifacts"], verify)
+
+
+def copy_stage_entries(src_job_id: str, job_id: str, stages: Iterable[str]):
+    """Herda as etapas de outro job (artefatos hardlinkados têm o mesmo checksum)."""
+    src_stages = load_manifest(src_job_id)["stages"]
+    with _update_manifest(job_id) as manifest:
+        for stage in stages:
+            if stage in src_stages:
+                manifest["stages"][stage] = src_stages[stage]
+
+
+def mark_pruned(job_id: str, names: Iterable[str]):
+    """Registra artefatos removidos após o uso (a etapa continua valendo como concluída)."""
+    names = set(names)
+    with _update_manifest(job_id) as manifest:
+        for entry in manifest["stages"].values():
+            for artifact in entry["artifacts"]:
+                if artifact["path"] in names:
+                    artifact["pruned"] = True
+
+
+def stage_completed_at(job_id: str, stage: str) -> Optional[float]:
+    entry = load_manifest(job_id)["stages"].get(stage)
+    return entry["completed_at"] if entry else None
+
+
+def mark_clip_done(job_id: str, segment_index: int, outputs: List[Path]):
+    job_folder = settings.get_job_path(job_id)
+    artifacts = [describe_artifact(job_folder, Path(p)) for p in outputs]
+    with _update_manifest(job_id) as manifest:
+        manifest["clips"][f"{segment_index:03d}"] = {
+            "completed_at": time.time(),
+            "artifacts": artifacts,
+        }
+
+
+def completed_clip(job_id: str, segment_index: int, verify: bool = False) -> Optional[List[Path]]:
+    """Saídas do clip se ele já foi concluído e os arquivos estão intactos, senão None."""
+    entry = load_manifest(job_id)["clips"].get(f"{segment_index:03d}")
+    if not entry:
+        return None
+    job_folder = settings.get_job_path(job_id)
+    if not _artifacts_intact(job_folder, entry["artifacts"], verify):
+        return None
+    return [job_folder / a["path"] for a in entry["artifacts"]]
+
+
+def partial_path(output: Path) -> Path:
+    """
+    Arquivo temporário de um output (short_001.mp4 -> short_001.mp4.part).
+    Fora do glob *.mp4, então a interface e o ZIP nunca veem um clip pela metade;
+    quem grava precisa informar o formato (-f mp4) ao ffmpeg.
+    """
+    output = Path(output)
+    return output.with_name(f"{output.name}.part")
@@ -0,0 +1,309 @@
+import fcntl
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from app.config.settings import settings
+from app.config.queue import get_redis
+from app.jobs.cancel import JobCancelled
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE = "metrics.json"
+
+# Agregado global (todas as máquinas), lido pelo endpoint Prometheus
+AGGREGATE_KEY = "metrics:stages"
+MAX_RSS_KEY = "metrics:stages:max_rss"
+
+# Métricas somadas por etapa: nome -> (campo do registro, HELP)
+COUNTERS = {
+    "runs": (None, "Execuções da etapa"),
+    "wall_seconds": ("wall_seconds", "Tempo de parede gasto na etapa"),
+    "cpu_seconds": ("cpu_seconds", "Tempo de CPU (processo + ffmpeg filhos)"),
+    "media_seconds": ("media_seconds", "Segundos de mídia processados"),
+    "bytes_read": ("bytes_read", "Bytes lidos do disco"),
+    "bytes_written": ("bytes_written", "Bytes gravados no disco"),
+}
+
+# Pilha de coletores por thread: run_ffmpeg registra cada filho na etapa atual
+_local = threading.local()
+
+# Etapas medidas em andamento no processo: o pico de RSS (VmHWM) só é zerado
+# quando nenhuma outra está aberta, para não apagar o pico de uma etapa externa
+_active_lock = threading.Lock()
+_active_stages = 0
+_peak_reset_ok = False
+
+
+def _read_proc_io() -> Dict[str, int]:
+    """read_bytes / write_bytes do próprio processo (Linux)."""
+    values = {"read_bytes": 0, "write_bytes": 0}
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in values:
+                    values[key] = int(value.strip())
+    except OSError:
+        pass
+    return values
+
+
+def _reset_peak_rss() -> bool:
+    """Zera o VmHWM do processo (Linux >= 4.0). False se não suportado."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """VmHWM: pico de RSS do processo desde o início (ou desde o último reset)."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def child_stats_from_rusage(name: str, wall: float, usage) -> Dict:
+    """Converte o rusage de UM filho (os.wait4) no registro de métricas."""
+    return {
+        "name": name,
+        "wall_seconds": round(wall, 3),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "max_rss_bytes": usage.ru_maxrss * 1024,  # Linux reporta em KiB
+        # Blocos de 512 bytes que realmente foram ao disco (sem page cache)
+        "bytes_read": usage.ru_inblock * 512,
+        "bytes_written": usage.ru_oublock * 512,
+    }
+
+
+def record_child(stats: Dict):
+    """Chamado por run_ffmpeg ao final de cada processo filho."""
+    for collector in getattr(_local, "stack", []):
+        collector.append(stats)
+
+
+@contextmanager
+def stage_metrics(job_id: str, stage: str, media_seconds: Optional[float] = None):
+    """
+    Mede uma etapa: tempo de parede, CPU (própria + filhos), pico de RSS,
+    bytes lidos/gravados e segundos de mídia. O registro é entregue ao
+    chamador (para completar media_seconds) e, ao final, salvo no
+    metrics.json do job e somado no agregado do Redis.
+
+    max_rss_bytes é o pico DESTA etapa: o VmHWM do processo é zerado no
+    início (ru_maxrss de um worker de longa duração valeria a vida toda dele)
+    e comparado com o pico de cada filho. Sem suporte ao reset, só os filhos.
+    """
+    global _active_stages, _peak_reset_ok
+
+    children: List[Dict] = []
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(children)
+
+    record = {"stage": stage, "media_seconds": media_seconds}
+
+    with _active_lock:
+        if _active_stages == 0:
+            _peak_reset_ok = _reset_peak_rss()
+        # Etapa aninhada: o pico conta desde o início da externa (pode superestimar, nunca subestima)
+        peak_reset = _peak_reset_ok
+        _active_stages += 1
+
+    wall_start = time.perf_counter()
+    self_start = resource.getrusage(resource.RUSAGE_SELF)
+    io_start = _read_proc_io()
+
+    status = "ok"
+    try:
+        yield record
+    except JobCancelled:
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        stack.remove(children)
+
+        wall = time.perf_counter() - wall_start
+        self_end = resource.getrusage(resource.RUSAGE_SELF)
+        io_end = _read_proc_io()
+        # Sem reset (kernel antigo) o VmHWM é o da vida do processo: não serve como pico da etapa
+        self_peak = _peak_rss_bytes() if peak_reset else None
+        with _active_lock:
+            _active_stages -= 1
+
+        self_cpu = (self_end.ru_utime - self_start.ru_utime) + (self_end.ru_stime - self_start.ru_stime)
+        child_cpu = sum(c["cpu_seconds"] for c in children)
+
+        record.update({
+            "status": status,
+            "started_at": time.time() - wall,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(self_cpu + child_cpu, 3),
+            "max_rss_bytes": max(
+                ([self_peak] if self_peak else []) + [c["max_rss_bytes"] for c in children],
+                default=0,
+            ),
+            "bytes_read": (io_end["read_bytes"] - io_start["read_bytes"]) + sum(c["bytes_read"] for c in children),
+            "bytes_written": (io_end["write_bytes"] - io_start["write_bytes"]) + sum(c["bytes_written"] for c in children),
+            "children": children,
+        })
+
+        media = record.get("media_seconds")
+        if media:
+            # Fator de tempo real: < 1 significa mais rápido que o vídeo
+            record["real_time_factor"] = round(wall / media, 4)
+
+        try:
+            save_stage_record(job_id, record)
+            aggregate_stage_record(record)
+        except Exception as e:
+            logger.error(f"Erro ao salvar métricas da etapa {stage}: {e}")
+
+
+def save_stage_record(job_id: str, record: Dict):
+    """Acrescenta o registro no metrics.json (com lock: renders rodam em paralelo)."""
+    job_folder = settings.get_job_path(job_id)
+    path = job_folder / METRICS_FILE
+    lock_path = job_folder / f".{METRICS_FILE}.lock"
+
+    with open(lock_path, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        data = {"job_id": job_id, "stages": []}
+        if path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+        data["stages"].append(record)
+
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def load_job_metrics(job_id: str) -> Dict:
+    path = settings.get_job_path(job_id) / METRICS_FILE
+    if not path.exists():
+        return {"job_id": job_id, "stages": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def aggregate_stage_record(record: Dict):
+    """Soma o registro nos contadores globais por etapa (Redis)."""
+    if record.get("status") != "ok":
+        return
+
+    stage = record["stage"]
+    r = get_redis()
+    pipe = r.pipeline()
+    for name, (field, _) in COUNTERS.items():
+        value = 1 if field is None else (record.get(field) or 0)
+        pipe.hincrbyfloat(AGGREGATE_KEY, f"{stage}:{name}", value)
+    pipe.execute()
+
+    current = float(r.hget(MAX_RSS_KEY, stage) or 0)
+    if record["max_rss_bytes"] > current:
+        r.hset(MAX_RSS_KEY, stage, record["max_rss_bytes"])
+
+
+def load_aggregate() -> Dict[str, Dict[str, float]]:
+    """{stage: {runs, wall_seconds, ...}} somado de todos os jobs."""
+    r = get_redis()
+    result: Dict[str, Dict[str, float]] = {}
+    for key, value in r.hgetall(AGGREGATE_KEY).items():
+        stage, _, name = key.decode("utf-8").partition(":")
+        result.setdefault(stage, {})[name] = float(value)
+    for key, value in r.hgetall(MAX_RSS_KEY).items():
+        result.setdefault(key.decode("utf-8"), {})["max_rss_bytes"] = float(value)
+    return result
+
+
+def render_prometheus() -> str:
+    """Agregado no formato texto do Prometheus."""
+    aggregate = load_aggregate()
+    lines = []
+
+    for name, (_, help_text) in COUNTERS.items():
+        metric = f"avc_stage_{name}_total"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for stage, values in sorted(aggregate.items()):
+            if name in values:
+                lines.append(f'{metric}{{stage="{stage}"}} {values[name]}')
+
+    lines.append("# HELP avc_stage_max_rss_bytes Maior pico de RSS observado na etapa")
+    lines.append("# TYPE avc_stage_max_rss_bytes gauge")
+    for stage, values in sorted(aggregate.items()):
+        if "max_rss_bytes" in values:
+            lines.append(f'avc_stage_max_rss_bytes{{stage="{stage}"}} {values["max_rss_bytes"]}')
+
+    lines.append("# HELP avc_stage_real_time_factor Tempo de parede / segundos de mídia (média)")
+    lines.append("# TYPE avc_stage_real_time_factor gauge")
+    for stage, values in sorted(aggregate.items()):
+        if values.get("media_seconds"):
+            rtf = values.get("wall_seconds", 0) / values["media_seconds"]
+            lines.append(f'avc_stage_real_time_factor{{stage="{stage}"}} {rtf:.6f}')
+
+    try:
+        from app.storage.manager import storage_usage
+
+        usage = storage_usage()
+        lines.append("# HELP avc_storage_bytes Uso do storage de jobs")
+        lines.append("# TYPE avc_storage_bytes gauge")
+        for kind in ("used", "quota", "free", "total"):
+            lines.append(f'avc_storage_bytes{{kind="{kind}"}} {usage[f"{kind}_bytes"]}')
+    except Exception as e:
+        logger.error(f"Erro ao medir o storage: {e}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        try:
+            body = render_prometheus().encode("utf-8")
+        except Exception as e:
+            self.send_error(503, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """Sobe o endpoint /metrics numa thread (usado pelo supervisor)."""
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    logger.info(f"📈 Métricas Prometheus em http://0.0.0.0:{port}/metrics")
+    return server
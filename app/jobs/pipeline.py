@@ -0,0 +1,207 @@
+import logging
+import uuid
+
+from rq import Queue, get_current_job
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# As funções são referenciadas pelo caminho (string) para que quem só
+# enfileira (UI / CLI) não precise importar Whisper, MediaPipe etc.
+WORKER = "app.jobs.worker"
+
+# Encadeamento das etapas: ingest -> audio -> transcribe -> segment.
+# O segment faz o fan-out de N renders + um finalize que depende de todos.
+UPSTREAM_STAGES = ("ingest", "audio", "transcribe", "segment")
+
+# Fila (papel de worker) de cada etapa. Workers de transcrição mantêm o
+# Whisper carregado; workers de render têm núcleos/threads de ffmpeg próprios.
+STAGE_ROLES = {
+    "ingest": "default",
+    "audio": "default",
+    "transcribe": "transcribe",
+    "segment": "default",
+    "render": "render",
+    "finalize": "default",
+    "attach": "default",
+}
+
+QUEUE_ROLES = ("default", "transcribe", "render")
+
+
+def stage_job_id(job_id: str, stage: str, segment_index: int = None) -> str:
+    """ID do job RQ de uma etapa (ex: <job_id>:render:003)."""
+    if segment_index is not None:
+        return f"{job_id}:{stage}:{segment_index:03d}"
+    return f"{job_id}:{stage}"
+
+
+def _default_connection():
+    # Dentro de um job RQ, reaproveita a conexão do worker
+    current = get_current_job()
+    if current is not None:
+        return current.connection
+
+    from app.config.queue import redis_conn
+    return redis_conn
+
+
+def stage_queue(stage: str, connection=None, priority: str = "normal") -> Queue:
+    """Fila que atende a etapa (video_jobs, video_jobs:transcribe:high, video_jobs:render...)."""
+    if connection is None:
+        connection = _default_connection()
+    return Queue(settings.queue_name(STAGE_ROLES[stage], priority), connection=connection)
+
+
+def stage_timeout(options: dict, stage: str) -> int:
+    """Timeout da etapa: proporcional à duração (definido na admissão) ou o fixo."""
+    timeouts = (options or {}).get("admission", {}).get("timeouts", {})
+    default = settings.RENDER_JOB_TIMEOUT if stage == "render" else settings.STAGE_JOB_TIMEOUT
+    return timeouts.get(stage, default)
+
+
+def job_priority(options: dict) -> str:
+    return (options or {}).get("admission", {}).get("priority", "normal")
+
+
+def _release_on_failure(job, connection, *exc_info):
+    # Etapa falhou de vez: o restante da cadeia não roda, então libera a
+    # capacidade e as chaves de coalescência (o próximo envio igual roda de novo)
+    from app.jobs.admission import release_job
+    from app.jobs.cancel import JobCancelled, is_cancelled
+    from app.jobs.coalesce import release_keys
+    from app.storage.catalog import update_job
+    job_id = job.args[0]
+    release_keys(job_id, connection)
+    release_job(job_id, connection)
+    exc_value = exc_info[1] if len(exc_info) > 1 else None
+    # Cancelamento: request_cancel já gravou "cancelled", não vira falha
+    if isinstance(exc_value, JobCancelled) or is_cancelled(job_id, force=True):
+        return
+    update_job(job_id, "failed", error=str(exc_value) if exc_value else None)
+
+
+def upstream_dependency(upstream_job_id: str, connection):
+    """
+    Como anexar ao job dono da fonte: (True, dependência RQ) se o transcribe
+    dele ainda vai rodar, (True, None) se já terminou, (False, None) se falhou
+    ou sumiu sem deixar a transcrição e o input.mp4 (então roda o pipeline completo).
+    """
+    from rq.exceptions import NoSuchJobError
+    from rq.job import Dependency, Job, JobStatus
+
+    try:
+        transcribe = Job.fetch(stage_job_id(upstream_job_id, "transcribe"), connection=connection)
+        status = transcribe.get_status()
+    except NoSuchJobError:
+        status = None
+
+    if status in (JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED):
+        return False, None
+    if status is None or status == JobStatus.FINISHED:
+        from app.jobs.coalesce import REQUIRED_UPSTREAM_ARTIFACTS
+
+        job_folder = settings.get_job_path(upstream_job_id)
+        done = all((job_folder / name).exists() for name in REQUIRED_UPSTREAM_ARTIFACTS)
+        return done, None
+    # allow_failure: se o dono falhar o attach roda e falha também (em vez de ficar preso)
+    return True, Dependency(jobs=[transcribe], allow_failure=True)
+
+
+def enqueue_pipeline(
+    video_source: str,
+    job_id: str = None,
+    options: dict = None,
+    connection=None,
+    upstream_job_id: str = None,
+) -> str:
+    """
+    Enfileira o pipeline como uma cadeia de jobs RQ (um por etapa), para que
+    as etapas, e principalmente os renders, se espalhem por todos os workers
+    que compartilham o volume de storage. Retorna o job_id.
+
+    Com upstream_job_id (outro job rodando a mesma fonte), ingest/audio/
+    transcribe são trocados por um attach que reaproveita os artefatos dele.
+    """
+    if not job_id:
+        job_id = str(uuid.uuid4())
+    if options is None:
+        options = {}
+    if connection is None:
+        connection = _default_connection()
+
+    priority = job_priority(options)
+
+    stages = UPSTREAM_STAGES
+    previous = None
+
+    if upstream_job_id:
+        attach, dependency = upstream_dependency(upstream_job_id, connection)
+        if attach:
+            previous = stage_queue("attach", connection, priority).enqueue(
+                f"{WORKER}.attach_job",
+                args=(job_id, upstream_job_id, options),
+                job_id=stage_job_id(job_id, "attach"),
+                job_timeout=settings.STAGE_JOB_TIMEOUT,
+                depends_on=dependency,
+                on_failure=_release_on_failure,
+            )
+            stages = ("segment",)
+            logger.info(f"🔗 [JOB {job_id}] Anexado às etapas iniciais do job {upstream_job_id}.")
+
+    for stage in stages:
+        args = (job_id, video_source, options) if stage == "ingest" else (job_id, options)
+        previous = stage_queue(stage, connection, priority).enqueue(
+            f"{WORKER}.{stage}_job",
+            args=args,
+            job_id=stage_job_id(job_id, stage),
+            job_timeout=stage_timeout(options, stage),
+            depends_on=previous,
+            on_failure=_release_on_failure,
+        )
+
+    logger.info(f"📩 [JOB {job_id}] Pipeline enfileirado em '{settings.QUEUE_NAME}' (prioridade {priority}).")
+    return job_id
+
+
+def enqueue_renders(job_id: str, total_cuts: int, options: dict, connection=None, indices=None):
+    """
+    Fan-out: um job por corte e um finalize que só roda após o último render.
+    indices: só esses cortes (escolhidos num plano de dry run).
+    """
+    from rq.job import Dependency
+
+    if connection is None:
+        connection = _default_connection()
+    if indices is None:
+        indices = range(1, total_cuts + 1)
+    indices = list(indices)
+
+    priority = job_priority(options)
+    render_queue = stage_queue("render", connection, priority)
+
+    render_jobs = []
+    for idx in indices:
+        render_jobs.append(
+            render_queue.enqueue(
+                f"{WORKER}.render_job",
+                args=(job_id, idx, total_cuts, options),
+                job_id=stage_job_id(job_id, "render", idx),
+                job_timeout=stage_timeout(options, "render"),
+            )
+        )
+
+    # allow_failure: o finalize roda mesmo se um render falhar e fecha o job
+    # (parcial ou falho, conferindo o manifest) em vez de ficar adiado para sempre
+    stage_queue("finalize", connection, priority).enqueue(
+        f"{WORKER}.finalize_job",
+        args=(job_id, indices),
+        job_id=stage_job_id(job_id, "finalize"),
+        job_timeout=stage_timeout(options, "finalize"),
+        depends_on=Dependency(jobs=render_jobs, allow_failure=True),
+        on_failure=_release_on_failure,
+    )
+
+    logger.info(f"🔀 [JOB {job_id}] {len(render_jobs)} renders distribuídos na fila '{render_queue.name}'.")
+    return render_jobs
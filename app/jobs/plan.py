@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from app.config.settings import settings
+from app.jobs.admission import real_time_factors, release_job, submit_renders
+from app.jobs.coalesce import release_keys
+from app.jobs.progress import set_progress_field, update_progress
+from app.storage.catalog import FINAL_STATUSES, get_job, update_job
+
+logger = logging.getLogger(__name__)
+
+PLAN_FILE = "plan.json"
+
+
+def is_dry_run(options: Optional[dict]) -> bool:
+    return bool((options or {}).get("dry_run"))
+
+
+def plan_path(job_id: str):
+    return settings.get_job_path(job_id) / PLAN_FILE
+
+
+def estimate_render_seconds(duration: float, options: dict, factors: Dict[str, float] = None) -> float:
+    """Tempo de render de um clip: fator de tempo real observado (métricas) x duração x perfis."""
+    if factors is None:
+        factors = real_time_factors()
+    n_profiles = max(1, len(options.get("profiles") or []))
+    return factors["render"] * duration * n_profiles
+
+
+def build_plan(job_id: str, segments: List[Dict], options: dict) -> Dict:
+    """Cortes ordenados pelo score, cada um com a estimativa de render."""
+    factors = real_time_factors()
+    clips = []
+    for idx, seg in enumerate(segments, start=1):
+        clips.append({
+            "index": idx,
+            "start": seg["start"],
+            "end": seg["end"],
+            "duration": seg["duration"],
+            "score": seg.get("score", 0.0),
+            "text": seg["text"],
+            "estimated_render_seconds": round(estimate_render_seconds(seg["duration"], options, factors), 1),
+        })
+    clips.sort(key=lambda c: c["score"], reverse=True)
+    for rank, clip in enumerate(clips, start=1):
+        clip["rank"] = rank
+
+    return {
+        "job_id": job_id,
+        "created_at": time.time(),
+        # Opções do envio (sem dry_run): usadas quando os cortes escolhidos forem renderizados
+        "options": {k: v for k, v in options.items() if k != "dry_run"},
+        "render_real_time_factor": factors["render"],
+        "estimated_render_seconds": round(sum(c["estimated_render_seconds"] for c in clips), 1),
+        "clips": clips,
+    }
+
+
+def save_plan(job_id: str, plan: Dict):
+    path = plan_path(job_id)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_plan(job_id: str) -> Optional[Dict]:
+    path = settings.JOBS_DIR / job_id / PLAN_FILE
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def finish_plan(job_id: str, segments: List[Dict], options: dict) -> Dict:
+    """Fim de um dry run: grava plan.json e devolve a capacidade (nada foi renderizado)."""
+    plan = build_plan(job_id, segments, options)
+    save_plan(job_id, plan)
+
+    minutes = plan["estimated_render_seconds"] / 60
+    update_progress(job_id, 100, f"📋 Plano pronto: {len(segments)} cortes (~{minutes:.0f} min de render).")
+    update_job(job_id, "planned", stage="segment", clip_count=0)
+    logger.info(f"📋 [JOB {job_id}] Plano salvo ({len(segments)} cortes, ~{minutes:.1f} min de render).")
+
+    release_keys(job_id)
+    release_job(job_id)
+    return plan
+
+
+def can_render_selection(job_id: str) -> bool:
+    """Nada do job em andamento (nem uma seleção anterior): pode enviar outra."""
+    job = get_job(job_id)
+    return job is not None and job["status"] in FINAL_STATUSES
+
+
+def render_selection(job_id: str, indices: List[int], connection=None) -> List[int]:
+    """
+    Renderiza só os cortes escolhidos de um plano, reaproveitando
+    ingest/transcrição/segmentação já feitos. Passa pela admissão (reserva
+    ou espera) como um envio normal. Retorna os índices enviados.
+    """
+    from app.jobs.cancel import clear_cancel
+
+    if not can_render_selection(job_id):
+        raise ValueError(f"Job {job_id} ainda está em andamento; aguarde terminar para renderizar outros cortes")
+
+    plan = load_plan(job_id)
+    if plan is None:
+        raise FileNotFoundError(f"Job {job_id} não tem {PLAN_FILE}")
+
+    valid = {c["index"] for c in plan["clips"]}
+    selected = sorted(set(indices))
+    unknown = [i for i in selected if i not in valid]
+    if unknown or not selected:
+        raise ValueError(f"Índices inválidos para o job {job_id}: {unknown or 'nenhum selecionado'}")
+
+    options = plan["options"]
+    cost = sum(c["estimated_render_seconds"] for c in plan["clips"] if c["index"] in selected)
+
+    # Um cancelamento anterior (flag ainda no Redis) abortaria todos os renders novos
+    clear_cancel(job_id, connection=connection)
+    set_progress_field(job_id, "renders_done", 0)
+    update_progress(job_id, 70, f"Renderizando {len(selected)} cortes escolhidos...")
+    submit_renders(job_id, selected, options, cost, connection=connection)
+    return selected
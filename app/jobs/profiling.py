@@ -0,0 +1,127 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = "profiles"
+
+# Job sendo perfilado no contexto atual: (job_id, sufixo) ou None.
+# Definido pela etapa no worker; o código interno só chama profiled("nome").
+_current_scope: ContextVar[Optional[tuple]] = ContextVar("profiling_scope", default=None)
+
+
+def profiling_enabled(options: dict = None) -> bool:
+    """Liga por job (options["profile"]) ou para tudo via AVC_PROFILE=1."""
+    if options and options.get("profile"):
+        return True
+    return os.getenv("AVC_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def profiling_scope(job_id: str, options: dict = None, suffix: str = None):
+    """Marca o trecho como pertencente ao job (se o profiling estiver ligado)."""
+    if not profiling_enabled(options):
+        yield
+        return
+
+    token = _current_scope.set((job_id, suffix))
+    try:
+        yield
+    finally:
+        _current_scope.reset(token)
+
+
+class StackSampler:
+    """
+    Amostrador simples: a cada `interval` lê a pilha da thread alvo e conta
+    as pilhas no formato "collapsed" (raiz;...;folha N) do flamegraph.pl /
+    speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="stack-sampler")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                names.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+@contextmanager
+def profiled(name: str):
+    """
+    Perfila o bloco se o job atual pediu profiling: cProfile (.prof + resumo
+    .txt) e amostragem de pilhas (.collapsed) em <job>/profiles/.
+    Fora de um profiling_scope ativo não faz nada.
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        yield
+        return
+
+    job_id, suffix = scope
+    if suffix:
+        name = f"{name}_{suffix}"
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        try:
+            save_profile(job_id, name, profiler, sampler)
+        except Exception as e:
+            logger.error(f"Erro ao salvar profile {name}: {e}")
+
+
+def save_profile(job_id: str, name: str, profiler: cProfile.Profile, sampler: StackSampler):
+    out_dir = settings.get_job_path(job_id) / PROFILES_DIR
+    out_dir.mkdir(exist_ok=True)
+
+    profiler.dump_stats(str(out_dir / f"{name}.prof"))
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+    (out_dir / f"{name}.txt").write_text(summary.getvalue(), encoding="utf-8")
+
+    (out_dir / f"{name}.collapsed").write_text(sampler.collapsed(), encoding="utf-8")
+
+    logger.info(f"🔬 [{job_id}] Profile salvo: {out_dir / name}.*")
@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+from typing import Optional
+
+from app.config.queue import get_redis
+
+logger = logging.getLogger(__name__)
+
+# O hash guarda o último estado (snapshot) e o canal avisa quem está assistindo
+STATUS_TTL = 3600
+
+
+def status_key(job_id: str) -> str:
+    return f"job_status:{job_id}"
+
+
+def events_channel(job_id: str) -> str:
+    return f"job_events:{job_id}"
+
+
+def update_progress(job_id, progress, status_text, **extra):
+    """Salva o snapshot do progresso e publica o evento no canal do job"""
+    snapshot = {"progress": progress, "status": status_text, **extra}
+    try:
+        r = get_redis()
+        pipe = r.pipeline()
+        pipe.hset(status_key(job_id), mapping=snapshot)
+        pipe.expire(status_key(job_id), STATUS_TTL)
+        pipe.publish(events_channel(job_id), json.dumps(snapshot, ensure_ascii=False))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Erro ao atualizar Redis: {e}")
+
+
+def set_progress_field(job_id, field, value):
+    try:
+        get_redis().hset(status_key(job_id), field, value)
+    except Exception as e:
+        logger.error(f"Erro ao atualizar Redis: {e}")
+
+
+def increment_progress_field(job_id, field) -> Optional[int]:
+    """Incremento atômico (ex: clipes renderizados por vários workers)."""
+    try:
+        return get_redis().hincrby(status_key(job_id), field, 1)
+    except Exception as e:
+        logger.error(f"Erro ao atualizar Redis: {e}")
+        return None
+
+
+def get_progress(job_id) -> Optional[dict]:
+    """Último snapshot do job (None se o worker ainda não começou)."""
+    data = get_redis().hgetall(status_key(job_id))
+    if not data:
+        return None
+    return {k.decode("utf-8"): v.decode("utf-8") for k, v in data.items()}
+
+
+def get_progress_many(job_ids, connection=None) -> dict:
+    """Snapshots de vários jobs num único round-trip (pipeline). job_id -> dict ou None."""
+    r = connection or get_redis()
+    pipe = r.pipeline(transaction=False)
+    for job_id in job_ids:
+        pipe.hgetall(status_key(job_id))
+    snapshots = {}
+    for job_id, data in zip(job_ids, pipe.execute()):
+        snapshots[job_id] = {k.decode("utf-8"): v.decode("utf-8") for k, v in data.items()} if data else None
+    return snapshots
+
+
+def wait_for_progress(job_id, timeout: float) -> Optional[dict]:
+    """
+    Bloqueia até o próximo evento de progresso do job (ou até o timeout).
+    Substitui o polling: quem assiste acorda assim que o worker publica.
+    """
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(events_channel(job_id))
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = pubsub.get_message(timeout=remaining)
+            if message and message.get("type") == "message":
+                return json.loads(message["data"])
+    except Exception as e:
+        logger.error(f"Erro ao aguardar progresso: {e}")
+        # Sem Redis, segura o rerun para não virar loop apertado
+        time.sleep(min(timeout, 2))
+        return None
+    finally:
+        pubsub.close()
+
+
+def _throughput_text(snapshot: dict) -> str:
+    parts = []
+    if snapshot.get("fps"):
+        parts.append(f"{snapshot['fps']:.0f} fps")
+    if snapshot.get("speed"):
+        parts.append(f"{snapshot['speed']:.1f}x tempo real")
+    return f" ({', '.join(parts)})" if parts else ""
+
+
+def stage_reporter(job_id, start_pct: int, end_pct: int, label: str):
+    """
+    Callback de progresso de uma etapa: mapeia o percentual da etapa
+    (ffmpeg / Whisper) para a faixa [start_pct, end_pct] da barra do job
+    e grava fps / velocidade em relação ao tempo real no status.
+    """
+    def report(snapshot: dict):
+        stage_pct = snapshot.get("percent")
+        if stage_pct is None:
+            return
+        overall = start_pct + int((end_pct - start_pct) * stage_pct / 100)
+        update_progress(
+            job_id,
+            overall,
+            f"{label} {stage_pct:.0f}%{_throughput_text(snapshot)}",
+            stage_percent=round(stage_pct, 1),
+            fps=round(snapshot.get("fps") or 0, 1),
+            speed=round(snapshot.get("speed") or 0, 2),
+        )
+    return report
+
+
+def throughput_reporter(job_id):
+    """
+    Para etapas que rodam em paralelo (renders distribuídos): só atualiza
+    fps / velocidade no snapshot, sem mexer no percentual do job.
+    """
+    def report(snapshot: dict):
+        try:
+            get_redis().hset(status_key(job_id), mapping={
+                "fps": round(snapshot.get("fps") or 0, 1),
+                "speed": round(snapshot.get("speed") or 0, 2),
+            })
+        except Exception as e:
+            logger.error(f"Erro ao atualizar Redis: {e}")
+    return report
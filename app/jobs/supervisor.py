@@ -0,0 +1,187 @@
+import logging
+import os
+import signal
+import time
+import multiprocessing as mp
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from redis import Redis
+from rq import Queue, SimpleWorker, Worker
+
+from app.config.settings import settings
+from app.jobs.admission import announce_host, withdraw_host
+from app.storage.manager import sweep_storage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerSpec:
+    """Um worker supervisionado: papel, filas que escuta e núcleos fixados."""
+    name: str
+    role: str
+    queues: List[str]
+    cpus: List[int] = field(default_factory=list)
+    threads: int = 0
+
+
+def plan_workers() -> List[WorkerSpec]:
+    """
+    Divide os núcleos disponíveis entre os papéis:
+    - transcribe: TRANSCRIBE_CORES núcleos, Whisper pré-carregado;
+    - render: os núcleos restantes, divididos entre os workers de render
+      (que também atendem as etapas leves da fila padrão).
+    """
+    cores = sorted(os.sched_getaffinity(0))
+
+    n_transcribe = max(0, settings.TRANSCRIBE_WORKERS)
+    # Sempre sobra pelo menos 1 núcleo para render
+    n_transcribe_cores = min(settings.TRANSCRIBE_CORES, max(1, len(cores) - 1)) if n_transcribe else 0
+    transcribe_cores = cores[:n_transcribe_cores]
+    render_cores = cores[n_transcribe_cores:] or cores
+
+    n_render = settings.RENDER_WORKERS or max(1, len(render_cores) // max(1, settings.RENDER_CORES_PER_WORKER))
+
+    specs = []
+
+    for i in range(n_transcribe):
+        specs.append(WorkerSpec(
+            name=f"transcribe-{i + 1}",
+            role="transcribe",
+            queues=settings.role_queue_names("transcribe"),
+            cpus=transcribe_cores,
+            threads=max(1, len(transcribe_cores) // n_transcribe),
+        ))
+
+    for i in range(n_render):
+        specs.append(WorkerSpec(
+            name=f"render-{i + 1}",
+            role="render",
+            queues=settings.role_queue_names("render", "default"),
+            cpus=render_cores,
+            threads=max(1, len(render_cores) // n_render),
+        ))
+
+    return specs
+
+
+def run_worker(spec: WorkerSpec):
+    """Processo filho: fixa núcleos/threads, pré-carrega o modelo e escuta as filas."""
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - [{spec.name}] %(levelname)s - %(message)s')
+
+    if spec.cpus:
+        os.sched_setaffinity(0, spec.cpus)
+
+    redis_conn = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    queues = [Queue(name, connection=redis_conn) for name in spec.queues]
+
+    if spec.role == "transcribe":
+        settings.WHISPER_CPU_THREADS = spec.threads
+
+        from app.transcribe.whisper import load_whisper_model
+        load_whisper_model()
+
+        # SimpleWorker não faz fork por job: o modelo continua na memória
+        worker_class = SimpleWorker
+    else:
+        # ffmpeg herda a afinidade; -threads evita disputar núcleos entre renders
+        settings.FFMPEG_THREADS = spec.threads
+        worker_class = Worker
+
+    worker = worker_class(queues, connection=redis_conn, name=f"{spec.name}-{os.getpid()}")
+    logger.info(f"👷 {spec.name} escutando {spec.queues} (núcleos: {spec.cpus}, threads: {spec.threads})")
+    worker.work()
+
+
+class Supervisor:
+    """Mantém os workers vivos: sobe todos, reinicia os que morrem e encerra junto."""
+
+    def __init__(self, specs: List[WorkerSpec]):
+        self.specs = specs
+        self.processes: List[Optional[mp.Process]] = [None] * len(specs)
+        self.restart_at: List[float] = [0.0] * len(specs)
+        self.running = True
+
+    def _start(self, i: int):
+        spec = self.specs[i]
+        proc = mp.Process(target=run_worker, args=(spec,), name=spec.name, daemon=False)
+        proc.start()
+        self.processes[i] = proc
+        logger.info(f"▶️  {spec.name} iniciado (pid {proc.pid})")
+
+    def _stop(self, *_):
+        logger.info("🛑 Encerrando workers...")
+        self.running = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for i in range(len(self.specs)):
+            self._start(i)
+
+        next_sweep = time.monotonic()
+        next_announce = time.monotonic()
+
+        while self.running:
+            now = time.monotonic()
+
+            # Capacidade desta máquina na admissão (expira se o supervisor morrer)
+            if now >= next_announce:
+                next_announce = now + settings.ADMISSION_HOST_TTL / 3
+                try:
+                    announce_host()
+                except Exception as e:
+                    logger.error(f"Erro ao anunciar capacidade: {e}")
+
+            # Retenção dos intermediários e cota de disco (app/storage/manager.py)
+            if settings.STORAGE_SWEEP_INTERVAL and now >= next_sweep:
+                next_sweep = now + settings.STORAGE_SWEEP_INTERVAL
+                try:
+                    freed = sweep_storage()
+                    if freed:
+                        logger.info(f"🧹 Storage: {freed / 1e6:.1f} MB liberados")
+                except Exception as e:
+                    logger.error(f"Erro na varredura do storage: {e}")
+
+            for i, proc in enumerate(self.processes):
+                if proc is not None and proc.is_alive():
+                    continue
+
+                if proc is not None:
+                    logger.warning(
+                        f"⚠️ {self.specs[i].name} caiu (exit {proc.exitcode}). "
+                        f"Reiniciando em {settings.WORKER_RESTART_BACKOFF}s..."
+                    )
+                    self.processes[i] = None
+                    self.restart_at[i] = now + settings.WORKER_RESTART_BACKOFF
+
+                if now >= self.restart_at[i]:
+                    self._start(i)
+
+            time.sleep(1)
+
+        try:
+            withdraw_host()
+        except Exception as e:
+            logger.error(f"Erro ao retirar capacidade: {e}")
+
+        # SIGTERM deixa o RQ terminar o job atual (warm shutdown)
+        for proc in self.processes:
+            if proc is not None and proc.is_alive():
+                proc.terminate()
+        for proc in self.processes:
+            if proc is not None:
+                proc.join()
+
+
+def start_supervisor():
+    specs = plan_workers()
+    logger.info(f"🧭 Supervisor: {len(specs)} workers ({', '.join(s.name for s in specs)})")
+
+    if settings.METRICS_PORT:
+        from app.jobs.metrics import start_metrics_server
+        start_metrics_server(settings.METRICS_PORT)
+
+    Supervisor(specs).run()
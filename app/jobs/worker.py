@@ -1,112 +1,398 @@
 import logging
 import uuid
 import os
-from redis import Redis
 from app.config.settings import settings
+from app.jobs.progress import (
+    update_progress, increment_progress_field, set_progress_field, stage_reporter, throughput_reporter
+)
 from app.ingest.ingest import ingest_video
 from app.audio.extract_audio import extract_audio
+from app.audio.energy import EnergyIndex, build_energy_index
+from app.audio.loudness import analyze_loudness
 from app.transcribe.whisper import transcribe_audio
-from app.segment.segmenter import Segmenter, load_phrases, save_segments
+from app.segment.segmenter import Segmenter, load_phrases, load_segments, save_segments
 from app.render.renderer import render_short
+from app.render.previews import ensure_clip_previews
+from app.ingest.media import get_media_info
+from app.jobs import pipeline
+from app.jobs.admission import release_job
+from app.jobs.coalesce import link_upstream_artifacts, release_keys
+from app.jobs.metrics import stage_metrics
+from app.jobs.profiling import profiled, profiling_scope
+from app.jobs.cancel import JobCancelled, cancellation_scope, is_cancelled
+from app.jobs.plan import finish_plan, is_dry_run
+from app.storage.catalog import update_job
+from app.storage.manager import StorageFull, cleanup_after_stage, ensure_ingest_space
+from app.jobs.manifest import (
+    completed_clip, copy_stage_entries, is_stage_done, load_manifest, mark_clip_done, mark_stage_done
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Removemos a conexão global 'r_status' aqui para evitar desconexão no fork
+def count_rendered_clip(job_id, total_cuts):
+    """
+    Conta um clip finalizado (renders rodam em paralelo, em vários workers)
+    e atualiza a barra de 70% a 95% conforme os clipes terminam.
+    """
+    done = increment_progress_field(job_id, "renders_done")
+    if done is None:
+        return
 
-def update_progress(job_id, progress, status_text):
-    """Salva o progresso no Redis de forma segura"""
+    current_pct = 70 + int((done / max(total_cuts, 1)) * 25)
+    update_progress(job_id, current_pct, f"Renderizados {done}/{total_cuts} clipes...")
+    update_job(job_id, clip_count=done)
+
+# --- ETAPAS ---
+# Cada etapa lê e grava apenas na pasta do job (volume compartilhado), então
+# podem rodar todas no mesmo processo (process_video_pipeline) ou como jobs
+# RQ separados em workers/máquinas diferentes (app/jobs/pipeline.py).
+
+# Cada etapa é medida por stage_metrics (metrics.json do job + agregado Prometheus).
+# Etapas e clipes concluídos ficam no manifest.json: um retry (ou requeue do RQ)
+# recomeça da primeira unidade incompleta.
+# Cada transição também vai para o catálogo (app/storage/catalog.py), que a
+# interface consulta em vez de varrer o JOBS_DIR.
+
+def skip_completed_stage(job_id: str, stage: str, params: dict = None) -> bool:
+    if is_stage_done(job_id, stage, params):
+        logger.info(f"⏭️  [JOB {job_id}] Etapa '{stage}' já concluída (manifest), pulando.")
+        return True
+    return False
+
+def enter_stage(job_id: str, stage: str):
+    update_job(job_id, "running", stage=stage)
+
+def run_ingest_stage(job_id: str, video_source: str, options: dict = None):
+    # Uploads trazem o sha256 do conteúdo: o checkpoint do ingest fica preso a ele
+    source_hash = (options or {}).get("source_hash")
+    params = {"source_hash": source_hash} if source_hash else None
+    if skip_completed_stage(job_id, "ingest", params):
+        return
+    logger.info(f"--- ETAPA 1: INGESTÃO ---")
+    enter_stage(job_id, "ingest")
+    try:
+        ensure_ingest_space(job_id)
+    except StorageFull as e:
+        update_progress(job_id, 0, f"❌ {e}")
+        raise
+    update_progress(job_id, 10, "Recebendo vídeo...")
+    with stage_metrics(job_id, "ingest") as m, cancellation_scope(job_id):
+        ingest_video(
+            video_source,
+            str(settings.get_job_path(job_id)),
+            on_progress=stage_reporter(job_id, 10, 30, "Padronizando vídeo...")
+        )
+        m["media_seconds"] = get_media_info(job_id).duration
+    mark_stage_done(job_id, "ingest", params)
+    cleanup_after_stage(job_id, "ingest")
+
+def run_audio_stage(job_id: str):
+    if skip_completed_stage(job_id, "audio"):
+        return
+    logger.info(f"--- ETAPA 2: EXTRAÇÃO DE ÁUDIO ---")
+    enter_stage(job_id, "audio")
+    update_progress(job_id, 30, "Extraindo áudio...")
+    with stage_metrics(job_id, "audio", media_seconds=get_media_info(job_id).duration), \
+            cancellation_scope(job_id):
+        extract_audio(job_id, on_progress=stage_reporter(job_id, 30, 50, "Extraindo áudio..."))
+        # Análise de loudness (uma passada no WAV): o render só aplica o ganho de cada clip
+        try:
+            analyze_loudness(job_id)
+        except Exception as e:
+            # Sem a análise os clipes saem sem normalização, mas saem
+            logger.error(f"❌ [JOB {job_id}] Falha na análise de loudness: {e}")
+        # Índice de silêncios para o segmentador (mesmo WAV, ainda no cache de páginas)
+        try:
+            build_energy_index(job_id)
+        except Exception as e:
+            logger.error(f"❌ [JOB {job_id}] Falha no índice de energia: {e}")
+    mark_stage_done(job_id, "audio")
+    cleanup_after_stage(job_id, "audio")
+
+def run_transcribe_stage(job_id: str, options: dict = None):
+    if skip_completed_stage(job_id, "transcribe"):
+        return
+    logger.info(f"--- ETAPA 3: TRANSCRIÇÃO ---")
+    enter_stage(job_id, "transcribe")
+    update_progress(job_id, 50, "Transcrevendo com Whisper (Isso pode demorar)...")
+    with stage_metrics(job_id, "transcribe", media_seconds=get_media_info(job_id).duration), \
+            cancellation_scope(job_id), profiling_scope(job_id, options):
+        transcribe_audio(job_id, on_progress=stage_reporter(job_id, 50, 70, "Transcrevendo com Whisper..."))
+    mark_stage_done(job_id, "transcribe")
+    cleanup_after_stage(job_id, "transcribe")
+
+def run_segment_stage(job_id: str, options: dict) -> list:
+    """Segmenta a transcrição e salva segments.json. Retorna os segmentos (dicts)."""
+    min_dur = options.get('min_duration', 30.0)
+    max_dur = options.get('max_duration', 60.0)
+
+    params = {"min_duration": min_dur, "max_duration": max_dur}
+    if skip_completed_stage(job_id, "segment", params):
+        return load_segments(job_id)
+
+    logger.info(f"--- ETAPA 4: SEGMENTAÇÃO ---")
+    enter_stage(job_id, "segment")
+    update_progress(job_id, 70, "Analisando cortes...")
+
+    with stage_metrics(job_id, "segment", media_seconds=get_media_info(job_id).duration), \
+            cancellation_scope(job_id), profiling_scope(job_id, options):
+        # Carrega frases do JSON
+        phrases = load_phrases(job_id)
+
+        # Instancia o segmentador e processa
+        segmenter = Segmenter(min_duration=min_dur, max_duration=max_dur, energy_index=EnergyIndex.load(job_id))
+        with profiled("segmenter"):
+            segments_objects = segmenter.segment(phrases)
+        # Salva o resultado
+        save_segments(segments_objects, job_id)
+    mark_stage_done(job_id, "segment", params)
+    enter_stage(job_id, "render")
+
+    logger.info(f"✂️  Encontrados {len(segments_objects)} cortes.")
+
+    # Converte objeto Segment para dict para o renderizador
+    return [{
+        "start": seg.start,
+        "end": seg.end,
+        "duration": seg.duration,
+        "text": seg.text,
+        "words": seg.words,
+        "score": seg.score
+    } for seg in segments_objects]
+
+def make_clip_previews(job_id: str, outputs: list, duration: float):
     try:
-        # Conecta a cada chamada para garantir thread-safety
-        r = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
-        
-        r.hset(f"job_status:{job_id}", mapping={
-            "progress": progress,
-            "status": status_text
-        })
-        r.expire(f"job_status:{job_id}", 3600)
+        ensure_clip_previews(outputs, duration)
+    except JobCancelled:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao atualizar Redis: {e}")
+        # Pôster e prévia são cosméticos: sem eles a galeria abre o clip, mas o clip sai
+        logger.error(f"❌ [JOB {job_id}] Falha ao gerar prévias: {e}")
+
+def run_render_stage(job_id: str, segment_index: int, seg_dict: dict, options: dict, on_progress=None):
+    """
+    Renderiza um corte (todos os perfis), medindo o render como uma etapa.
+    Retorna (saídas, renderizou agora); False quando o manifest já tinha o clip.
+    """
+    done = completed_clip(job_id, segment_index)
+    if done is not None:
+        logger.info(f"⏭️  [JOB {job_id}] Clip {segment_index} já concluído (manifest), pulando.")
+        return done, False
+
+    with stage_metrics(job_id, "render", media_seconds=seg_dict["duration"]) as m, \
+            cancellation_scope(job_id), profiling_scope(job_id, options, suffix=f"{segment_index:03d}"):
+        m["segment_index"] = segment_index
+        outputs = render_short(job_id, segment_index, seg_dict, options=options, on_progress=on_progress)
+        # Pôster + prévia leve para a galeria (a interface não abre o clip inteiro)
+        make_clip_previews(job_id, outputs, seg_dict["duration"])
+    mark_clip_done(job_id, segment_index, outputs)
+    return outputs, True
+
+def finish_job(job_id: str):
+    update_progress(job_id, 100, "Finalizado!")
+    logger.info(f"✅ [JOB {job_id}] Pipeline finalizado com sucesso!")
+    mark_stage_done(job_id, "finalize")
+    cleanup_after_stage(job_id, "finalize")
+    update_job(job_id, "done", stage="finalize", clip_count=len(load_manifest(job_id)["clips"]))
+    # Devolve a capacidade reservada na admissão (e admite quem estava esperando)
+    release_keys(job_id)
+    release_job(job_id)
+
+def finish_incomplete_job(job_id: str, indices: list, missing: list):
+    """Algum render falhou: fecha o job como parcial (ou falho, sem nenhum clip) e libera a capacidade."""
+    done = len(indices) - len(missing)
+    listed = ", ".join(str(i) for i in missing)
+    error = f"{len(missing)} de {len(indices)} clipes falharam ({listed})"
+
+    if done:
+        status = "partial"
+        update_progress(job_id, 100, f"⚠️ Finalizado com falhas: {done}/{len(indices)} clipes (falharam: {listed}).")
+    else:
+        status = "failed"
+        update_progress(job_id, 100, f"❌ Todos os {len(indices)} renders falharam.")
+    logger.warning(f"⚠️ [JOB {job_id}] {error}")
+
+    # Sem mark_stage_done("finalize"): o input.mp4 fica para refazer os clipes que faltam
+    update_job(job_id, status, stage="finalize", clip_count=len(load_manifest(job_id)["clips"]), error=error)
+    release_keys(job_id)
+    release_job(job_id)
 
 def process_video_pipeline(video_source: str, job_id: str = None, options: dict = None):
+    """Pipeline completo em um único processo (execução local / sem fan-out)."""
     if not job_id:
         job_id = str(uuid.uuid4())
     if options is None:
         options = {}
 
-    min_dur = options.get('min_duration', 30.0)
-    max_dur = options.get('max_duration', 60.0)
-
     # Usamos o settings para pegar o caminho absoluto correto (/app/storage/jobs/ID)
     # O método get_job_path já cria a pasta automaticamente (mkdir)
-    job_folder_path = settings.get_job_path(job_id)
-    
-    # Convertemos para string para passar para as funções que esperam texto
-    job_folder = str(job_folder_path)
-    
+    job_folder = str(settings.get_job_path(job_id))
+
     logger.info(f"🚀 [JOB {job_id}] Iniciando pipeline...")
     logger.info(f"📂 Pasta do Job: {job_folder}")
 
     try:
-        # 1. Ingestão
-        logger.info(f"--- ETAPA 1: INGESTÃO ---")
-        update_progress(job_id, 10, "Recebendo vídeo...")
-        ingest_video(video_source, job_folder)
-
-        # 2. Audio
-        logger.info(f"--- ETAPA 2: EXTRAÇÃO DE ÁUDIO ---")
-        update_progress(job_id, 30, "Extraindo áudio...")
-        extract_audio(job_id)
-
-        # 3. Transcrição
-        logger.info(f"--- ETAPA 3: TRANSCRIÇÃO ---")
-        update_progress(job_id, 50, "Transcrevendo com Whisper (Isso pode demorar)...")
-        transcribe_audio(job_id)
-
-        # 4. Segmentação
-        logger.info(f"--- ETAPA 4: SEGMENTAÇÃO ---")
-        update_progress(job_id, 70, "Analisando cortes...")
-        # Carrega frases do JSON
-        phrases = load_phrases(job_id)
-        
-        # Instancia o segmentador e processa
-        segmenter = Segmenter(min_duration=min_dur, max_duration=max_dur)
-        segments_objects = segmenter.segment(phrases)
-        # Salva o resultado
-        save_segments(segments_objects, job_id)
-        
-        total_cuts = len(segments_objects)
-        logger.info(f"✂️  Encontrados {total_cuts} cortes.")
+        run_ingest_stage(job_id, video_source, options)
+        run_audio_stage(job_id)
+        run_transcribe_stage(job_id, options)
+        segments = run_segment_stage(job_id, options)
+
+        total_cuts = len(segments)
+
+        if is_dry_run(options):
+            # Só o plano: os cortes escolhidos são renderizados depois (app/jobs/plan.py)
+            finish_plan(job_id, segments, options)
+            return job_id
 
         if total_cuts == 0:
             logger.warning("⚠️ Nenhum corte encontrado!")
+            finish_job(job_id)
             return job_id
 
         # 5. Renderização
         logger.info(f"--- ETAPA 5: RENDERIZAÇÃO ---")
-        limit = total_cuts
-        
-        for i, seg in enumerate(segments_objects[:limit]):
+
+        for i, seg_dict in enumerate(segments):
             idx = i + 1
-            logger.info(f"🎥 Renderizando Short {idx}/{limit}...")
-            
+            logger.info(f"🎥 Renderizando Short {idx}/{total_cuts}...")
+
             current_pct = 70 + int((i / total_cuts) * 25)
-            update_progress(job_id, current_pct, f"Renderizando Clip {i+1}/{total_cuts}...")
-           
-            # Converte objeto Segment para dict para o renderizador 
-            seg_dict = {
-                "start": seg.start,
-                "end": seg.end,
-                "duration": seg.duration,
-                "text": seg.text,
-                "words": seg.words
-            }
-            render_short(job_id, idx, seg_dict, options=options)
-        
-        update_progress(job_id, 100, "Finalizado!")
-        logger.info(f"✅ [JOB {job_id}] Pipeline finalizado com sucesso!")
+            next_pct = 70 + int(((i + 1) / total_cuts) * 25)
+            update_progress(job_id, current_pct, f"Renderizando Clip {idx}/{total_cuts}...")
+            run_render_stage(
+                job_id, idx, seg_dict, options,
+                on_progress=stage_reporter(job_id, current_pct, next_pct, f"Renderizando Clip {idx}/{total_cuts}...")
+            )
+
+        finish_job(job_id)
         return job_id
 
+    except JobCancelled:
+        logger.info(f"⛔ [JOB {job_id}] Pipeline interrompido (cancelado).")
+        raise
+
     except Exception as e:
         logger.error(f"❌ [JOB {job_id}] Falha crítica: {e}", exc_info=True)
-        raise e
\ No newline at end of file
+        update_job(job_id, "failed", error=str(e))
+        raise e
+
+    finally:
+        # Toda saída devolve a capacidade e as chaves de coalescência (as duas
+        # chamadas são idempotentes: finish_job / finish_plan já podem ter liberado)
+        try:
+            release_keys(job_id)
+            release_job(job_id)
+        except Exception as e:
+            logger.error(f"Erro ao liberar capacidade do job {job_id}: {e}")
+
+# --- JOBS RQ (um por etapa, encadeados por app/jobs/pipeline.py) ---
+
+def ingest_job(job_id: str, video_source: str, options: dict = None):
+    logger.info(f"🚀 [JOB {job_id}] Iniciando pipeline (etapas distribuídas)...")
+    run_ingest_stage(job_id, video_source, options)
+
+def attach_job(job_id: str, upstream_job_id: str, options: dict = None):
+    """Substitui ingest/audio/transcribe quando outro job já processou a mesma fonte."""
+    update_progress(job_id, 50, "Reaproveitando vídeo e transcrição de outro job...")
+    enter_stage(job_id, "attach")
+    link_upstream_artifacts(upstream_job_id, job_id)
+    copy_stage_entries(upstream_job_id, job_id, ("ingest", "audio", "transcribe"))
+
+def audio_job(job_id: str, options: dict = None):
+    run_audio_stage(job_id)
+
+def transcribe_job(job_id: str, options: dict = None):
+    run_transcribe_stage(job_id, options)
+
+def segment_job(job_id: str, options: dict = None):
+    """Segmenta e faz o fan-out: um job de render por corte + o job final."""
+    if options is None:
+        options = {}
+
+    segments = run_segment_stage(job_id, options)
+
+    if is_dry_run(options):
+        finish_plan(job_id, segments, options)
+        return job_id
+
+    if not segments:
+        logger.warning("⚠️ Nenhum corte encontrado!")
+        finish_job(job_id)
+        return job_id
+
+    # Zera o contador de clipes (um retry do segment recomeça a contagem)
+    set_progress_field(job_id, "renders_done", 0)
+
+    update_progress(job_id, 70, f"Renderizando {len(segments)} clipes em paralelo...")
+    pipeline.enqueue_renders(job_id, len(segments), options)
+    return job_id
+
+def render_job(job_id: str, segment_index: int, total_cuts: int, options: dict = None):
+    """Renderiza um único corte (lido do segments.json do job)."""
+    seg_dict = load_segments(job_id)[segment_index - 1]
+    logger.info(f"🎥 [JOB {job_id}] Renderizando Short {segment_index}/{total_cuts}...")
+    # Renders rodam em paralelo: cada um só reporta fps/velocidade, o % vem do contador
+    outputs, rendered = run_render_stage(
+        job_id, segment_index, seg_dict, options, on_progress=throughput_reporter(job_id)
+    )
+    # Retry / re-enfileiramento de um clip já pronto não conta de novo (o % passaria de 95)
+    if rendered:
+        count_rendered_clip(job_id, total_cuts)
+    return [str(p) for p in outputs]
+
+def finalize_job(job_id: str, indices: list = None):
+    """
+    Roda quando o último render do job termina, com ou sem sucesso
+    (depende de todos com allow_failure). indices: os cortes enfileirados.
+    """
+    if is_cancelled(job_id, force=True):
+        logger.info(f"⛔ [JOB {job_id}] Cancelado; finalize ignorado.")
+        return job_id
+
+    missing = [i for i in (indices or []) if completed_clip(job_id, i) is None]
+    if missing:
+        finish_incomplete_job(job_id, indices, missing)
+    else:
+        finish_job(job_id)
+    return job_id
+
+def restyle_job(job_id: str, options: dict = None):
+    """
+    Job de "re-estilização": re-renderiza os clipes de um job já processado
+    com novas opções de estilo (cor, fonte, legendas...).
+    Reaproveita segments.json e a análise de Smart Crop salva; clipes cujo
+    hash de entradas não mudou são pulados pelo render_short.
+    """
+    if options is None:
+        options = {}
+
+    logger.info(f"🎨 [JOB {job_id}] Re-estilizando clipes...")
+    enter_stage(job_id, "restyle")
+
+    try:
+        segments = load_segments(job_id)
+        total_cuts = len(segments)
+
+        with cancellation_scope(job_id):
+            for i, seg_dict in enumerate(segments):
+                idx = i + 1
+                current_pct = int((i / max(total_cuts, 1)) * 100)
+                update_progress(job_id, current_pct, f"Re-estilizando Clip {idx}/{total_cuts}...")
+                outputs = render_short(job_id, idx, seg_dict, options=options)
+                make_clip_previews(job_id, outputs, seg_dict["duration"])
+                mark_clip_done(job_id, idx, outputs)
+
+        update_progress(job_id, 100, "Finalizado!")
+        update_job(job_id, "done", stage="restyle", clip_count=total_cuts)
+        logger.info(f"✅ [JOB {job_id}] Re-estilização finalizada!")
+        return job_id
+
+    except JobCancelled:
+        logger.info(f"⛔ [JOB {job_id}] Re-estilização cancelada.")
+        raise
+
+    except Exception as e:
+        logger.error(f"❌ [JOB {job_id}] Falha na re-estilização: {e}", exc_info=True)
+        update_job(job_id, "failed", error=str(e))
+        raise e
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Opções que só afetam a legenda (mudam o "estilo", não o corte)
+STYLE_KEYS = ("use_subs", "font_name", "font_size", "text_color", "margin_v", "res_x", "res_y")
+
+
+def _digest(payload) -> str:
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def source_fingerprint(input_video: Path) -> str:
+    """Identifica o input.mp4 sem lê-lo por inteiro (tamanho + mtime)."""
+    st = input_video.stat()
+    return _digest({"size": st.st_size, "mtime_ns": st.st_mtime_ns})
+
+
+@lru_cache(maxsize=64)
+def _file_sha256(path: str, mtime_ns: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def font_file_hash(font_name: Optional[str]) -> Optional[str]:
+    """Hash do arquivo da fonte (trocar o .ttf invalida o cache)."""
+    if not font_name or font_name == "Padrão":
+        return None
+    font_path = settings.FONTS_DIR / font_name
+    if not font_path.exists():
+        return None
+    return _file_sha256(str(font_path), font_path.stat().st_mtime_ns)
+
+
+def style_hash(profile: Dict) -> str:
+    style = {key: profile.get(key) for key in STYLE_KEYS}
+    # Sem legendas, o estilo do texto é irrelevante
+    if not profile.get("use_subs", True):
+        style = {"use_subs": False}
+    else:
+        style["font_file"] = font_file_hash(profile.get("font_name"))
+    return _digest(style)
+
+
+def geometry_hash(fingerprint: str, segment_data: Dict, profile: Dict, crop: Optional[Tuple]) -> str:
+    return _digest({
+        "source": fingerprint,
+        "start": segment_data["start"],
+        "end": segment_data["end"],
+        "format": profile["format"],
+        "use_blur": profile.get("use_blur", False),
+        "crop": list(crop) if crop else None,
+    })
+
+
+def render_hash(geometry: str, style: str, audio_gain: Optional[float] = None) -> str:
+    # Sem ganho (normalização desligada / job sem análise) o hash é o mesmo de antes
+    if audio_gain is None:
+        return _digest({"geometry": geometry, "style": style})
+    payload = {"geometry": geometry, "style": style, "audio_gain": audio_gain}
+    if audio_gain > 0:
+        # Ganho positivo passa pelo limiter: o teto também define a saída
+        payload["peak_ceiling_db"] = settings.LOUDNESS_PEAK_CEILING_DB
+    return _digest(payload)
+
+
+def _meta_path(output_video: Path) -> Path:
+    # outputs/short_001.mp4 -> render_meta/short_001.json
+    return output_video.parent.parent / "render_meta" / f"{output_video.stem}.json"
+
+
+def load_render_meta(output_video: Path) -> Optional[Dict]:
+    path = _meta_path(output_video)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_render_meta(output_video: Path, meta: Dict):
+    path = _meta_path(output_video)
+    path.parent.mkdir(exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def is_render_cached(output_video: Path, expected_hash: str) -> bool:
+    """O clip existe e foi gerado exatamente com as mesmas entradas?"""
+    if not output_video.exists():
+        return False
+    meta = load_render_meta(output_video)
+    return bool(meta) and meta.get("hash") == expected_hash
+
+
+# --- Análise de Smart Crop (reaproveitada em re-estilizações) ---
+
+def _crop_path(job_folder: Path, segment_index: int) -> Path:
+    return job_folder / "analysis" / f"crop_{segment_index:03d}.json"
+
+
+def load_crop_analysis(
+    job_folder: Path, segment_index: int, fingerprint: str, segment_data: Dict
+) -> Dict:
+    """Retorna {(target_w, target_h): (new_w, new_h, crop_x)} salvo para o clip."""
+    path = _crop_path(job_folder, segment_index)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    # Só vale para o mesmo vídeo e o mesmo intervalo
+    if (
+        data.get("source") != fingerprint
+        or data.get("start") != segment_data["start"]
+        or data.get("end") != segment_data["end"]
+    ):
+        return {}
+
+    return {tuple(item["target"]): tuple(item["crop"]) for item in data.get("crops", [])}
+
+
+def save_crop_analysis(
+    job_folder: Path, segment_index: int, fingerprint: str, segment_data: Dict, crops: Dict
+):
+    path = _crop_path(job_folder, segment_index)
+    path.parent.mkdir(exist_ok=True)
+    data = {
+        "source": fingerprint,
+        "start": segment_data["start"],
+        "end": segment_data["end"],
+        "crops": [{"target": list(k), "crop": list(v)} for k, v in crops.items()],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
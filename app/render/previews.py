@@ -0,0 +1,108 @@
+import logging
+import os
+import subprocess
+from pathlib import Path
+from typing import List
+
+from app.config.settings import settings
+from app.jobs.ffmpeg_runner import run_ffmpeg
+from app.jobs.manifest import partial_path
+
+logger = logging.getLogger(__name__)
+
+PREVIEWS_DIR = "previews"
+
+# Lado menor da prévia / do pôster (480p) e momento do pôster (s)
+PREVIEW_SHORT_SIDE = 480
+POSTER_AT = 1.0
+
+
+def poster_path(output_video: Path) -> Path:
+    output_video = Path(output_video)
+    return output_video.parent.parent / PREVIEWS_DIR / f"{output_video.stem}.jpg"
+
+
+def preview_path(output_video: Path) -> Path:
+    output_video = Path(output_video)
+    return output_video.parent.parent / PREVIEWS_DIR / f"{output_video.stem}.preview.mp4"
+
+
+def previews_up_to_date(output_video: Path) -> bool:
+    mtime = Path(output_video).stat().st_mtime
+    return all(
+        p.exists() and p.stat().st_mtime >= mtime
+        for p in (poster_path(output_video), preview_path(output_video))
+    )
+
+
+def create_clip_previews(output_video: Path, duration: float = None):
+    """
+    Pôster JPEG + prévia de baixa taxa (480p, ~500 kbps) de um clip, num
+    único ffmpeg: o clip é decodificado uma vez e o scale alimenta as duas saídas.
+    """
+    output_video = Path(output_video)
+    poster = poster_path(output_video)
+    preview = preview_path(output_video)
+    poster.parent.mkdir(exist_ok=True)
+
+    side = PREVIEW_SHORT_SIDE
+    scale = f"scale=w='if(gt(iw,ih),-2,{side})':h='if(gt(iw,ih),{side},-2)'"
+
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-i",
+        str(output_video),
+        "-filter_complex",
+        f"[0:v]{scale},split=2[poster][preview]",
+        # Pôster: um frame logo após o início (evita o frame preto do fade)
+        "-map",
+        "[poster]",
+        "-ss",
+        str(POSTER_AT),
+        "-frames:v",
+        "1",
+        "-q:v",
+        "4",
+        str(poster),
+        # Prévia leve para a galeria
+        "-map",
+        "[preview]",
+        "-map",
+        "0:a?",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-crf",
+        "32",
+        "-maxrate",
+        "500k",
+        "-bufsize",
+        "1M",
+        *settings.ffmpeg_thread_args(),
+        "-c:a",
+        "aac",
+        "-b:a",
+        "64k",
+        "-movflags",
+        "+faststart",
+        "-f",
+        "mp4",
+        str(partial_path(preview)),
+    ]
+
+    try:
+        run_ffmpeg(cmd, duration=duration)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Erro FFmpeg (prévia): {e.stderr.decode()}")
+        raise e
+
+    os.replace(partial_path(preview), preview)
+
+
+def ensure_clip_previews(outputs: List[Path], duration: float = None):
+    """Gera as prévias que faltam ou ficaram mais velhas que o clip (re-render)."""
+    for output_video in outputs:
+        if not previews_up_to_date(output_video):
+            create_clip_previews(output_video, duration)
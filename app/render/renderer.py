@@ -2,42 +2,269 @@ import subprocess
 import logging
 import statistics
 import os
-import cv2
 import math
 
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 from app.config.settings import settings
+from app.config.profiles import resolve_profiles
+from app.audio.loudness import clip_gain_db
+from app.ingest.media import MediaInfo, get_media_info
+from app.render import cache as render_cache
+from app.jobs.cancel import raise_if_cancelled
+from app.jobs.ffmpeg_runner import run_ffmpeg
+from app.jobs.manifest import partial_path
+from app.jobs.profiling import profiled
 from app.subtitles.ass_generator import create_ass_file
 from app.video.smart_crop import get_smart_crop_coordinates
+from app.video.keyframes import find_nearest_keyframe, load_keyframe_index, probe_keyframes
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def get_video_dims(video_path: str) -> Tuple[Optional[int], Optional[int]]:
-    """Retorna (width, height) do vídeo original."""
-    try:
-        cap = cv2.VideoCapture(video_path)
+def compute_smart_crop_x(
+    input_video: Path,
+    segment_data: dict,
+    target_w: int,
+    target_h: int,
+    media: MediaInfo,
+    keyframes: Optional[List[float]] = None,
+) -> Tuple[int, int, int]:
+    """
+    Calcula o scale que PREENCHE o alvo e o X do crop via Smart Crop.
+    Retorna (new_w, new_h, crop_x).
+    """
+    orig_w, orig_h = media.dims
+
+    # 1. Calcular o fator de escala correto para PREENCHER a tela
+    # Usamos max() para garantir que NENHUM lado fique menor que o alvo
+    scale_w = target_w / orig_w
+    scale_h = target_h / orig_h
+    scale_factor = max(scale_w, scale_h)
+
+    # Novas dimensões após o redimensionamento
+    new_w = math.ceil(orig_w * scale_factor)
+    new_h = math.ceil(orig_h * scale_factor)
+
+    # Garantir que sejam pares (FFmpeg gosta de pares)
+    if new_w % 2 != 0:
+        new_w += 1
+    if new_h % 2 != 0:
+        new_h += 1
+
+    logger.info(
+        f"📐 Dimensões: Orig={orig_w}x{orig_h} -> New={new_w}x{new_h} (Alvo {target_w}x{target_h})"
+    )
+
+    final_crop_x = 0
+
+    # Só roda detecção inteligente se tivermos largura sobrando para "panear"
+    # Se new_w for muito próximo de 1080, apenas centralizamos.
+    if new_w > target_w + 10:
+        with profiled("smart_crop"):
+            crop_centers_list = get_smart_crop_coordinates(
+                str(input_video),
+                segment_data["duration"],
+                segment_data["start"],
+                segment_data["end"],
+                keyframes=keyframes,
+                media=media,
+            )
+
+        if crop_centers_list:
+            try:
+                avg_center_original = statistics.median(crop_centers_list)
+
+                # Converte o centro original para a nova escala
+                scaled_center_x = avg_center_original * scale_factor
+
+                # Calcula o canto esquerdo (Top-Left X)
+                calculated_x = int(scaled_center_x - (target_w / 2))
+
+                # Limita para não sair da borda (Clamp)
+                max_x = new_w - target_w
+                final_crop_x = max(0, min(calculated_x, max_x))
+
+                logger.info(
+                    f"🎯 Smart Crop: X calculado={final_crop_x} (Max possível={max_x})"
+                )
+            except Exception as e:
+                logger.error(f"Erro matemática Smart Crop: {e}")
+                final_crop_x = (new_w - target_w) // 2  # Centraliza fallback
+        else:
+            final_crop_x = (new_w - target_w) // 2  # Centraliza fallback
+    else:
+        # Se o vídeo já é vertical "apertado", centraliza o excedente mínimo
+        final_crop_x = (new_w - target_w) // 2
+        logger.info(
+            f"⚠️ Vídeo estreito, forçando centralização. Crop X={final_crop_x}"
+        )
 
-        if not cap.isOpened():
-            return None, None
+    return new_w, new_h, final_crop_x
+
+
+def resolve_crop(
+    profile: dict,
+    input_video: Path,
+    segment_data: dict,
+    crop_cache: Dict,
+    media: MediaInfo,
+    keyframes: Optional[List[float]] = None,
+) -> Optional[Tuple[int, int, int]]:
+    """
+    (new_w, new_h, crop_x) do Smart Crop para perfis verticais sem blur.
+    crop_cache guarda o resultado por resolução alvo, para ser calculado uma
+    única vez por clip mesmo com vários perfis (e reaproveitado do disco).
+    """
+    if profile["format"] != "vertical" or profile.get("use_blur"):
+        return None
+
+    key = (profile["res_x"], profile["res_y"])
+    if key not in crop_cache:
+        crop_cache[key] = compute_smart_crop_x(
+            input_video, segment_data, *key, media, keyframes
+        )
+    return crop_cache[key]
 
-        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-        cap.release()
-        return w, h
+def build_profile_filter(
+    src_label: str,
+    out_label: str,
+    profile: dict,
+    crop: Optional[Tuple[int, int, int]],
+) -> str:
+    """Monta o ramo do filter_complex de UM perfil: [src] -> geometria -> [out]."""
+    target_w, target_h = profile["res_x"], profile["res_y"]
+    tag = profile["name"]
 
-    except Exception as e:
-        logger.error(f"Erro ao ler dimensões: {e}")
-        return None, None
+    if profile["format"] == "vertical":
+        if profile.get("use_blur"):
+            # Estratégia: Fundo desfocado com vídeo original centralizado
+            return (
+                f"[{src_label}]split=2[bg_{tag}][fg_{tag}];"
+                f"[bg_{tag}]scale={target_w}:{target_h}:force_original_aspect_ratio=increase,crop={target_w}:{target_h},boxblur=20:10[bg_blurred_{tag}];"
+                f"[fg_{tag}]scale={target_w}:{target_h}:force_original_aspect_ratio=decrease[fg_scaled_{tag}];"
+                f"[bg_blurred_{tag}][fg_scaled_{tag}]overlay=(W-w)/2:(H-h)/2[{out_label}]"
+            )
+
+        # --- SMART CROP OTIMIZADO ---
+        new_w, new_h, final_crop_x = crop
+
+        # Filtro com dimensões calculadas explicitamente
+        return f"[{src_label}]scale={new_w}:{new_h},crop={target_w}:{target_h}:{final_crop_x}:0[{out_label}]"
+
+    # Formato Horizontal (1920x1080) com padding se necessário
+    return f"[{src_label}]scale={target_w}:{target_h}:force_original_aspect_ratio=decrease,pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2[{out_label}]"
+
+
+def can_stream_copy(profile: dict, media: MediaInfo) -> bool:
+    """
+    O clip pode ser cortado sem re-encode? Só quando a geometria de saída é
+    igual à do vídeo original e nada é desenhado por cima (sem legenda/blur).
+    O input.mp4 já é H.264/AAC (ver ingest), então o MP4 final é válido.
+    """
+    if not settings.STREAM_COPY_ENABLED or not profile.get("allow_stream_copy", True):
+        return False
+    if profile.get("use_subs", True) or profile.get("use_blur"):
+        return False
+    return media.dims == (profile["res_x"], profile["res_y"])
+
+
+def snap_start_to_keyframe(
+    input_video: Path, start: float, keyframes: Optional[List[float]] = None
+) -> Optional[float]:
+    """
+    Keyframe mais próximo do início do corte, dentro da tolerância.
+    Usa o índice do job (keyframes.json); sem ele, faz probe só da janela.
+    """
+    tolerance = settings.STREAM_COPY_SNAP_TOLERANCE
+    if keyframes is None:
+        keyframes = probe_keyframes(str(input_video), start - tolerance, start + tolerance)
+    return find_nearest_keyframe(keyframes, start, tolerance)
+
+
+def audio_gain_args(audio_gain: Optional[float]) -> List[str]:
+    """
+    Ganho de normalização do clip (dB) como filtro de áudio da saída. Com ganho
+    positivo, um limiter no LOUDNESS_PEAK_CEILING_DB segura os picos: o pico
+    da análise vem do mono 16 kHz e subestima o da faixa estéreo original.
+    """
+    if not audio_gain:
+        return []
+    audio_filter = f"volume={audio_gain}dB"
+    if audio_gain > 0:
+        ceiling = 10 ** (settings.LOUDNESS_PEAK_CEILING_DB / 20)
+        # level=0: sem o auto-level do alimiter (ele subiria o clip inteiro até o teto)
+        audio_filter += f",alimiter=limit={ceiling:.4f}:level=0"
+    return ["-af", audio_filter]
+
+
+def stream_copy_cut(
+    input_video: Path,
+    output_video: Path,
+    cut_start: float,
+    cut_end: float,
+    on_progress=None,
+    audio_gain: Optional[float] = None,
+):
+    """
+    Corta [cut_start, cut_end] copiando os streams (I/O-bound, sem decode).
+    cut_start precisa ser um keyframe; o fim não precisa, pois o copy só
+    para de gravar pacotes (o decoder do player começa no keyframe inicial).
+    Com ganho de loudness só o áudio é re-encodado; o vídeo continua copiado.
+    """
+    if audio_gain:
+        codec_args = ["-c:v", "copy", "-c:a", "aac", "-b:a", "128k", *audio_gain_args(audio_gain)]
+    else:
+        codec_args = ["-c", "copy"]
+
+    cmd = [
+        "ffmpeg",
+        "-y",
+        # +1ms evita que o arredondamento do pts faça o seek cair no keyframe anterior
+        "-ss",
+        f"{cut_start + 0.001:.3f}",
+        "-i",
+        str(input_video),
+        "-t",
+        f"{cut_end - cut_start:.3f}",
+        "-map",
+        "0:v",
+        "-map",
+        "0:a",
+        *codec_args,
+        "-avoid_negative_ts",
+        "make_zero",
+        "-movflags",
+        "+faststart",
+        "-f",
+        "mp4",
+        str(partial_path(output_video)),
+    ]
+
+    try:
+        run_ffmpeg(cmd, duration=cut_end - cut_start, on_progress=on_progress)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Erro FFmpeg (stream copy): {e.stderr.decode()}")
+        raise e
+
+    os.replace(partial_path(output_video), output_video)
 
 
 def render_short(
-    job_id: str, segment_index: int, segment_data: dict, options: dict = None
-) -> Path:
+    job_id: str, segment_index: int, segment_data: dict, options: dict = None, on_progress=None
+) -> List[Path]:
+    """
+    Renderiza um clip em todos os perfis de saída do job com UM único ffmpeg:
+    o vídeo é decodificado uma vez e o filter_complex faz `split` em um ramo
+    por perfil (crop/blur/pad + seu próprio .ass), cada um com seu encoder.
+
+    Cada saída registra o hash das suas entradas (render_meta/); perfis cujo
+    hash não mudou são pulados. Retorna a lista de arquivos (um por perfil).
+    on_progress recebe o progresso do ffmpeg (ver app/jobs/ffmpeg_runner.py).
+    """
     if options is None:
         options = {}
 
@@ -50,114 +277,134 @@ def render_short(
     subs_folder.mkdir(exist_ok=True)
     outputs_folder.mkdir(exist_ok=True)
 
-    output_video = outputs_folder / f"short_{segment_index:03d}.mp4"
-    ass_path = subs_folder / f"seg_{segment_index:03d}.ass"
+    profiles = resolve_profiles(options)
+    multi = len(profiles) > 1
 
-    video_format = options.get("format", "vertical")
-    use_subs = options.get("use_subs", True)
-    use_blur = options.get("use_blur", False)
+    # Dimensões/fps vêm do media.json (sem reabrir o container a cada clip)
+    media = get_media_info(job_id)
+    keyframes = load_keyframe_index(job_folder)
 
-    logger.info(f"[{job_id}] Renderizando Short #{segment_index} (Subs: {use_subs})")
+    fingerprint = render_cache.source_fingerprint(input_video)
+    crop_cache = render_cache.load_crop_analysis(
+        job_folder, segment_index, fingerprint, segment_data
+    )
+    crops_before = dict(crop_cache)
 
-    base_filter = ""
+    # Mesmo ganho para todos os perfis (o áudio é o mesmo); vem da análise do job
+    audio_gain = clip_gain_db(job_id, segment_data["start"], segment_data["end"])
 
-    if video_format == "vertical":
-        target_w = 1080
-        target_h = 1920
+    all_outputs = []
+    pending = []
 
-        if use_blur:
-            # Estratégia: Fundo desfocado com vídeo original centralizado
-            base_filter = (
-                "[0:v]split=2[bg][fg];"
-                f"[bg]scale={target_w}:{target_h}:force_original_aspect_ratio=increase,crop={target_w}:{target_h},boxblur=20:10[bg_blurred];"
-                f"[fg]scale={target_w}:{target_h}:force_original_aspect_ratio=decrease[fg_scaled];"
-                "[bg_blurred][fg_scaled]overlay=(W-w)/2:(H-h)/2[base_out]"
-            )
-        else:
-            # --- SMART CROP OTIMIZADO ---
-            orig_w, orig_h = get_video_dims(str(input_video))
+    for profile in profiles:
+        raise_if_cancelled()
+        suffix = f"_{profile['name']}" if multi else ""
+        output_video = outputs_folder / f"short_{segment_index:03d}{suffix}.mp4"
+        ass_path = subs_folder / f"seg_{segment_index:03d}{suffix}.ass"
+        all_outputs.append(output_video)
 
-            # 1. Calcular o fator de escala correto para PREENCHER a tela
-            # Usamos max() para garantir que NENHUM lado fique menor que o alvo
-            scale_w = target_w / orig_w
-            scale_h = target_h / orig_h
-            scale_factor = max(scale_w, scale_h)
+        crop = resolve_crop(
+            profile, input_video, segment_data, crop_cache, media, keyframes
+        )
+        geometry = render_cache.geometry_hash(fingerprint, segment_data, profile, crop)
+        style = render_cache.style_hash(profile)
+        meta = {
+            "hash": render_cache.render_hash(geometry, style, audio_gain),
+            "geometry_hash": geometry,
+            "style_hash": style,
+            "profile": profile["name"],
+            "start": segment_data["start"],
+            "end": segment_data["end"],
+            "crop": list(crop) if crop else None,
+            "audio_gain_db": audio_gain,
+        }
+
+        if render_cache.is_render_cached(output_video, meta["hash"]):
+            logger.info(f"[{job_id}] ♻️ Short #{segment_index} ({profile['name']}) inalterado, pulando.")
+            continue
+
+        pending.append((profile, crop, output_video, ass_path, meta))
+
+    # A análise de crop fica salva para re-estilizações futuras
+    if crop_cache != crops_before:
+        render_cache.save_crop_analysis(
+            job_folder, segment_index, fingerprint, segment_data, crop_cache
+        )
 
-            # Novas dimensões após o redimensionamento
-            new_w = math.ceil(orig_w * scale_factor)
-            new_h = math.ceil(orig_h * scale_factor)
+    # --- Stream copy: perfis que não precisam de filtro nenhum ---
+    snapped_start = None
+    filtered = []
 
-            # Garantir que sejam pares (FFmpeg gosta de pares)
-            if new_w % 2 != 0:
-                new_w += 1
-            if new_h % 2 != 0:
-                new_h += 1
+    for item in pending:
+        profile, crop, output_video, ass_path, meta = item
+
+        if can_stream_copy(profile, media):
+            if snapped_start is None:
+                snapped_start = snap_start_to_keyframe(
+                    input_video, segment_data["start"], keyframes
+                )
+
+            if snapped_start is not None:
+                logger.info(
+                    f"[{job_id}] ⚡ Short #{segment_index} ({profile['name']}) via stream copy "
+                    f"(início {segment_data['start']:.3f}s -> keyframe {snapped_start:.3f}s)"
+                )
+                stream_copy_cut(
+                    input_video, output_video, snapped_start, segment_data["end"], on_progress, audio_gain
+                )
+                render_cache.save_render_meta(
+                    output_video, {**meta, "mode": "copy", "cut_start": snapped_start}
+                )
+                continue
 
             logger.info(
-                f"📐 Dimensões: Orig={orig_w}x{orig_h} -> New={new_w}x{new_h} (Alvo 1080x1920)"
+                f"[{job_id}] Nenhum keyframe a ±{settings.STREAM_COPY_SNAP_TOLERANCE}s do início, re-encodando."
             )
 
-            final_crop_x = 0
+        filtered.append(item)
 
-            # Só roda detecção inteligente se tivermos largura sobrando para "panear"
-            # Se new_w for muito próximo de 1080, apenas centralizamos.
-            if new_w > target_w + 10:
-                crop_centers_list = get_smart_crop_coordinates(
-                    str(input_video),
-                    segment_data["duration"],
-                    segment_data["start"],
-                    segment_data["end"],
-                )
+    pending = filtered
 
-                if crop_centers_list:
-                    try:
-                        avg_center_original = statistics.median(crop_centers_list)
-
-                        # Converte o centro original para a nova escala
-                        scaled_center_x = avg_center_original * scale_factor
-
-                        # Calcula o canto esquerdo (Top-Left X)
-                        calculated_x = int(scaled_center_x - (target_w / 2))
-
-                        # Limita para não sair da borda (Clamp)
-                        max_x = new_w - target_w
-                        final_crop_x = max(0, min(calculated_x, max_x))
-
-                        logger.info(
-                            f"🎯 Smart Crop: X calculado={final_crop_x} (Max possível={max_x})"
-                        )
-                    except Exception as e:
-                        logger.error(f"Erro matemática Smart Crop: {e}")
-                        final_crop_x = (new_w - target_w) // 2  # Centraliza fallback
-                else:
-                    final_crop_x = (new_w - target_w) // 2  # Centraliza fallback
-            else:
-                # Se o vídeo já é vertical "apertado", centraliza o excedente mínimo
-                final_crop_x = (new_w - target_w) // 2
-                logger.info(
-                    f"⚠️ Vídeo estreito, forçando centralização. Crop X={final_crop_x}"
-                )
+    if not pending:
+        return all_outputs
 
-            # Filtro com dimensões calculadas explicitamente
-            base_filter = f"[0:v]scale={new_w}:{new_h},crop={target_w}:{target_h}:{final_crop_x}:0[base_out]"
+    logger.info(
+        f"[{job_id}] Renderizando Short #{segment_index} "
+        f"(Perfis: {', '.join(p['name'] for p, *_ in pending)})"
+    )
+
+    # Um ramo do split por perfil (sem split quando há um único perfil)
+    if len(pending) > 1:
+        branch_labels = [f"src_{p['name']}" for p, *_ in pending]
+        filters = [f"[0:v]split={len(pending)}" + "".join(f"[{l}]" for l in branch_labels)]
     else:
-        # Formato Horizontal (1920x1080) com padding se necessário
-        base_filter = f"[0:v]scale=1920:1080:force_original_aspect_ratio=decrease,pad=1920:1080:(ow-iw)/2:(oh-ih)/2[base_out]"
+        branch_labels = ["0:v"]
+        filters = []
 
-    # --- Lógica de Legendas ---
-    if use_subs:
-        # Define resolução de referência para o gerador de legendas
-        options["res_x"] = 1920 if video_format == "horizontal" else 1080
-        options["res_y"] = 1080 if video_format == "horizontal" else 1920
+    outputs = []
 
-        create_ass_file(segment_data, ass_path, options=options)
+    for (profile, crop, output_video, ass_path, meta), src_label in zip(pending, branch_labels):
+        name = profile["name"]
+        base_label = f"base_{name}"
+        out_label = f"outv_{name}"
 
-        # Adiciona o filtro de legendas na pipeline
-        # [base_out] -> Legendas -> [outv]
-        final_filter = f"{base_filter};[base_out]ass='{ass_path}':fontsdir='/app/assets/fonts'[outv]"
-    else:
-        # Apenas passa o stream adiante (usando null filter para manter consistência de nomes)
-        final_filter = f"{base_filter};[base_out]null[outv]"
+        filters.append(build_profile_filter(src_label, base_label, profile, crop))
+
+        # --- Lógica de Legendas ---
+        if profile.get("use_subs", True):
+            # O .ass usa a resolução do perfil (res_x/res_y) como referência
+            with profiled("subtitles"):
+                create_ass_file(segment_data, ass_path, options=profile)
+
+            # [base] -> Legendas -> [outv]
+            filters.append(
+                f"[{base_label}]ass='{ass_path}':fontsdir='{settings.FONTS_DIR}'[{out_label}]"
+            )
+        else:
+            # Apenas passa o stream adiante (usando null filter para manter consistência de nomes)
+            filters.append(f"[{base_label}]null[{out_label}]")
+
+        outputs.append((out_label, output_video, meta))
 
     # --- Montagem do Comando FFmpeg ---
     cmd = [
@@ -170,27 +417,40 @@ def render_short(
         "-i",
         str(input_video),
         "-filter_complex",
-        final_filter,
-        "-map",
-        "[outv]",  # Mapeia o vídeo processado
-        "-map",
-        "0:a",  # Mapeia o áudio original
-        "-c:v",
-        "libx264",
-        "-preset",
-        "ultrafast",
-        "-c:a",
-        "aac",
-        "-b:a",
-        "128k",
-        str(output_video),
+        ";".join(filters),
     ]
 
+    # Uma saída por perfil, todas alimentadas pelo mesmo decode
+    for out_label, output_video, _ in outputs:
+        cmd += [
+            "-map",
+            f"[{out_label}]",  # Mapeia o vídeo processado do perfil
+            "-map",
+            "0:a",  # Mapeia o áudio original
+            *audio_gain_args(audio_gain),  # normalização do clip (sem segunda passada)
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            *settings.ffmpeg_thread_args(),
+            "-c:a",
+            "aac",
+            "-b:a",
+            "128k",
+            "-f",
+            "mp4",
+            str(partial_path(output_video)),  # vira o .mp4 final só depois do sucesso
+        ]
+
     try:
-        subprocess.run(
-            cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
-        )
-        return output_video
+        run_ffmpeg(cmd, duration=segment_data["duration"], on_progress=on_progress)
     except subprocess.CalledProcessError as e:
         logger.error(f"Erro FFmpeg: {e.stderr.decode()}")
         raise e
+
+    # Só publica os arquivos e grava o hash depois que o ffmpeg terminou com sucesso
+    for _, output_video, meta in outputs:
+        os.replace(partial_path(output_video), output_video)
+        render_cache.save_render_meta(output_video, {**meta, "mode": "encode"})
+
+    return all_outputs
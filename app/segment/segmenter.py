@@ -12,12 +12,15 @@ WEAK_ENDINGS = ("e", "mas", "porque", "entao", "então", "assim", "ne", "né", "
 BAD_STARTERS = ("e", "mas", "entao", "então", "tipo", "assim", "bom", "ai", "aí", "cara", "olha")
 
 LONG_PAUSE_THRESHOLD = 0.7  # Segundos para considerar silêncio relevante
+# Folga em volta do fim da palavra ao procurar o silêncio no áudio (timestamps do Whisper derivam)
+PAUSE_SEARCH_TOLERANCE = 0.2
 
 # Pesos da Heurística
 SCORE_STRONG_PUNCT = 10     # Ponto final é ouro
 SCORE_LONG_PAUSE = 8        # Silêncio é prata
 SCORE_WEAK_ENDING = -20     # Terminar com "e" é proibido
 SCORE_TIME_BONUS_MAX = 5    # Incentivo para vídeos mais longos
+SCORE_NO_SILENCE = -5       # O áudio mostra fala contínua no ponto de corte
 
 @dataclass
 class Segment:
@@ -26,6 +29,7 @@ class Segment:
     text: str
     duration: float
     words: List[Dict]
+    score: float = 0.0  # score do ponto de corte final (ranking do plano / dry run)
 
 def load_phrases(job_id: str):
     from app.config.settings import settings
@@ -38,15 +42,24 @@ def save_segments(segments: List[Segment], job_id: str):
     path = settings.get_job_path(job_id) / "segments.json"
     data = [{
         "start": s.start, "end": s.end, "duration": s.duration,
-        "text": s.text, "words": s.words
+        "text": s.text, "words": s.words, "score": s.score
     } for s in segments]
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
+def load_segments(job_id: str) -> List[Dict]:
+    from app.config.settings import settings
+    path = settings.get_job_path(job_id) / "segments.json"
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 class Segmenter:
-    def __init__(self, min_duration=30, max_duration=60):
+    def __init__(self, min_duration=30, max_duration=60, energy_index=None):
         self.min_duration = min_duration
         self.max_duration = max_duration
+        # Índice de silêncios do áudio (app/audio/energy.py); sem ele, as pausas
+        # vêm só dos intervalos entre os timestamps das palavras
+        self.energy_index = energy_index
     
     def segment(self, transcription_data: Dict) -> List[Segment]:
         # Flatten
@@ -81,7 +94,8 @@ class Segmenter:
             segment_words = self._clean_hook(segment_words)
             
             if segment_words:
-                self._create_segment(video_segments, segment_words)
+                cut_score = self._cut_score(all_words, best_cut_index, all_words[best_cut_index]['end'] - segment_words[0]['start'])
+                self._create_segment(video_segments, segment_words, cut_score)
             
             # Avança o cursor para a próxima palavra após o corte
             index = best_cut_index + 1
@@ -96,7 +110,6 @@ class Segmenter:
         best_index = -1
         
         start_time = all_words[start_index]['start']
-        max_idx = len(all_words) - 1
 
         for i in range(start_index, len(all_words)):
             word = all_words[i]
@@ -113,31 +126,7 @@ class Segmenter:
                 else:
                     return best_index 
 
-            # --- CÁLCULO DE SCORE ---
-            score = 0
-            text = word['word'].lower().strip()
-            text_clean = ''.join(c for c in text if c.isalnum())
-            
-            # Checa Pausa
-            pause_duration = 0
-            if i < max_idx:
-                pause_duration = all_words[i+1]['start'] - word['end']
-            
-            # Critério 1: Pontuação (Usa o text com pontuação)
-            if any(text.endswith(p) for p in STRONG_PUNCTUATION):
-                score += SCORE_STRONG_PUNCT
-            
-            # Critério 2: Pausa de Áudio
-            if pause_duration > LONG_PAUSE_THRESHOLD:
-                score += SCORE_LONG_PAUSE
-            
-            # Critério 3: Terminação Ruim (Usa text_clean)
-            if text_clean in WEAK_ENDINGS:
-                score += SCORE_WEAK_ENDING
-
-            # Critério 4: Bônus de Tempo
-            time_bonus = (current_duration / self.max_duration) * SCORE_TIME_BONUS_MAX
-            score += time_bonus
+            score = self._cut_score(all_words, i, current_duration)
 
             if score > best_score:
                 best_score = score
@@ -148,6 +137,43 @@ class Segmenter:
         
         return -1
 
+    def _cut_score(self, all_words, i, current_duration):
+        """Score de cortar logo após a palavra i (segmento com current_duration segundos)."""
+        word = all_words[i]
+        score = 0
+        text = word['word'].lower().strip()
+        text_clean = ''.join(c for c in text if c.isalnum())
+        
+        # Checa Pausa
+        pause_duration = 0
+        next_start = word['end']
+        if i < len(all_words) - 1:
+            next_start = all_words[i+1]['start']
+            pause_duration = next_start - word['end']
+
+        if self.energy_index is not None:
+            # O silêncio medido no áudio vale mais que o intervalo entre timestamps
+            pause_duration = self.energy_index.silence_after(word['end'], next_start, PAUSE_SEARCH_TOLERANCE)
+            if pause_duration == 0:
+                score += SCORE_NO_SILENCE
+        
+        # Critério 1: Pontuação (Usa o text com pontuação)
+        if any(text.endswith(p) for p in STRONG_PUNCTUATION):
+            score += SCORE_STRONG_PUNCT
+        
+        # Critério 2: Pausa de Áudio
+        if pause_duration > LONG_PAUSE_THRESHOLD:
+            score += SCORE_LONG_PAUSE
+        
+        # Critério 3: Terminação Ruim (Usa text_clean)
+        if text_clean in WEAK_ENDINGS:
+            score += SCORE_WEAK_ENDING
+
+        # Critério 4: Bônus de Tempo
+        time_bonus = (current_duration / self.max_duration) * SCORE_TIME_BONUS_MAX
+        score += time_bonus
+        return score
+
     def _clean_hook(self, words):
         """
         Remove vícios de linguagem do início.
@@ -168,11 +194,11 @@ class Segmenter:
             break
         return words
 
-    def _create_segment(self, segments_list, words):
+    def _create_segment(self, segments_list, words, score=0.0):
         start = words[0]['start']
         end = words[-1]['end']
         duration = end - start
         text = "".join([w['word'] for w in words]).strip()
         
-        new_seg = Segment(start=start, end=end, text=text, duration=duration, words=words)
+        new_seg = Segment(start=start, end=end, text=text, duration=duration, words=words, score=round(score, 2))
         segments_list.append(new_seg)
\ No newline at end of file
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    source      TEXT,
+    options     TEXT,
+    status      TEXT NOT NULL DEFAULT 'queued',
+    stage       TEXT,
+    clip_count  INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at DESC);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at DESC);
+CREATE INDEX IF NOT EXISTS jobs_source ON jobs (source, created_at DESC);
+"""
+
+# Status possíveis: queued, deferred, running, planned (dry run), done,
+# partial (algum render falhou), failed, cancelled
+FINAL_STATUSES = ("planned", "done", "partial", "failed", "cancelled")
+
+# Uma conexão por thread (sqlite3 não compartilha conexões entre threads) e por processo
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+
+    settings.CATALOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    is_new = not settings.CATALOG_PATH.exists()
+
+    conn = sqlite3.connect(str(settings.CATALOG_PATH), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL: a interface lê enquanto os workers escrevem
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+
+    _local.conn = conn
+    _local.pid = os.getpid()
+
+    if is_new:
+        backfill_from_disk(conn)
+    return conn
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict:
+    data = dict(row)
+    data["options"] = json.loads(data["options"]) if data.get("options") else {}
+    return data
+
+
+def record_submission(job_id: str, source: str, options: dict, status: str = "queued"):
+    """Chamado na admissão (UI / CLI), antes de qualquer etapa rodar."""
+    now = time.time()
+    try:
+        _connect().execute(
+            "INSERT INTO jobs (job_id, source, options, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+            (job_id, source, json.dumps(options or {}, default=str), status, now, now),
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao registrar job {job_id} no catálogo: {e}")
+
+
+def update_job(job_id: str, status: Optional[str] = None, **fields):
+    """Transição de etapa / status (o job é criado se ainda não existir no catálogo)."""
+    now = time.time()
+    if status is not None:
+        fields["status"] = status
+        if status in FINAL_STATUSES:
+            fields["finished_at"] = now
+    fields["updated_at"] = now
+
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    try:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR IGNORE INTO jobs (job_id, created_at, updated_at) VALUES (?, ?, ?)",
+            (job_id, now, now),
+        )
+        conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao atualizar job {job_id} no catálogo: {e}")
+
+
+def delete_job(job_id: str):
+    try:
+        _connect().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao remover job {job_id} do catálogo: {e}")
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    row = _connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def list_jobs(page: int = 1, page_size: int = 20, status: Optional[str] = None) -> List[Dict]:
+    """Jobs mais recentes primeiro; usa o índice (status, created_at), custo O(page_size)."""
+    offset = (max(1, page) - 1) * page_size
+    if status:
+        rows = _connect().execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (status, page_size, offset),
+        )
+    else:
+        rows = _connect().execute(
+            "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (page_size, offset),
+        )
+    return [_row_to_dict(r) for r in rows.fetchall()]
+
+
+def jobs_with_source(source: str, statuses=("planned", "done", "partial")) -> List[str]:
+    """Jobs (mais recentes primeiro) que já processaram esta fonte."""
+    marks = ", ".join("?" for _ in statuses)
+    rows = _connect().execute(
+        f"SELECT job_id FROM jobs WHERE source = ? AND status IN ({marks}) ORDER BY created_at DESC LIMIT 10",
+        (source, *statuses),
+    )
+    return [r["job_id"] for r in rows.fetchall()]
+
+
+def count_jobs(status: Optional[str] = None) -> int:
+    if status:
+        return _connect().execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+    return _connect().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+
+def backfill_from_disk(conn: sqlite3.Connection):
+    """Primeira abertura do catálogo: registra os jobs que já existiam no JOBS_DIR."""
+    if not settings.JOBS_DIR.exists():
+        return
+
+    rows = []
+    for job_folder in settings.JOBS_DIR.iterdir():
+        if not job_folder.is_dir():
+            continue
+        mtime = job_folder.stat().st_mtime
+        outputs = job_folder / "outputs"
+        clip_count = len(list(outputs.glob("*.mp4"))) if outputs.exists() else 0
+        status = "done" if clip_count else "failed"
+        rows.append((job_folder.name, status, clip_count, mtime, mtime, mtime))
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO jobs (job_id, status, clip_count, created_at, updated_at, finished_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    logger.info(f"🗂️  Catálogo criado com {len(rows)} jobs existentes.")
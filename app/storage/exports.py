@@ -0,0 +1,63 @@
+import fcntl
+import hashlib
+import logging
+import os
+import zipfile
+from pathlib import Path
+from typing import List
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = "exports"
+
+
+def output_videos(job_id: str) -> List[Path]:
+    out_dir = settings.get_job_path(job_id) / "outputs"
+    if not out_dir.exists():
+        return []
+    return sorted(out_dir.glob("*.mp4"))
+
+
+def outputs_version(job_id: str) -> str:
+    """Muda sempre que um clip é adicionado, removido ou re-renderizado."""
+    digest = hashlib.sha256()
+    for video in output_videos(job_id):
+        st = video.stat()
+        digest.update(f"{video.name}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def export_zip_path(job_id: str) -> Path:
+    return settings.get_job_path(job_id) / EXPORTS_DIR / f"shorts_{outputs_version(job_id)}.zip"
+
+
+def build_export_zip(job_id: str) -> Path:
+    """
+    ZIP dos clipes, gerado uma vez por versão dos outputs. ZIP_STORED: os MP4
+    já são comprimidos, então o zip é só uma cópia sequencial. Versões antigas
+    são apagadas; reruns / downloads simultâneos esperam o mesmo build (lock).
+    """
+    videos = output_videos(job_id)
+    zip_path = export_zip_path(job_id)
+    zip_path.parent.mkdir(exist_ok=True)
+
+    with open(zip_path.parent / ".build.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        if zip_path.exists():
+            return zip_path
+
+        tmp_path = zip_path.with_name(zip_path.name + ".part")
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for video in videos:
+                zf.write(video, arcname=video.name)
+        os.replace(tmp_path, zip_path)
+
+        for old in zip_path.parent.glob("shorts_*.zip"):
+            if old != zip_path:
+                old.unlink(missing_ok=True)
+
+    logger.info(f"📦 [JOB {job_id}] ZIP gerado: {zip_path.name} ({len(videos)} clipes)")
+    return zip_path
@@ -0,0 +1,254 @@
+import glob
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.config.settings import settings
+from app.jobs.manifest import MANIFEST_FILE, mark_pruned, stage_completed_at
+from app.storage.catalog import delete_job, get_job
+
+logger = logging.getLogger(__name__)
+
+# Intermediários e a última etapa que os consome. Depois dela (mais a
+# retenção configurada) o arquivo não é mais lido por ninguém.
+INTERMEDIATES = {
+    "audio.wav": "transcribe",
+}
+
+
+def intermediates() -> Dict[str, str]:
+    # input.mp4 é o maior arquivo, mas a re-estilização precisa dele
+    if settings.KEEP_INPUT_VIDEO:
+        return INTERMEDIATES
+    return {**INTERMEDIATES, "input.mp4": "finalize"}
+
+
+# Sobras que nunca deveriam ficar na pasta do job (download bruto, saídas pela metade)
+LEFTOVER_PATTERNS = ("raw_temp.*", "*.part", "outputs/*.part", "exports/*.part", "previews/*.part")
+
+# Marcador de acesso (LRU) atualizado pela interface
+LAST_ACCESS_FILE = ".last_access"
+# Job aberto na interface há menos que isso (s) não é evictado
+RECENT_ACCESS_SECONDS = 3600
+
+# Status do catálogo de um job com trabalho pendente (inclui re-estilização
+# e render de seleção de plano, que rodam depois do finalize)
+ACTIVE_STATUSES = ("queued", "deferred", "running")
+
+# Caches que podem ser regenerados a qualquer momento (apagados primeiro quando falta espaço)
+REGENERABLE_PATTERNS = ("shorts_*.zip", "exports/*.zip")
+
+
+class StorageFull(Exception):
+    """Volume sem espaço para um novo ingest."""
+
+
+def _file_size(path: Path, seen: set) -> int:
+    st = path.stat()
+    # Hardlinks (jobs coalescidos) ocupam o disco uma vez só
+    key = (st.st_dev, st.st_ino)
+    if key in seen:
+        return 0
+    seen.add(key)
+    return st.st_blocks * 512
+
+
+def job_size(job_folder: Path, seen: set = None) -> int:
+    if seen is None:
+        seen = set()
+    total = 0
+    for root, _, files in os.walk(job_folder):
+        for name in files:
+            try:
+                total += _file_size(Path(root) / name, seen)
+            except OSError:
+                pass
+    return total
+
+
+def job_last_used(job_folder: Path) -> float:
+    """Último uso do job: pasta, manifest, outputs ou acesso pela interface."""
+    candidates = [job_folder, job_folder / MANIFEST_FILE, job_folder / "outputs", job_folder / LAST_ACCESS_FILE]
+    return max((p.stat().st_mtime for p in candidates if p.exists()), default=0.0)
+
+
+def touch_job(job_id: str):
+    """Marca o job como usado agora (ex: aberto na aba Resultados) para o LRU."""
+    job_folder = settings.JOBS_DIR / job_id
+    if job_folder.exists():
+        # Arquivo próprio: mexer no mtime da pasta mudaria a ordem da lista de jobs
+        (job_folder / LAST_ACCESS_FILE).touch()
+
+
+def is_job_active(job_id: str) -> bool:
+    """
+    Job em uso: aberto há pouco na interface, em andamento no catálogo, ou
+    sem finalize no manifest e mexido há pouco tempo.
+    """
+    job_folder = settings.JOBS_DIR / job_id
+    now = time.time()
+
+    access = job_folder / LAST_ACCESS_FILE
+    if access.exists() and now - access.stat().st_mtime < RECENT_ACCESS_SECONDS:
+        return True
+
+    # Linha presa em "running" (worker morto) não segura o job para sempre
+    job = get_job(job_id)
+    if job and job["status"] in ACTIVE_STATUSES and now - job["updated_at"] < settings.MAX_JOB_TIMEOUT:
+        return True
+
+    if stage_completed_at(job_id, "finalize") is not None:
+        return False
+    return now - job_last_used(job_folder) < settings.MAX_JOB_TIMEOUT
+
+
+def storage_usage() -> Dict:
+    """Uso do storage: bytes dos jobs, cota e espaço livre no volume."""
+    seen = set()
+    jobs = [p for p in settings.JOBS_DIR.iterdir() if p.is_dir()] if settings.JOBS_DIR.exists() else []
+    used = sum(job_size(j, seen) for j in jobs)
+    disk = shutil.disk_usage(settings.STORAGE_DIR if settings.STORAGE_DIR.exists() else "/")
+    return {
+        "used_bytes": used,
+        "quota_bytes": settings.STORAGE_QUOTA_BYTES,
+        "free_bytes": disk.free,
+        "total_bytes": disk.total,
+        "jobs": len(jobs),
+    }
+
+
+def _remove(path: Path) -> int:
+    try:
+        size = path.stat().st_blocks * 512
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+        return size
+    except FileNotFoundError:
+        return 0
+
+
+def remove_leftovers(job_folder: Path) -> int:
+    """Apaga download bruto e arquivos .part (ex: após falha no ingest/render)."""
+    freed = 0
+    for pattern in LEFTOVER_PATTERNS:
+        for path in glob.glob(str(Path(job_folder) / pattern)):
+            freed += _remove(Path(path))
+    return freed
+
+
+def release_intermediates(job_id: str, force: bool = False) -> int:
+    """
+    Apaga os intermediários cujas etapas consumidoras já terminaram há mais
+    de INTERMEDIATE_RETENTION segundos (negativo = nunca; force ignora a retenção).
+    """
+    if settings.INTERMEDIATE_RETENTION < 0 and not force:
+        return 0
+
+    job_folder = settings.JOBS_DIR / job_id
+    now = time.time()
+    freed = 0
+    pruned = []
+
+    for name, consumer in intermediates().items():
+        path = job_folder / name
+        if not path.exists():
+            continue
+        done_at = stage_completed_at(job_id, consumer)
+        if done_at is None:
+            continue
+        if force or now - done_at >= settings.INTERMEDIATE_RETENTION:
+            freed += _remove(path)
+            pruned.append(name)
+
+    if pruned:
+        mark_pruned(job_id, pruned)
+        logger.info(f"🧹 [JOB {job_id}] Intermediários removidos: {', '.join(pruned)} ({freed / 1e6:.1f} MB)")
+    return freed
+
+
+def cleanup_after_stage(job_id: str, stage: str):
+    """Chamado pelo worker ao fim de cada etapa."""
+    try:
+        if stage == "ingest":
+            remove_leftovers(settings.JOBS_DIR / job_id)
+        release_intermediates(job_id)
+    except Exception as e:
+        logger.error(f"Erro na limpeza do job {job_id}: {e}")
+
+
+def evict_jobs(bytes_needed: int, exclude: Optional[str] = None) -> int:
+    """
+    Libera espaço: primeiro caches regeneráveis e intermediários de todos os
+    jobs, depois jobs inteiros do menos recentemente usado para o mais recente
+    (nunca um job em andamento).
+    """
+    jobs = sorted(
+        (p for p in settings.JOBS_DIR.iterdir() if p.is_dir() and p.name != exclude),
+        key=job_last_used,
+    )
+    freed = 0
+
+    for job_folder in jobs:
+        if freed >= bytes_needed:
+            return freed
+        for pattern in REGENERABLE_PATTERNS:
+            for path in job_folder.glob(pattern):
+                freed += _remove(path)
+        if not is_job_active(job_folder.name):
+            freed += release_intermediates(job_folder.name, force=True)
+
+    for job_folder in jobs:
+        if freed >= bytes_needed:
+            break
+        if is_job_active(job_folder.name):
+            continue
+        size = job_size(job_folder)
+        shutil.rmtree(job_folder, ignore_errors=True)
+        delete_job(job_folder.name)
+        freed += size
+        logger.info(f"🗑️  Job {job_folder.name} removido (LRU, {size / 1e6:.1f} MB)")
+
+    return freed
+
+
+def enforce_quota(exclude: Optional[str] = None) -> int:
+    """
+    Evicta até o uso dos jobs ficar abaixo de STORAGE_QUOTA_BYTES. Sem cota
+    nada é apagado: o volume pode ser dividido com outros dados, e pouco
+    espaço livre só recusa novos ingests (ensure_ingest_space).
+    """
+    if not settings.STORAGE_QUOTA_BYTES:
+        return 0
+    need = storage_usage()["used_bytes"] - settings.STORAGE_QUOTA_BYTES
+    if need <= 0:
+        return 0
+    return evict_jobs(need, exclude=exclude)
+
+
+def ensure_ingest_space(job_id: str):
+    """
+    Antes do ingest: com o volume quase cheio, recusa o job (StorageFull)
+    em vez de falhar no meio do ffmpeg. Não apaga nada (a cota é do sweep).
+    """
+    usage = storage_usage()
+    if usage["free_bytes"] < settings.STORAGE_MIN_FREE_BYTES:
+        raise StorageFull(
+            f"Espaço insuficiente: {usage['free_bytes'] / 1e9:.1f} GB livres "
+            f"(mínimo {settings.STORAGE_MIN_FREE_BYTES / 1e9:.1f} GB)"
+        )
+
+
+def sweep_storage() -> int:
+    """Varredura periódica (supervisor): retenção dos intermediários + cota."""
+    freed = 0
+    if settings.JOBS_DIR.exists():
+        for job_folder in settings.JOBS_DIR.iterdir():
+            if job_folder.is_dir():
+                freed += release_intermediates(job_folder.name)
+    freed += enforce_quota()
+    return freed
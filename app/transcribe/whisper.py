@@ -1,9 +1,12 @@
 import json
 import logging
 import os
+import time
 import torch
 from faster_whisper import WhisperModel
 from app.config.settings import settings
+from app.jobs.cancel import raise_if_cancelled
+from app.jobs.profiling import profiled
 
 logger = logging.getLogger(__name__)
 
@@ -37,22 +40,39 @@ def get_device_config():
     logger.warning("⚠️ Nenhuma GPU NVIDIA detectada ou configurada. Usando CPU (será mais lento).")
     return "cpu", "int8"
 
-def transcribe_audio(job_id: str):
+# Modelo carregado uma vez por processo. Workers de transcrição (ver
+# app/jobs/supervisor.py) o pré-carregam e o reaproveitam entre jobs.
+_whisper_model = None
+
+def load_whisper_model():
+    global _whisper_model
+
+    if _whisper_model is None:
+        device, compute_type = get_device_config()
+
+        compute_type = "float32"
+
+        logger.info(f"Carregando Whisper '{settings.WHISPER_MODEL}' | Device: {device} | Type: {compute_type}")
+
+        # Carrega o modelo Faster-Whisper
+        _whisper_model = WhisperModel(
+            settings.WHISPER_MODEL,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=settings.WHISPER_CPU_THREADS
+        )
+
+    return _whisper_model
+
+def transcribe_audio(job_id: str, on_progress=None):
     logger.info(f"[{job_id}] Iniciando transcrição com Faster-Whisper...")
     
     job_dir = settings.get_job_path(job_id)
     audio_path = job_dir / "audio.wav"
     output_path = job_dir / "transcript.json"
 
-    device, compute_type = get_device_config()
-    
-    compute_type = "float32" 
-
-    logger.info(f"[{job_id}] Iniciando Whisper | Device: {device} | Type: {compute_type}")
-    
     try:
-        # Carrega o modelo Faster-Whisper
-        model = WhisperModel("small", device=device, compute_type=compute_type)
+        model = load_whisper_model()
 
         segments, info = model.transcribe(
             str(audio_path), 
@@ -64,30 +84,50 @@ def transcribe_audio(job_id: str):
         )
 
         formatted_result = {"segments": []}
+
+        # Progresso = último timestamp transcrito / duração do áudio
+        started_at = time.monotonic()
+        last_report = 0.0
         
-        # Iteração com logs detalhados
-        for i, segment in enumerate(segments):
-            # Log para provar que está funcionando
-            if i % 10 == 0:
-                logger.info(f"🗣️  Segmento {i}: {segment.text[:40]}...")
-
-            segment_dict = {
-                "start": segment.start,
-                "end": segment.end,
-                "text": segment.text,
-                "words": []
-            }
-            
-            if segment.words:
-                for word in segment.words:
-                    segment_dict["words"].append({
-                        "word": word.word,
-                        "start": word.start,
-                        "end": word.end,
-                        "score": word.probability
+        # A iteração é onde o Whisper realmente decodifica (generator)
+        with profiled("transcribe"):
+            # Iteração com logs detalhados
+            for i, segment in enumerate(segments):
+                # O generator só decodifica o próximo trecho quando pedido:
+                # parar aqui interrompe o Whisper
+                raise_if_cancelled()
+
+                # Log para provar que está funcionando
+                if i % 10 == 0:
+                    logger.info(f"🗣️  Segmento {i}: {segment.text[:40]}...")
+
+                now = time.monotonic()
+                if on_progress and info.duration and now - last_report >= 1.0:
+                    elapsed = now - started_at
+                    on_progress({
+                        "percent": min(100.0, segment.end / info.duration * 100),
+                        "out_time": segment.end,
+                        "speed": segment.end / elapsed if elapsed > 0 else None,
                     })
+                    last_report = now
+
+                segment_dict = {
+                    "start": segment.start,
+                    "end": segment.end,
+                    "text": segment.text,
+                    "words": []
+                }
+            
+                if segment.words:
+                    for word in segment.words:
+                        segment_dict["words"].append({
+                            "word": word.word,
+                            "start": word.start,
+                            "end": word.end,
+                            "score": word.probability
+                        })
             
-            formatted_result["segments"].append(segment_dict)
+                formatted_result["segments"].append(segment_dict)
 
         # Salva o JSON
         with open(output_path, "w", encoding="utf-8") as f:
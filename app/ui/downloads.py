@@ -0,0 +1,162 @@
+import logging
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.config.settings import settings
+from app.render.previews import PREVIEWS_DIR
+from app.storage.exports import build_export_zip, output_videos
+
+logger = logging.getLogger(__name__)
+
+# Leitura em blocos: o processo nunca segura o arquivo inteiro na memória
+CHUNK_SIZE = 1024 * 1024
+
+JOB_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def request_host() -> str:
+    """
+    Host (sem porta) pelo qual o navegador abriu a interface, do cabeçalho
+    Host da sessão Streamlit. Fora de uma sessão, localhost.
+    """
+    try:
+        import streamlit as st
+        header = st.context.headers.get("Host")
+    except Exception:
+        header = None
+    if not header:
+        return "localhost"
+    hostname = urlsplit(f"//{header}").hostname or "localhost"
+    # IPv6 volta entre colchetes para entrar na URL
+    return f"[{hostname}]" if ":" in hostname else hostname
+
+
+def base_url() -> str:
+    return settings.download_base_url(request_host())
+
+
+def zip_url(job_id: str) -> str:
+    return f"{base_url()}/jobs/{job_id}/zip"
+
+
+def video_url(job_id: str, name: str, inline: bool = False) -> str:
+    """inline=True para tocar no player (<video>) em vez de baixar."""
+    url = f"{base_url()}/jobs/{job_id}/outputs/{name}"
+    return url + "?inline=1" if inline else url
+
+
+def preview_url(job_id: str, name: str) -> str:
+    return f"{base_url()}/jobs/{job_id}/previews/{name}?inline=1"
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """'bytes=100-' / 'bytes=100-199' -> (início, fim inclusivo). Só um intervalo."""
+    if not header or not header.startswith("bytes="):
+        return None
+    start_s, _, end_s = header[6:].split(",")[0].partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            # bytes=-500: os últimos 500 bytes
+            start = max(0, size - int(end_s))
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return None
+    return start, min(end, size - 1)
+
+
+class _DownloadHandler(BaseHTTPRequestHandler):
+    """GET /jobs/<id>/zip, /jobs/<id>/outputs/<clip>.mp4 e /jobs/<id>/previews/<prévia>.mp4 direto do disco."""
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        parts = path.strip("/").split("/")
+        self.inline = "inline=1" in query.split("&")
+
+        if len(parts) < 3 or parts[0] != "jobs" or not JOB_ID_RE.match(parts[1]):
+            self.send_error(404)
+            return
+        job_id = parts[1]
+        if not (settings.JOBS_DIR / job_id).is_dir():
+            self.send_error(404)
+            return
+
+        try:
+            if parts[2:] == ["zip"]:
+                if not output_videos(job_id):
+                    self.send_error(404)
+                    return
+                zip_path = build_export_zip(job_id)
+                self._send_file(zip_path, "application/zip", f"shorts_{job_id}.zip")
+                return
+
+            if len(parts) == 4 and parts[2] == "outputs":
+                # Só arquivos que realmente estão na lista de outputs (sem path traversal)
+                match = next((v for v in output_videos(job_id) if v.name == parts[3]), None)
+                if match is None:
+                    self.send_error(404)
+                    return
+                self._send_file(match, "video/mp4", match.name)
+                return
+
+            if len(parts) == 4 and parts[2] == "previews":
+                previews_dir = settings.JOBS_DIR / job_id / PREVIEWS_DIR
+                match = next((p for p in previews_dir.glob("*.preview.mp4") if p.name == parts[3]), None)
+                if match is None:
+                    self.send_error(404)
+                    return
+                self._send_file(match, "video/mp4", match.name)
+                return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except Exception as e:
+            logger.error(f"Erro no download {self.path}: {e}")
+            self.send_error(500)
+            return
+
+        self.send_error(404)
+
+    def _send_file(self, path: Path, content_type: str, filename: str):
+        size = path.stat().st_size
+        byte_range = _parse_range(self.headers.get("Range"), size)
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1
+
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        disposition = "inline" if self.inline else "attachment"
+        self.send_header("Content-Disposition", f'{disposition}; filename="{filename}"')
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_download_server(port: int) -> ThreadingHTTPServer:
+    """Sobe o servidor de downloads numa thread (uma vez por processo da interface)."""
+    server = ThreadingHTTPServer(("0.0.0.0", port), _DownloadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="downloads-http").start()
+    logger.info(f"📥 Downloads em http://0.0.0.0:{port}/jobs/<job_id>/zip")
+    return server
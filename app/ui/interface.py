@@ -1,13 +1,32 @@
 import uuid
 import datetime
-import time
-import shutil
 from PIL import Image, ImageDraw, ImageFont
 import streamlit as st
 from pathlib import Path
-from redis import Redis
 from rq import Queue
 from app.config.settings import settings
+from app.config.queue import get_redis
+from app.jobs.progress import get_progress, wait_for_progress
+from app.config.profiles import OUTPUT_PROFILES, profile_name_for
+from app.render.previews import poster_path, preview_path
+from app.storage.exports import output_videos
+from app.ui.downloads import preview_url, video_url, zip_url
+
+# Pôsteres por página na aba Resultados
+GALLERY_PAGE_SIZE = 12
+# Jobs por página na lista de uploads (catálogo)
+JOBS_PAGE_SIZE = 20
+
+JOB_STATUS_LABELS = {
+    "queued": "🕒 Na fila",
+    "deferred": "⏳ Aguardando",
+    "running": "⚙️ Processando",
+    "planned": "📋 Plano pronto",
+    "done": "✅ Finalizado",
+    "partial": "⚠️ Parcial",
+    "failed": "❌ Falhou",
+    "cancelled": "⛔ Cancelado",
+}
 
 # Configuração da Página
 st.set_page_config(page_title="Auto Video Cutter", page_icon="✂️", layout="wide")
@@ -30,8 +49,8 @@ is_reviewing = st.session_state.pending_job is not None
 @st.cache_resource
 def get_redis_queue():
     try:
-        redis_conn = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
-        q = Queue('video_jobs', connection=redis_conn)
+        # Conexão do pool do processo (compartilhado entre reruns)
+        q = Queue(settings.QUEUE_NAME, connection=get_redis())
         return q
     except Exception as e:
         return None
@@ -44,45 +63,50 @@ if not q:
 # --- FUNÇÕES ---
 
 def get_job_progress(job_id):
-    """Lê o progresso do Redis (Sem Cache para ser Real-Time)"""
+    """Lê o último snapshot de progresso do Redis (Sem Cache para ser Real-Time)"""
     try:
-        redis_conn = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
-        # Verifica se a chave existe
-        if not redis_conn.exists(f"job_status:{job_id}"):
-            return 0, "Na fila de processamento..."
-            
-        data = redis_conn.hgetall(f"job_status:{job_id}")
-        if data:
-            pct = int(data.get(b'progress', 0))
-            status = data.get(b'status', b'Iniciando...').decode('utf-8')
-            return pct, status
+        data = get_progress(job_id)
+        if data is None:
+            return 0, "Na fila de processamento...", False
+        pct = int(data.get('progress', 0))
+        status = data.get('status', 'Iniciando...')
+        return pct, status, data.get('cancelled') == '1'
     except Exception:
         pass
-    return 0, "Aguardando worker..."
+    return 0, "Aguardando worker...", False
 
 @st.cache_data(ttl=5, show_spinner=False)
-def list_jobs_data():
-    jobs_dir = settings.JOBS_DIR
-    if not jobs_dir.exists():
-        return {}
-    all_jobs = [f for f in jobs_dir.iterdir() if f.is_dir()]
-    all_jobs.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+def list_jobs_data(page=1, status=None):
+    """Uma página do catálogo de jobs (consulta indexada, sem varrer o JOBS_DIR)."""
+    from app.storage.catalog import list_jobs
     formatted_jobs = {}
-    for j in all_jobs:
-        ts = j.stat().st_mtime
-        date_str = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
-        label = f"{date_str}  |  {j.name}"
-        formatted_jobs[label] = j.name
+    for j in list_jobs(page, JOBS_PAGE_SIZE, status):
+        date_str = datetime.datetime.fromtimestamp(j["created_at"]).strftime('%Y-%m-%d %H:%M')
+        status_str = JOB_STATUS_LABELS.get(j["status"], j["status"])
+        label = f"{date_str}  |  {status_str}  |  {j['job_id']}"
+        formatted_jobs[label] = j["job_id"]
     return formatted_jobs
 
-def create_zip(job_id):
-    job_path = settings.get_job_path(job_id)
-    output_dir = job_path / "outputs"
-    zip_path = job_path / f"shorts_{job_id}"
-    if output_dir.exists():
-        shutil.make_archive(str(zip_path), 'zip', output_dir)
-        return f"{zip_path}.zip"
-    return None
+@st.cache_data(ttl=5, show_spinner=False)
+def count_jobs_data(status=None):
+    from app.storage.catalog import count_jobs
+    return count_jobs(status)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_storage_usage():
+    from app.storage.manager import storage_usage
+    return storage_usage()
+
+@st.cache_resource
+def get_download_server():
+    # Um servidor por processo do Streamlit: ZIP e vídeos saem do disco em blocos,
+    # sem passar pela memória da interface (st.download_button carrega tudo)
+    from app.ui.downloads import start_download_server
+    try:
+        return start_download_server(settings.DOWNLOAD_PORT)
+    except OSError as e:
+        print(f"Servidor de downloads indisponível: {e}")
+        return None
 
 @st.cache_data(show_spinner=False) 
 def generate_preview(text_color, font_size, margin_v, is_vertical=True, show_text=True, use_blur=False, font_name="Padrão"):
@@ -143,19 +167,17 @@ def generate_preview(text_color, font_size, margin_v, is_vertical=True, show_tex
     return img
 
 def save_uploaded_file(uploaded_file):
-    inputs_dir = Path("/app/inputs")
-    inputs_dir.mkdir(parents=True, exist_ok=True)
-    file_path = inputs_dir / uploaded_file.name
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    return uploaded_file.name
+    """Grava o upload em blocos, endereçado pelo conteúdo. Retorna (fonte, sha256)."""
+    from app.ingest.uploads import store_upload
+    uploaded_file.seek(0)
+    return store_upload(uploaded_file, uploaded_file.name)
 
 def get_options():
     is_short = "Short" in video_format
     current_font = "Padrão"
     if use_subtitles and 'selected_font' in globals() and selected_font:
         current_font = selected_font
-    return {
+    opts = {
         "min_duration": min_duration,
         "max_duration": max_duration,
         "text_color": text_color,
@@ -164,21 +186,38 @@ def get_options():
         "format": "vertical" if is_short else "horizontal",
         "use_subs": use_subtitles,
         "use_blur": use_blur if is_short else False,
-        "font_name": current_font
+        "font_name": current_font,
+        "profile": profile_job,
+        "dry_run": dry_run
     }
+    if extra_profiles:
+        # Perfil principal + extras, todos no mesmo render
+        primary = profile_name_for(opts["format"], opts["use_blur"])
+        opts["profiles"] = [primary] + [p for p in extra_profiles if p != primary]
+    return opts
 
 def enqueue_job(source, options):
-    from app.jobs.worker import process_video_pipeline
-    
-    my_job_id = str(uuid.uuid4())
-    
-    job = q.enqueue(
-        process_video_pipeline,
-        args=(source, my_job_id, options),
-        job_id=my_job_id,
+    from app.jobs.admission import submit_job
+
+    # Sonda a duração, escolhe prioridade/timeouts e enfileira uma cadeia de
+    # jobs por etapa (ou adia / recusa se o servidor estiver sem capacidade)
+    return submit_job(source, options, str(uuid.uuid4()), connection=q.connection)
+
+def enqueue_restyle(job_id, options):
+    from app.jobs.cancel import clear_cancel
+    from app.jobs.worker import restyle_job
+    from app.storage.catalog import update_job
+
+    clear_cancel(job_id, connection=q.connection)
+    # Em andamento no catálogo: o storage não evicta o job enquanto espera na fila
+    update_job(job_id, "queued", stage="restyle")
+
+    q.enqueue(
+        restyle_job,
+        args=(job_id, options),
         job_timeout=3600
     )
-    return job.id
+    return job_id
 
 # --- SIDEBAR ---
 with st.sidebar:
@@ -211,6 +250,15 @@ with st.sidebar:
     if "Short" in video_format:
         st.caption("Estilo do Short:")
         use_blur = st.checkbox("Usar Fundo Borrado (Fit)", value=False, disabled=is_reviewing)
+
+    # Perfis extras gerados no mesmo render (um decode, várias saídas)
+    primary_profile = profile_name_for("vertical" if "Short" in video_format else "horizontal", use_blur)
+    extra_profiles = st.multiselect(
+        "Gerar também (mesmo render):",
+        [name for name in OUTPUT_PROFILES if name != primary_profile],
+        format_func=lambda name: OUTPUT_PROFILES[name]["label"],
+        disabled=is_reviewing
+    )
     
     st.divider()
     with st.expander("⏱️ Duração e Tempo", expanded=True):
@@ -248,6 +296,32 @@ with st.sidebar:
     else:
         text_color, font_size, pos_vertical = "#FFFF00", 85, 150
 
+    st.divider()
+    try:
+        usage = get_storage_usage()
+        limit = usage["quota_bytes"] or usage["total_bytes"]
+        st.caption(
+            f"💾 Storage: {usage['used_bytes'] / 1e9:.1f} GB em {usage['jobs']} jobs "
+            f"| {usage['free_bytes'] / 1e9:.1f} GB livres"
+        )
+        st.progress(min(1.0, usage["used_bytes"] / limit) if limit else 0.0)
+    except Exception:
+        pass
+
+    with st.expander("🔬 Avançado"):
+        profile_job = st.checkbox(
+            "Perfilar este job (cProfile + flamegraph)",
+            value=False,
+            help="Salva perfis de transcrição, segmentação, smart crop e legendas na pasta do job.",
+            disabled=is_reviewing
+        )
+        dry_run = st.checkbox(
+            "Só planejar (dry run)",
+            value=False,
+            help="Para depois da segmentação: mostra os cortes ranqueados com o tempo estimado de render para você escolher quais renderizar.",
+            disabled=is_reviewing
+        )
+
 # --- LAYOUT PRINCIPAL ---
 left, right = st.columns([4, 1])
 
@@ -259,7 +333,7 @@ with left:
     # ---------------------------------------------------------
     if 'last_job_id' in st.session_state and st.session_state.last_job_id:
         job_id = st.session_state.last_job_id
-        pct, status = get_job_progress(job_id)
+        pct, status, cancelled = get_job_progress(job_id)
         
         # Usamos st.status para agrupar visualmente e economizar espaço
         # expanded=True deixa aberto enquanto processa
@@ -269,12 +343,22 @@ with left:
             st.info(f"{status}")
             st.progress(pct / 100)
             
-            # Botão pequeno para limpar se travar ou terminar
-            if st.button("Limpar / Fechar Status"):
-                st.session_state.last_job_id = None
-                st.rerun()
+            s1, s2 = st.columns(2)
+            # Botão pequeno para limpar se travar ou terminar (o job continua rodando)
+            with s1:
+                if st.button("Limpar / Fechar Status"):
+                    st.session_state.last_job_id = None
+                    st.rerun()
+            # Para o job de verdade: remove as etapas da fila e encerra o ffmpeg/Whisper
+            with s2:
+                if pct < 100 and st.button("⛔ Cancelar Job"):
+                    from app.jobs.cancel import request_cancel
+                    request_cancel(job_id, connection=q.connection)
+                    st.rerun()
 
-        if pct < 100:
+        if cancelled:
+            st.warning("⛔ Job cancelado.")
+        elif pct < 100:
             should_refresh = True
         elif pct == 100:
             # Não limpamos o ID automaticamente aqui para o usuário ver que acabou
@@ -289,12 +373,14 @@ with left:
         
         with st.container(border=True):
             st.markdown("### 🕵️ Confirmar Envio")
-            st.info(f"Fonte: **{p_job['source']}**")
+            st.info(f"Fonte: **{opts.get('source_name', p_job['source'])}**")
             
             c1, c2, c3 = st.columns(3)
             with c1:
                 st.markdown(f"**Formato:**\n{opts['format'].upper()}")
                 st.markdown(f"**Legendas:**\n{'✅ Sim' if opts['use_subs'] else '❌ Não'}")
+                if opts.get('profiles'):
+                    st.markdown(f"**Perfis:**\n{', '.join(opts['profiles'])}")
             with c2:
                 st.markdown(f"**Duração:**\n{opts['min_duration']}s - {opts['max_duration']}s")
                 st.markdown(f"**Estilo:**\n{'Fit (Blur)' if opts.get('use_blur') else 'Fill (Zoom)'}")
@@ -311,9 +397,12 @@ with left:
                 # 1. pending_job vira None (Review fecha)
                 # 2. last_job_id é preenchido (Progresso abre no topo)
                 if st.button("✅ PROCESSAR", type="primary", use_container_width=True):
-                    with st.spinner("Enviando..."):
-                        job_id = enqueue_job(p_job['source'], opts)
-                        st.session_state['last_job_id'] = job_id
+                    with st.spinner("Analisando e enviando..."):
+                        decision = enqueue_job(p_job['source'], opts)
+                    if decision.status == "rejected":
+                        st.error(f"⛔ {decision.reason}")
+                    else:
+                        st.session_state['last_job_id'] = decision.job_id
                         st.session_state.pending_job = None
                         st.rerun()
             with b2:
@@ -352,8 +441,10 @@ with left:
             if st.button("🔍 Revisar Envio", type="primary", key="btn_up"):
                 if uploaded_file:
                     st.session_state.last_active_tab = "file"
-                    filename = save_uploaded_file(uploaded_file)
-                    st.session_state.pending_job = {"source": filename, "type": "file", "options": get_options()}
+                    filename, source_hash = save_uploaded_file(uploaded_file)
+                    # O hash acompanha o job: caches a jusante podem usá-lo como chave
+                    up_opts = {**get_options(), "source_hash": source_hash, "source_name": uploaded_file.name}
+                    st.session_state.pending_job = {"source": filename, "type": "file", "options": up_opts}
                     st.rerun()
                 else:
                     st.warning("Faça o upload primeiro.")
@@ -361,31 +452,119 @@ with left:
     with tab3:
         st.header("📂 Uploads")
        
-        job_options = list_jobs_data() 
+        f_col, p_col = st.columns([2, 1])
+        status_filter = f_col.selectbox(
+            "Status:", [None, *JOB_STATUS_LABELS.keys()],
+            format_func=lambda s: "Todos" if s is None else JOB_STATUS_LABELS[s],
+            key="jobs_status",
+        )
+        total_job_pages = max(1, (count_jobs_data(status_filter) - 1) // JOBS_PAGE_SIZE + 1)
+        jobs_page = p_col.number_input(f"Página (de {total_job_pages})", 1, total_job_pages, 1, key="jobs_page")
+        job_options = list_jobs_data(jobs_page, status_filter)
         if not job_options:
             st.info("Nenhum job encontrado ainda.")
         else:
             s_label = st.selectbox("Selecione:", list(job_options.keys()), disabled=is_reviewing)
             s_id = job_options[s_label]
+            # Job aberto é "usado recentemente" (o LRU do storage remove os mais antigos)
+            from app.storage.manager import touch_job
+            touch_job(s_id)
             out_dir = settings.get_job_path(s_id) / "outputs"
             
             if out_dir.exists():
-                videos = list(out_dir.glob("*.mp4"))
+                videos = output_videos(s_id)
                 if videos:
-                    zip_f = create_zip(s_id)
-                    if zip_f:
-                        with open(zip_f, "rb") as f:
-                            st.download_button("📦 Baixar ZIP", f, f"shorts_{s_id}.zip", "application/zip", type="primary", disabled=is_reviewing)
-                    
+                    get_download_server()
+                    # O ZIP (sem recompressão) é gerado no primeiro download e
+                    # reaproveitado até os outputs mudarem
+                    st.link_button("📦 Baixar ZIP", zip_url(s_id), type="primary", disabled=is_reviewing)
+
+                    # Clip selecionado: só ele carrega o vídeo (direto do servidor de downloads)
+                    selected_clip = st.session_state.get(f"clip_{s_id}")
+                    if selected_clip and any(v.name == selected_clip for v in videos):
+                        with st.container(border=True):
+                            st.markdown(f"**▶️ {selected_clip}**")
+                            preview = preview_path(out_dir / selected_clip)
+                            full = st.toggle("Qualidade original", key=f"full_{s_id}") or not preview.exists()
+                            if full:
+                                st.video(video_url(s_id, selected_clip, inline=True))
+                            else:
+                                st.video(preview_url(s_id, preview.name))
+                            st.link_button("⬇️ Baixar", video_url(s_id, selected_clip), disabled=is_reviewing)
+
+                    # Galeria paginada: só pôsteres (JPEG de poucos KB)
+                    total_pages = (len(videos) - 1) // GALLERY_PAGE_SIZE + 1
+                    page = 1
+                    if total_pages > 1:
+                        page = st.number_input(f"Página (de {total_pages})", 1, total_pages, 1, key=f"page_{s_id}")
+                    page_videos = videos[(page - 1) * GALLERY_PAGE_SIZE: page * GALLERY_PAGE_SIZE]
+
                     cols = st.columns(3)
-                    for i, v in enumerate(videos):
+                    for i, v in enumerate(page_videos):
                         with cols[i % 3]:
-                            st.video(str(v))
-                            with open(v, "rb") as f:
-                                st.download_button("⬇️ Baixar", f, v.name, "video/mp4", key=f"dl_{s_id}_{i}", disabled=is_reviewing)
+                            poster = poster_path(v)
+                            if poster.exists():
+                                st.image(str(poster), caption=v.name, use_container_width=True)
+                            else:
+                                st.caption(f"🎬 {v.name}")
+                            if st.button("▶️ Assistir", key=f"play_{s_id}_{v.name}"):
+                                st.session_state[f"clip_{s_id}"] = v.name
+                                st.rerun()
                 else:
                     st.warning("Aguardando vídeos...")
 
+            # Re-renderiza só os clipes cujo estilo mudou (reaproveita cortes e crop)
+            job_path = settings.get_job_path(s_id)
+            if (job_path / "segments.json").exists() and (job_path / "input.mp4").exists():
+                if st.button("🎨 Re-estilizar com as configurações atuais", key=f"restyle_{s_id}", disabled=is_reviewing):
+                    st.session_state['last_job_id'] = enqueue_restyle(s_id, get_options())
+                    st.rerun()
+
+            # Dry run: cortes ranqueados; só os escolhidos são renderizados
+            from app.jobs.plan import can_render_selection, load_plan, render_selection
+            plan = load_plan(s_id)
+            if plan:
+                with st.expander(f"📋 Plano ({len(plan['clips'])} cortes, ~{plan['estimated_render_seconds'] / 60:.0f} min de render)", expanded=not (out_dir.exists() and output_videos(s_id))):
+                    st.dataframe(
+                        [{
+                            "#": c["rank"],
+                            "Corte": c["index"],
+                            "Início": f"{c['start'] // 60:.0f}:{c['start'] % 60:02.0f}",
+                            "Duração (s)": round(c["duration"], 1),
+                            "Score": c["score"],
+                            "Render (s)": c["estimated_render_seconds"],
+                            "Texto": c["text"][:120],
+                        } for c in plan["clips"]],
+                        hide_index=True,
+                        use_container_width=True,
+                    )
+                    chosen = st.multiselect(
+                        "Cortes para renderizar:",
+                        [c["index"] for c in plan["clips"]],
+                        default=[c["index"] for c in plan["clips"][:5]],
+                        key=f"plan_{s_id}",
+                    )
+                    est = sum(c["estimated_render_seconds"] for c in plan["clips"] if c["index"] in chosen)
+                    if st.button(f"🎬 Renderizar {len(chosen)} cortes (~{est / 60:.0f} min)", key=f"render_plan_{s_id}", disabled=is_reviewing or not chosen or not can_render_selection(s_id)):
+                        render_selection(s_id, chosen, connection=q.connection)
+                        st.session_state['last_job_id'] = s_id
+                        st.rerun()
+
+            # Perfis gerados quando o job foi enviado com "Perfilar este job"
+            profiles_dir = settings.get_job_path(s_id) / "profiles"
+            if profiles_dir.exists():
+                summaries = sorted(profiles_dir.glob("*.txt"))
+                if summaries:
+                    with st.expander(f"🔬 Profiling ({len(summaries)})"):
+                        selected = st.selectbox("Trecho:", [p.stem for p in summaries], key=f"prof_{s_id}")
+                        st.code((profiles_dir / f"{selected}.txt").read_text(encoding="utf-8"), language="text")
+                        p1, p2 = st.columns(2)
+                        for col, ext, label in ((p1, "collapsed", "🔥 Stacks (flamegraph)"), (p2, "prof", "📊 cProfile (.prof)")):
+                            path = profiles_dir / f"{selected}.{ext}"
+                            if path.exists():
+                                with col, open(path, "rb") as f:
+                                    st.download_button(label, f, path.name, key=f"prof_{ext}_{s_id}")
+
 # Preview Lateral
 with right:
     st.markdown("### Preview")
@@ -437,5 +616,7 @@ with right:
         st.caption("ℹ️ Modo sem legendas")
 
 if should_refresh:
-    time.sleep(2)
+    # Em vez de polling fixo, espera o próximo evento publicado pelo worker
+    # (o timeout só garante um rerun periódico caso algum evento se perca)
+    wait_for_progress(st.session_state.last_job_id, timeout=10)
     st.rerun()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import bisect
+import json
+import logging
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def probe_keyframes(video_path: str, start: float = None, end: float = None) -> List[float]:
+    """
+    Lista os timestamps (s) dos keyframes do vídeo via ffprobe.
+    Lê apenas os pacotes (flag K), sem decodificar nenhum frame.
+    start/end limitam a leitura a uma janela (-read_intervals).
+    """
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,flags",
+        "-of",
+        "csv=p=0",
+    ]
+
+    if start is not None:
+        interval = f"{max(0.0, start)}%"
+        if end is not None:
+            interval += f"{end}"
+        cmd += ["-read_intervals", interval]
+
+    cmd.append(str(video_path))
+
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Erro ffprobe (keyframes): {e.stderr}")
+        return []
+
+    keyframes = []
+    for line in result.stdout.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            keyframes.append(float(parts[0]))
+        except ValueError:
+            continue
+
+    keyframes.sort()
+    return keyframes
+
+
+def find_nearest_keyframe(keyframes: List[float], t: float, tolerance: float) -> Optional[float]:
+    """Keyframe mais próximo de t (busca binária), ou None se fora da tolerância."""
+    if not keyframes:
+        return None
+
+    pos = bisect.bisect_left(keyframes, t)
+    candidates = keyframes[max(0, pos - 1) : pos + 1]
+    nearest = min(candidates, key=lambda k: abs(k - t))
+
+    if abs(nearest - t) > tolerance:
+        return None
+    return nearest
+
+
+def previous_keyframe(keyframes: List[float], t: float) -> Optional[float]:
+    """Último keyframe <= t (ponto de seek ideal para decodificar até t)."""
+    pos = bisect.bisect_right(keyframes, t)
+    if pos == 0:
+        return None
+    return keyframes[pos - 1]
+
+
+def build_keyframe_index(video_path: str, index_path: str) -> List[float]:
+    """Probe único de todos os keyframes, salvo no job (keyframes.json)."""
+    keyframes = probe_keyframes(video_path)
+
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"keyframes": keyframes}, f)
+
+    logger.info(f"🔑 Índice de keyframes salvo: {len(keyframes)} keyframes")
+    return keyframes
+
+
+def load_keyframe_index(job_folder: Path) -> Optional[List[float]]:
+    """Lê o keyframes.json do job (None se o job é anterior ao índice)."""
+    index_path = Path(job_folder) / "keyframes.json"
+    if not index_path.exists():
+        return None
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)["keyframes"]
+    except (OSError, ValueError, KeyError):
+        return None
@@ -3,12 +3,41 @@ import mediapipe as mp
 import numpy as np
 import logging
 
+from app.jobs.cancel import raise_if_cancelled
+from app.video.keyframes import previous_keyframe
+
 logger = logging.getLogger(__name__)
 
-def get_smart_crop_coordinates(video_path, duration, segment_start, segment_end):
+def seek_to_segment(cap, fps, segment_start, keyframes=None):
+    """
+    Posiciona o cap no primeiro frame do segmento.
+    Com o índice de keyframes, faz seek direto no keyframe anterior e avança
+    com grab() (sem decodificar para RGB) até o início exato; sem índice,
+    cai no seek por número de frame do OpenCV (lento e impreciso em GOP longo).
+    """
+    start_frame = int(segment_start * fps)
+    seek_point = previous_keyframe(keyframes, segment_start) if keyframes else None
+
+    if seek_point is None:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        return
+
+    cap.set(cv2.CAP_PROP_POS_MSEC, seek_point * 1000)
+
+    # next_ms = timestamp do frame que o próximo read() vai devolver
+    frame_ms = 1000 / fps if fps else 0
+    next_ms = seek_point * 1000
+    while next_ms + frame_ms / 2 < segment_start * 1000:
+        if not cap.grab():
+            break
+        next_ms = cap.get(cv2.CAP_PROP_POS_MSEC) + frame_ms
+
+def get_smart_crop_coordinates(video_path, duration, segment_start, segment_end, keyframes=None, media=None):
     """
     Analisa o vídeo e retorna uma lista de coordenadas X (centro) para cada frame.
     Se o MediaPipe falhar, retorna o centro estático (Fallback).
+    keyframes: índice do job (keyframes.json) para um seek rápido e preciso.
+    media: MediaInfo do job (media.json); evita ler fps/dimensões do container.
     """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -16,9 +45,12 @@ def get_smart_crop_coordinates(video_path, duration, segment_start, segment_end)
         return None
 
     # Propriedades do vídeo
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if media is not None:
+        fps, width, height = media.fps, media.width, media.height
+    else:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     
     # Define o alvo (9:16)
     target_aspect = 9 / 16
@@ -46,7 +78,7 @@ def get_smart_crop_coordinates(video_path, duration, segment_start, segment_end)
         return [default_center_x] * total_frames_to_scan
 
     # Pula para o início do segmento
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    seek_to_segment(cap, fps, segment_start, keyframes)
 
     centers = []
     
@@ -62,6 +94,9 @@ def get_smart_crop_coordinates(video_path, duration, segment_start, segment_end)
             break
 
         frames_read += 1
+
+        # Cancelamento pedido pelo usuário: para no frame atual
+        raise_if_cancelled()
         
         # Otimização: Analisar 1 a cada 2 ou 3 frames para ganhar velocidade
         # Mas para suavidade perfeita, analisamos todos ou interpolamos.
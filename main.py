@@ -1,28 +1,88 @@
 import sys
-from app.config.queue import video_queue
-from app.jobs.worker import process_video_pipeline
+from app.config.queue import redis_conn
+from app.config.settings import settings
+from app.jobs.admission import submit_job
+
+def run_batch(manifest_path: str, wait: bool = True):
+    from app.jobs.batch import format_table, read_batch_file, submit_batch, watch_batch
+
+    entries = read_batch_file(manifest_path)
+    print(f"\n📋 Lote: {len(entries)} linhas em {manifest_path}")
+    print("🔎 Validando e sondando as fontes em paralelo...")
+    submit_batch(entries, connection=redis_conn)
+    print(format_table(entries))
+
+    if wait:
+        watch_batch(entries, connection=redis_conn)
 
 def main():
     if len(sys.argv) < 2:
         print("Uso: python main.py <URL_DO_YOUTUBE>")
+        print("     python main.py cancel <JOB_ID>")
+        print("     python main.py batch <MANIFESTO.csv|.jsonl> [--no-wait]")
+        print("     python main.py plan <URL_DO_YOUTUBE>          (dry run: só o plano de cortes)")
+        print("     python main.py render <JOB_ID> <1,3,5>        (renderiza cortes do plano)")
+        return
+
+    if sys.argv[1] == "batch":
+        if len(sys.argv) < 3:
+            print("Uso: python main.py batch <MANIFESTO.csv|.jsonl> [--no-wait]")
+            return
+        run_batch(sys.argv[2], wait="--no-wait" not in sys.argv[3:])
+        return
+
+    if sys.argv[1] == "cancel":
+        if len(sys.argv) < 3:
+            print("Uso: python main.py cancel <JOB_ID>")
+            return
+        from app.jobs.cancel import request_cancel
+        removed = request_cancel(sys.argv[2], connection=redis_conn)
+        print(f"⛔ Cancelamento enviado para o job {sys.argv[2]} ({removed} etapas tiradas da fila).")
         return
 
+    if sys.argv[1] == "render":
+        if len(sys.argv) < 4:
+            print("Uso: python main.py render <JOB_ID> <1,3,5>")
+            return
+        from app.jobs.plan import render_selection
+        indices = [int(i) for i in sys.argv[3].split(",") if i.strip()]
+        selected = render_selection(sys.argv[2], indices, connection=redis_conn)
+        print(f"🎬 {len(selected)} cortes do job {sys.argv[2]} enviados para render: {selected}")
+        return
+
+    options = {}
+    if sys.argv[1] == "plan":
+        if len(sys.argv) < 3:
+            print("Uso: python main.py plan <URL_DO_YOUTUBE>")
+            return
+        options["dry_run"] = True
+        sys.argv.pop(1)
+
     url = sys.argv[1]
     
     print("\n📩 AUTO VIDEO CUTTER (Modo Assíncrono)")
     print("=======================================")
     
     # Em vez de chamar a função direto, "enfileiramos" (enqueue)
-    # timeout='1h' dá 1 hora para o worker processar antes de dar erro
-    job = video_queue.enqueue(
-        process_video_pipeline, 
-        url, 
-        job_timeout='1h' 
-    )
-
-    print(f"✅ Job enviado para a fila!")
-    print(f"🆔 ID do Job: {job.get_id()}")
-    print(f"📊 Status: {job.get_status()}")
+    # Cada etapa vira um job RQ; os renders se espalham pelos workers.
+    # A admissão sonda a duração antes e decide prioridade e timeouts.
+    decision = submit_job(url, options, connection=redis_conn)
+
+    if decision.status == "rejected":
+        print(f"⛔ Job recusado: {decision.reason}")
+        return
+
+    if decision.status == "coalesced":
+        print(f"♻️ Um job idêntico já está na fila ou rodando; acompanhando ele.")
+    elif decision.status == "deferred":
+        print(f"⏳ Servidor cheio: o job entra na fila assim que houver capacidade.")
+    else:
+        print(f"✅ Job enviado para a fila! (prioridade: {decision.priority})")
+    print(f"🆔 ID do Job: {decision.job_id}")
+    if options.get("dry_run"):
+        print(f"\n📋 Dry run: o plano fica em {settings.JOBS_DIR}/{decision.job_id}/plan.json")
+        print(f"   Depois: python main.py render {decision.job_id} <índices>")
+        return
     print("\nO Worker está processando em segundo plano.")
     print("Você pode enviar outro vídeo agora mesmo!")
 
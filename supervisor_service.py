@@ -0,0 +1,10 @@
+import logging
+from app.jobs.supervisor import start_supervisor
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+if __name__ == '__main__':
+    # Sobe workers de transcrição e de render na mesma máquina,
+    # cada papel com seus núcleos e sua fila (ver app/jobs/supervisor.py)
+    start_supervisor()
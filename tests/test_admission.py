@@ -0,0 +1,81 @@
+import pytest
+
+from app.config.profiles import resolve_profiles
+from app.config.settings import settings
+from app.jobs import admission
+
+
+@pytest.fixture(autouse=True)
+def default_factors(monkeypatch):
+    # Sem Redis / métricas: sempre os fatores padrão
+    monkeypatch.setattr(admission, "real_time_factors", lambda: dict(admission.DEFAULT_REAL_TIME_FACTORS))
+    monkeypatch.setattr(settings, "ADMISSION_CAPACITY", 14400.0)
+    monkeypatch.setattr(settings, "ADMISSION_MAX_COST", 0.0)
+
+
+def test_short_clip_goes_high_priority():
+    decision = admission.plan_admission("job", 5 * 60, {})
+
+    assert decision.status == "accepted"
+    assert decision.priority == "high"
+    assert decision.cost < settings.ADMISSION_CAPACITY
+    assert not decision.reason
+
+
+def test_two_hour_source_fits_capacity():
+    decision = admission.plan_admission("job", 2 * 3600, {})
+
+    assert decision.status == "accepted"
+    assert decision.priority == "low"
+    assert decision.cost <= settings.ADMISSION_CAPACITY
+
+
+@pytest.mark.parametrize("profiles", [None, ["short", "medium"], ["short", "short_blur", "medium"]])
+def test_four_hour_stream_is_never_rejected_by_capacity(profiles):
+    # Só perfis que o job aceitaria (ids de OUTPUT_PROFILES)
+    resolve_profiles({"profiles": profiles})
+    decision = admission.plan_admission("job", 4 * 3600, {"profiles": profiles})
+
+    # Maior que a capacidade: aceito, na fila :low, para rodar sozinho
+    assert decision.cost > settings.ADMISSION_CAPACITY
+    assert decision.status == "accepted"
+    assert decision.priority == "low"
+    assert decision.reason
+
+
+def test_max_cost_rejects(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_COST", 6 * 3600.0)
+
+    assert admission.plan_admission("job", 2 * 3600, {}).status == "accepted"
+    assert admission.plan_admission("job", 5 * 3600, {}).status == "rejected"
+
+
+def test_capacity_is_per_cluster():
+    # Dois hosts anunciando: o mesmo stream cabe sem rodar sozinho
+    decision = admission.plan_admission("job", 4 * 3600, {}, capacity=2 * 14400.0)
+
+    assert decision.status == "accepted"
+    assert decision.cost <= 2 * 14400.0
+    assert not decision.reason
+
+
+class FakeRedis:
+    def __init__(self, hashes=None):
+        self.hashes = hashes or {}
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key, field):
+        return self.hashes.get(key, {}).pop(field, None) is not None
+
+
+def test_oversized_job_waits_for_empty_cluster(monkeypatch):
+    r = FakeRedis()
+    big = 4 * 3600 * 1.425
+
+    assert admission._fits(r, big)
+
+    monkeypatch.setattr(admission, "inflight_cost", lambda _: 300.0)
+    assert not admission._fits(r, big)
+    assert admission._fits(r, 300.0)
@@ -0,0 +1,45 @@
+import pytest
+
+from app.jobs.coalesce import job_key, normalize_source, source_key
+
+
+@pytest.mark.parametrize("source", [
+    "https://www.youtube.com/watch?v=abc123",
+    "https://youtube.com/watch?v=abc123&si=xyz&feature=share",
+    "https://youtu.be/abc123?si=xyz",
+    "https://m.youtube.com/watch?v=abc123",
+    "https://www.youtube.com/shorts/abc123",
+    "https://www.youtube.com/live/abc123",
+    "www.youtube.com/watch?v=abc123",
+    "  https://YOUTUBE.com/watch?v=abc123  ",
+])
+def test_youtube_links_share_the_same_source(source):
+    assert normalize_source(source) == "youtube:abc123"
+
+
+def test_tracking_params_are_dropped_from_other_urls():
+    source = "https://Example.com/videos/ep1/?utm_source=x&b=2&a=1&ab_channel=y"
+
+    # Host minúsculo, sem barra final, parâmetros restantes ordenados
+    assert normalize_source(source) == "https://example.com/videos/ep1?a=1&b=2"
+
+
+def test_uploads_are_keyed_by_file_name():
+    assert normalize_source("/data/uploads/deadbeef.mp4") == "file:deadbeef.mp4"
+    assert source_key("/data/uploads/deadbeef.mp4") == source_key("uploads/deadbeef.mp4")
+
+
+def test_job_key_ignores_options_that_do_not_change_the_output():
+    options = {"min_duration": 30.0, "max_duration": 60.0}
+
+    assert job_key("https://youtu.be/abc123", options) == job_key(
+        "https://www.youtube.com/watch?v=abc123",
+        {**options, "admission": "high", "source_name": "ep1.mp4", "profile": True},
+    )
+
+
+def test_job_key_changes_with_relevant_options():
+    url = "https://youtu.be/abc123"
+
+    assert job_key(url, {"max_duration": 60.0}) != job_key(url, {"max_duration": 90.0})
+    assert job_key(url, {}) != job_key("https://youtu.be/other", {})
@@ -0,0 +1,44 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.audio.energy import EnergyIndex
+from app.segment.segmenter import PAUSE_SEARCH_TOLERANCE, Segmenter
+
+
+def _word(text, start, end):
+    return {"word": text, "start": start, "end": end}
+
+
+# Pausa de 1 s entre "fim" e "eu" (palavra curta, começo da frase seguinte)
+WORDS = [
+    _word("isso", 9.0, 9.4),
+    _word("fim", 9.5, 10.0),
+    _word("eu", 11.0, 11.1),
+    _word("acho", 11.15, 11.5),
+]
+INDEX = EnergyIndex(np.array([10.0]), np.array([11.0]))
+
+
+def test_pause_counts_for_the_word_before_it():
+    assert INDEX.silence_after(10.0, 11.0, PAUSE_SEARCH_TOLERANCE) == pytest.approx(1.0)
+
+
+def test_short_word_after_pause_does_not_inherit_it():
+    # "eu" termina 0.1 s depois da pausa: ela está dentro da tolerância, mas é anterior à palavra
+    assert INDEX.silence_after(11.1, 11.15, PAUSE_SEARCH_TOLERANCE) == 0.0
+
+
+def test_largest_overlap_wins():
+    index = EnergyIndex(np.array([5.0, 5.35]), np.array([5.3, 6.5]))
+    assert index.silence_after(5.2, 5.6, PAUSE_SEARCH_TOLERANCE) == pytest.approx(1.15)
+
+
+def test_cut_after_pause_beats_cut_after_short_word():
+    segmenter = Segmenter(min_duration=1, max_duration=60, energy_index=INDEX)
+
+    # Sem pontuação: só o áudio separa as frases
+    after_fim = segmenter._cut_score(WORDS, 1, current_duration=10.0)
+    after_eu = segmenter._cut_score(WORDS, 2, current_duration=11.1)
+
+    assert after_fim > after_eu
@@ -0,0 +1,22 @@
+from app.video.keyframes import find_nearest_keyframe, previous_keyframe
+
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0]
+
+
+def test_snaps_to_the_nearest_keyframe_on_either_side():
+    assert find_nearest_keyframe(KEYFRAMES, 2.4, tolerance=1.0) == 2.0
+    assert find_nearest_keyframe(KEYFRAMES, 3.7, tolerance=1.0) == 4.0
+    assert find_nearest_keyframe(KEYFRAMES, 4.0, tolerance=0.0) == 4.0
+
+
+def test_no_snap_outside_the_tolerance():
+    # Cortar 1 s antes / depois muda o clip: o render volta para o caminho com encode
+    assert find_nearest_keyframe(KEYFRAMES, 3.0, tolerance=0.5) is None
+    assert find_nearest_keyframe(KEYFRAMES, 9.0, tolerance=1.0) is None
+    assert find_nearest_keyframe([], 1.0, tolerance=1.0) is None
+
+
+def test_previous_keyframe_is_the_seek_point():
+    assert previous_keyframe(KEYFRAMES, 3.9) == 2.0
+    assert previous_keyframe(KEYFRAMES, 4.0) == 4.0
+    assert previous_keyframe([1.0], 0.5) is None
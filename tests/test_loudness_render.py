@@ -0,0 +1,27 @@
+import pytest
+
+# O renderer importa o smart crop (OpenCV + MediaPipe)
+pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+from app.config.settings import settings
+from app.render.renderer import audio_gain_args
+
+
+@pytest.mark.parametrize("gain", [None, 0.0])
+def test_no_gain_adds_no_filter(gain):
+    assert audio_gain_args(gain) == []
+
+
+def test_negative_gain_only_attenuates():
+    assert audio_gain_args(-3.5) == ["-af", "volume=-3.5dB"]
+
+
+def test_positive_gain_goes_through_the_limiter(monkeypatch):
+    monkeypatch.setattr(settings, "LOUDNESS_PEAK_CEILING_DB", -1.0)
+
+    flag, audio_filter = audio_gain_args(4.0)
+
+    assert flag == "-af"
+    # -1 dBFS = 0.8913 linear; level=0 desliga o auto-level do alimiter
+    assert audio_filter == "volume=4.0dB,alimiter=limit=0.8913:level=0"
@@ -0,0 +1,48 @@
+import pytest
+
+from app.jobs import plan
+
+
+@pytest.fixture(autouse=True)
+def fixed_factors(monkeypatch):
+    # Sem Redis / métricas: render em 2x o tempo real
+    monkeypatch.setattr(plan, "real_time_factors", lambda: {"render": 2.0})
+
+
+def _segment(start, duration, score, text="corte"):
+    return {"start": start, "end": start + duration, "duration": duration, "score": score, "text": text}
+
+
+SEGMENTS = [_segment(0.0, 30.0, 0.2), _segment(40.0, 45.0, 0.9), _segment(90.0, 60.0, 0.5)]
+
+
+def test_clips_are_ranked_by_score_and_keep_their_render_index():
+    result = plan.build_plan("job", SEGMENTS, {})
+
+    # index = posição em segments.json (o que o render usa); rank = ordem do plano
+    assert [c["index"] for c in result["clips"]] == [2, 3, 1]
+    assert [c["rank"] for c in result["clips"]] == [1, 2, 3]
+
+
+def test_estimates_scale_with_duration_and_profiles():
+    single = plan.build_plan("job", SEGMENTS, {})
+    double = plan.build_plan("job", SEGMENTS, {"profiles": ["short", "medium"]})
+
+    assert [c["estimated_render_seconds"] for c in single["clips"]] == [90.0, 120.0, 60.0]
+    assert single["estimated_render_seconds"] == 270.0
+    assert double["estimated_render_seconds"] == 540.0
+    assert single["render_real_time_factor"] == 2.0
+
+
+def test_dry_run_flag_is_not_kept_for_the_selection_render():
+    result = plan.build_plan("job", SEGMENTS, {"dry_run": True, "max_duration": 60.0})
+
+    assert result["options"] == {"max_duration": 60.0}
+    assert not plan.is_dry_run(result["options"])
+
+
+def test_empty_plan():
+    result = plan.build_plan("job", [], {})
+
+    assert result["clips"] == []
+    assert result["estimated_render_seconds"] == 0
@@ -0,0 +1,34 @@
+from app.config.settings import settings
+from app.render.cache import geometry_hash, render_hash, style_hash
+
+SEGMENT = {"start": 10.0, "end": 40.0}
+PROFILE = {"format": "vertical", "use_blur": False, "use_subs": False, "res_x": 1080, "res_y": 1920}
+
+
+def test_geometry_depends_on_cut_and_crop():
+    base = geometry_hash("src", SEGMENT, PROFILE, (0, 0, 608, 1080))
+
+    assert base == geometry_hash("src", dict(SEGMENT), dict(PROFILE), (0, 0, 608, 1080))
+    assert base != geometry_hash("src", {"start": 10.5, "end": 40.0}, PROFILE, (0, 0, 608, 1080))
+    assert base != geometry_hash("src", SEGMENT, PROFILE, (10, 0, 608, 1080))
+    assert base != geometry_hash("other", SEGMENT, PROFILE, (0, 0, 608, 1080))
+
+
+def test_subtitle_style_is_ignored_without_subtitles():
+    assert style_hash(PROFILE) == style_hash({**PROFILE, "font_size": 90, "text_color": "yellow"})
+
+
+def test_no_gain_keeps_the_legacy_hash():
+    # Clipes renderizados antes da normalização continuam no cache
+    assert render_hash("g", "s") == render_hash("g", "s", None)
+    assert render_hash("g", "s") != render_hash("g", "s", -3.0)
+    assert render_hash("g", "s", -3.0) != render_hash("g", "s", -2.5)
+
+
+def test_limiter_ceiling_only_counts_for_positive_gain(monkeypatch):
+    boosted, attenuated = render_hash("g", "s", 4.0), render_hash("g", "s", -4.0)
+
+    monkeypatch.setattr(settings, "LOUDNESS_PEAK_CEILING_DB", -2.0)
+
+    assert render_hash("g", "s", 4.0) != boosted
+    assert render_hash("g", "s", -4.0) == attenuated
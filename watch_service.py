@@ -0,0 +1,10 @@
+import logging
+from app.ingest.watch_folder import FolderWatcher
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+if __name__ == '__main__':
+    # Ingest em massa: cada vídeo largado em WATCH_DIR vira um job
+    # (ver app/ingest/watch_folder.py)
+    FolderWatcher().run()
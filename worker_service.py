@@ -10,18 +10,20 @@ logger = logging.getLogger(__name__)
 def start_worker():
     redis_host = settings.REDIS_HOST
     redis_port = settings.REDIS_PORT
-    queue_name = 'video_jobs'
+    # Um worker avulso atende todas as etapas (para papéis separados use supervisor_service.py)
+    # As filas :high vêm antes (jobs curtos não esperam os longos)
+    queue_names = settings.role_queue_names("transcribe", "render", "default")
 
     logger.info(f"🔌 Conectando ao Redis em {redis_host}:{redis_port}...")
 
     try:
         redis_conn = Redis(host=redis_host, port=redis_port)
         
-        queue = Queue(queue_name, connection=redis_conn)
+        queues = [Queue(name, connection=redis_conn) for name in queue_names]
         
-        worker = Worker([queue], connection=redis_conn)
+        worker = Worker(queues, connection=redis_conn)
         
-        logger.info(f"👷 Worker iniciado! Escutando a fila: '{queue_name}'")
+        logger.info(f"👷 Worker iniciado! Escutando as filas: {queue_names}")
         
         worker.work()
         